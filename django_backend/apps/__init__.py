@@ -0,0 +1 @@
+# __init__.py file
\ No newline at end of file
@@ -1 +1,11 @@
-# apps.py to define custom app behaviour
\ No newline at end of file
+# apps.py to define custom app behaviour
+from django.apps import AppConfig
+
+
+class AuthenticationConfig(AppConfig):
+    name = "apps.authentication"
+    label = "authentication"
+
+    def ready(self):
+        # Register signal handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,44 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import UntypedToken
+from .cache import user_cache
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication serving the user from apps.authentication.cache.
+    Only users that passed every check of get_user() are cached, entries
+    are evicted when the user changes or logs out.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        jti = validated_token.get(api_settings.JTI_CLAIM)
+        if user_id is None or jti is None:
+            return super().get_user(validated_token)
+
+        user = user_cache.get(user_id, jti)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, jti, user)
+        return user
+
+
+def authenticate_request_token(request):
+    """
+    (user, validated token) of a plain Django request, from the Authorization
+    header or the access_token cookie, (None, None) when neither holds a valid token.
+    """
+    auth = CachedJWTAuthentication()
+    try:
+        result = auth.authenticate(request)
+        if result is not None:
+            return result
+        token = request.COOKIES.get("access_token")
+        if token:
+            token = UntypedToken(token)
+            return auth.get_user(token), token
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        pass
+    return None, None
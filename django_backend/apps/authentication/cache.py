@@ -0,0 +1,103 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+
+
+class UserCache:
+    """
+    Cache of authenticated users keyed on (user id, token jti).
+    User ids are compared as strings, the form they have in token claims.
+
+    Local tier: per process LRU, bounded to AUTH_USER_CACHE_SIZE entries and
+    AUTH_USER_CACHE_TTL seconds.
+    Redis tier (AUTH_USER_CACHE_REDIS): shared by every process. Entries
+    carry the generation of their user, evict() moves the generation so
+    entries of other processes become invalid too.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Local tier
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def _set_local(self, key, user):
+        with self._lock:
+            self._entries[key] = (user, time.monotonic() + settings.AUTH_USER_CACHE_TTL)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.AUTH_USER_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    # Redis tier
+
+    @staticmethod
+    def _redis_keys(user_id, jti):
+        return f"auth:user:{user_id}:{jti}", f"auth:user-generation:{user_id}"
+
+    def _get_redis(self, user_id, jti):
+        entry_key, generation_key = self._redis_keys(user_id, jti)
+        found = cache.get_many([entry_key, generation_key])
+        entry = found.get(entry_key)
+        if entry is None or entry[0] != found.get(generation_key, 0):
+            return None
+        return entry[1]
+
+    def _set_redis(self, user_id, jti, user):
+        entry_key, generation_key = self._redis_keys(user_id, jti)
+        generation = cache.get(generation_key, 0)
+        cache.set(entry_key, (generation, user), timeout=settings.AUTH_USER_CACHE_TTL)
+
+    # Public API
+
+    def get(self, user_id, jti):
+        """The cached user, a copy so requests never share an instance"""
+        if not settings.AUTH_USER_CACHE_ENABLED:
+            return None
+
+        user_id = str(user_id)
+        user = self._get_local((user_id, jti))
+        if user is None and settings.AUTH_USER_CACHE_REDIS:
+            user = self._get_redis(user_id, jti)
+            if user is not None:
+                self._set_local((user_id, jti), user)
+        return copy.copy(user) if user is not None else None
+
+    def set(self, user_id, jti, user):
+        if not settings.AUTH_USER_CACHE_ENABLED:
+            return
+        user_id, user = str(user_id), copy.copy(user)
+        self._set_local((user_id, jti), user)
+        if settings.AUTH_USER_CACHE_REDIS:
+            self._set_redis(user_id, jti, user)
+
+    def evict(self, user_id):
+        """Drops every entry of the user, whatever the token"""
+        user_id = str(user_id)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+        if settings.AUTH_USER_CACHE_REDIS:
+            _, generation_key = self._redis_keys(user_id, None)
+            cache.set(generation_key, time.time_ns(), timeout=None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
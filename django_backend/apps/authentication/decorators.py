@@ -3,7 +3,7 @@ from django.shortcuts import redirect
 from django.http import HttpResponseRedirect
 from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError, AuthenticationFailed
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from .authentication import CachedJWTAuthentication
 
 
 def jwt_login_required(view_func):
@@ -15,7 +15,7 @@ def jwt_login_required(view_func):
 
         try:
             validated_token = UntypedToken(token)
-            user_auth = JWTAuthentication()
+            user_auth = CachedJWTAuthentication()
 
             try:
                 user, _ = user_auth.get_user(validated_token), validated_token
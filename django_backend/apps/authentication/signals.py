@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .cache import user_cache
+
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Now for this process, and again once committed so no request caches the old row
+    user_cache.evict(instance.pk)
+    transaction.on_commit(lambda: user_cache.evict(instance.pk))
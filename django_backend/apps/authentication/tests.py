@@ -1,3 +1,72 @@
-from django.test import TestCase
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.users.models import User
+from .cache import user_cache
 
-# Create your tests here.
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, API_CACHE_ENABLED=False, AUTH_USER_CACHE_ENABLED=True)
+class UserCacheTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="alice", email="alice@example.com", password="Secret-123")
+
+    def setUp(self):
+        user_cache.clear()
+        self.refresh = RefreshToken.for_user(self.user)
+        self.access = str(self.refresh.access_token)
+
+    def api_get(self):
+        return self.client.get("/api/users/me/", HTTP_AUTHORIZATION=f"Bearer {self.access}")
+
+    def template_get(self):
+        self.client.cookies["access_token"] = self.access
+        return self.client.get("/tasks/create/")
+
+    def test_api_requests_skip_the_user_query(self):
+        self.assertEqual(self.api_get().status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.api_get().data["username"], "alice")
+
+    def test_template_requests_share_the_cache(self):
+        self.api_get()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.template_get().status_code, 200)
+
+    def test_user_save_evicts(self):
+        self.api_get()
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(pk=self.user.pk).save(update_fields=["last_login"])
+        with self.assertNumQueries(1):
+            self.api_get()
+
+    def test_inactive_user_is_rejected_after_save(self):
+        self.api_get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.api_get().status_code, 401)
+
+    def test_logout_evicts(self):
+        self.api_get()
+        response = self.client.post(
+            "/api/auth/logout/", {"refresh": str(self.refresh)}, HTTP_AUTHORIZATION=f"Bearer {self.access}"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(user_cache.get(self.user.pk, self.refresh.access_token["jti"]))
+
+    @override_settings(AUTH_USER_CACHE_SIZE=2)
+    def test_cache_is_bounded(self):
+        for jti in ("a", "b", "c"):
+            user_cache.set(self.user.pk, jti, self.user)
+        self.assertIsNone(user_cache.get(self.user.pk, "a"))
+        self.assertIsNotNone(user_cache.get(self.user.pk, "c"))
+
+    @override_settings(AUTH_USER_CACHE_TTL=-1)
+    def test_entries_expire(self):
+        user_cache.set(self.user.pk, "a", self.user)
+        self.assertIsNone(user_cache.get(self.user.pk, "a"))
@@ -4,15 +4,24 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import get_user_model
 from django.shortcuts import render, redirect
 from django.views import View
 from .serializers import RegisterSerializer, CustomTokenObtainPairSerializer
+from .cache import user_cache
 
 
 User = get_user_model()
 
 
+def blacklist(refresh_token):
+    """Blacklists the refresh token and drops its user from the user cache"""
+    token = RefreshToken(refresh_token)
+    token.blacklist()
+    user_cache.evict(token.get(api_settings.USER_ID_CLAIM))
+
+
 # Route   -> /api/auth/register/
 # Methods -> POST
 class RegisterView(generics.CreateAPIView):
@@ -39,8 +48,7 @@ class LogoutView(generics.GenericAPIView):
     def post(self, request):
         try:
             refresh_token = request.data["refresh"]
-            token = RefreshToken(refresh_token)
-            token.blacklist()
+            blacklist(refresh_token)
             return Response({"detail": "Successfully logged out."})
         except Exception:
             return Response({"error": "Invalid refresh token"}, status=status.HTTP_404_NOT_FOUND)
@@ -53,8 +61,7 @@ class LogoutRedirectView(View):
 
         if refresh_token:
             try:
-                token = RefreshToken(refresh_token)
-                token.blacklist()
+                blacklist(refresh_token)
             except Exception:
                 pass
 
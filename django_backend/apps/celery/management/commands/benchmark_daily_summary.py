@@ -0,0 +1,64 @@
+import filecmp
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from apps.celery.tasks import write_daily_summary, summary_shard_keys, dispatch_summary_chord
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the daily summary in-process and report wall time and peak memory. "
+        "With --shards, also run the parallel chord on the Celery workers and check "
+        "that both reports are byte-identical. Seed data first, eg: manage.py seed_tasks --count 500000"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shards", type=int, default=0, help="Also run the chord with this many shards")
+        parser.add_argument(
+            "--output-dir", default="/shared",
+            help="Must be shared with the workers when --shards is used",
+        )
+
+    def handle(self, *args, **options):
+        today = datetime.now().date()
+
+        with tempfile.TemporaryDirectory(dir=options["output_dir"], prefix=".benchmark_") as tmp_dir:
+            single_dir = os.path.join(tmp_dir, "single")
+            os.mkdir(single_dir)
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            single = write_daily_summary(single_dir, today)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            with open(single, encoding="utf-8") as f:
+                tasks = sum(1 for line in f if line.startswith("- "))
+
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            self.stdout.write(f"Tasks in report:     {tasks}")
+            self.stdout.write(f"Single process:      {elapsed:.2f} s (with tracemalloc)")
+            self.stdout.write(f"Peak Python memory:  {peak / 1024 / 1024:.1f} MiB (tracemalloc)")
+            self.stdout.write(f"Max RSS of process:  {max_rss:.1f} MiB")
+
+            if options["shards"] < 2:
+                return
+
+            keys = summary_shard_keys(today, options["shards"])
+            if keys is None:
+                raise CommandError("Not enough tasks to shard, see DAILY_SUMMARY_MIN_SHARD_SIZE")
+
+            chord_dir = os.path.join(tmp_dir, "chord")
+            os.mkdir(chord_dir)
+
+            start = time.perf_counter()
+            sharded = dispatch_summary_chord(today, keys, chord_dir).get()
+            elapsed = time.perf_counter() - start
+
+            self.stdout.write(f"Chord, {len(keys) + 1} shards:    {elapsed:.2f} s")
+            self.stdout.write(f"Byte-identical:      {filecmp.cmp(single, sharded, shallow=False)}")
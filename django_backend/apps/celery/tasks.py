@@ -1,82 +1,381 @@
+import glob
+import json
+import logging
 import os
+import shutil
+import tempfile
+import time
+import uuid
 from datetime import datetime, timedelta
-from celery import shared_task
+from itertools import islice
+from celery import chord, shared_task
 from django.conf import settings
+from django.db import OperationalError
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from apps.tasks import events
 from apps.tasks.models import Task
+from apps.tasks.cleanup import next_archived_batch, delete_archived_batch
+from apps.tasks.stats import reconcile
+from apps.tasks.changes import prune
+from apps.tasks.export import export_blocks, export_queryset, related_by_task
+from apps.tasks.importer import import_tasks
+from apps.tasks.reports import compress_report
 
 
-SHARED_PATH = "/shared"
+SHARED_PATH = settings.REPORTS_DIR
 
+# Rows fetched (and prefetched) per round trip while streaming reports
+CHUNK_SIZE = 2000
 
-@shared_task
-def generate_daily_summary():
-    """Generate daily task summary for all users"""
+# Write buffer of report files
+WRITE_BUFFER = 1024 * 1024
 
-    today = datetime.now().date()
-    tasks_due_today = (
-        Task.objects.filter(due_date__date__lte=today, is_archived=False)
-        .select_related("created_by", "parent_task")
-        .prefetch_related("assigned_to", "tags")
+# Archived task cleanup: rows per transaction, pause between batches,
+# time budget of one run and delay before the next run resumes
+CLEANUP_BATCH_SIZE = 1000
+CLEANUP_PAUSE = 0.05
+CLEANUP_MAX_SECONDS = 300
+CLEANUP_RESUME_DELAY = 60
+
+logger = logging.getLogger(__name__)
+
+# Define template for each task
+TASK_TEMPLATE = (
+    "- {title}\n"
+    "  Status: {status} | Priority: {priority}\n"
+    "  Created by: {created_by}\n"
+    "  Assigned to: {assigned_to}\n"
+    "  Tags: {tags}\n"
+    "  Due: {due_date}\n\n"
+)
+
+
+def summary_queryset(today):
+    """Tasks of the daily summary, newest first. (created_at, id) is the shard key"""
+    # Same rows as due_date__date__lte=today, but a range the due_date indexes can serve
+    tomorrow = timezone.make_aware(datetime.combine(today + timedelta(days=1), datetime.min.time()))
+    return (
+        Task.objects.filter(due_date__lt=tomorrow, is_archived=False)
+        .order_by("-created_at", "-id")
+    )
+
+
+def _at_or_after(key):
+    """Rows at or after `key` = (created_at, id) in summary order"""
+    created_at, pk = key
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lte=pk)
+
+
+def _parse_key(key):
+    return None if key is None else (datetime.fromisoformat(key[0]), key[1])
+
+
+def iter_summary_rows(today, start=None, end=None, chunk_size=CHUNK_SIZE):
+    """
+    Streams (task row, assignee names, tag names) for the daily summary,
+    optionally only the shard between the `start` (included) and `end` keys.
+    Tasks come from a server-side cursor as plain tuples, and the assignees
+    and tags of each chunk are fetched with one query per table.
+    """
+    queryset = summary_queryset(today)
+    if start is not None:
+        queryset = queryset.filter(_at_or_after(start))
+    if end is not None:
+        queryset = queryset.exclude(_at_or_after(end))
+
+    rows = queryset.values_list(
+        "id", "title", "status", "priority", "due_date", "created_by__username"
+    ).iterator(chunk_size=chunk_size)
+
+    while chunk := list(islice(rows, chunk_size)):
+        task_ids = [row[0] for row in chunk]
+        assignees = related_by_task(Task.assigned_to.through, "user__username", task_ids)
+        tags = related_by_task(Task.tags.through, "tag__name", task_ids)
+        for row in chunk:
+            yield row, assignees.get(row[0], []), tags.get(row[0], [])
+
+
+def render_task(row, assignees, tags):
+    _, title, status, priority, due_date, created_by = row
+
+    return TASK_TEMPLATE.format(
+        title=title,
+        status=status,
+        priority=priority,
+        created_by=created_by,
+        assigned_to=", ".join(assignees) or "Unassigned",
+        tags=", ".join(tags) or "No tags",
+        due_date=due_date.strftime("%Y-%m-%d %H:%M"),
     )
 
-    filename = os.path.join(SHARED_PATH, f"daily_summary_{today}.txt")
 
-    # Define template for each task
-    task_template = (
-        "- {title}\n"
-        "  Status: {status} | Priority: {priority}\n"
-        "  Created by: {created_by}\n"
-        "  Assigned to: {assigned_to}\n"
-        "  Tags: {tags}\n"
-        "  Due: {due_date}\n\n"
+def write_tasks(f, rows):
+    """Writes the rendered rows, returns how many were written"""
+    written = 0
+    for row, assignees, tags in rows:
+        f.write(render_task(row, assignees, tags))
+        written += 1
+    return written
+
+
+def write_atomically(filename, write):
+    """
+    Calls write(file) on a temporary file next to `filename`, then renames it
+    into place. Readers never see a partially written report. The .gz
+    variant follows, until it is written the report is served uncompressed.
+    """
+    directory = os.path.dirname(filename)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", buffering=WRITE_BUFFER) as f:
+            write(f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    if settings.REPORTS_GZIP:
+        compress_report(filename)
+
+
+def summary_filename(shared_path, today):
+    return os.path.join(shared_path, f"daily_summary_{today}.txt")
+
+
+def write_summary_header(f, today):
+    f.write(f"📌 Daily Summary for {today}\n")
+    f.write("=" * 50 + "\n\n")
+
+
+def write_daily_summary(shared_path, today):
+    """Single process version of the report, used for small task sets"""
+
+    def write(f):
+        write_summary_header(f, today)
+        # Streams the rows, memory stays flat whatever the number of tasks
+        if not write_tasks(f, iter_summary_rows(today)):
+            f.write("No tasks due today.\n")
+
+    filename = summary_filename(shared_path, today)
+    write_atomically(filename, write)
+    return filename
+
+
+def summary_shard_keys(today, shards):
+    """
+    Keys splitting the summary into `shards` ranges of the same size, as
+    JSON friendly [created_at, id] pairs. None if there is nothing to split.
+    """
+    if shards < 2:
+        return None
+    total = summary_queryset(today).count()
+    if total < settings.DAILY_SUMMARY_MIN_SHARD_SIZE * 2:
+        return None
+
+    size = max(-(-total // shards), settings.DAILY_SUMMARY_MIN_SHARD_SIZE)
+
+    # One pass numbering the rows, instead of an OFFSET scan per boundary
+    boundaries = (
+        summary_queryset(today)
+        .annotate(position=Window(RowNumber(), order_by=[F("created_at").desc(), F("id").desc()]))
+        .filter(position__in=list(range(size + 1, total + 1, size)))
+        .order_by("position")
+        .values_list("created_at", "id")
     )
+    return [[created_at.isoformat(), pk] for created_at, pk in boundaries]
+
+
+def summary_part_path(shared_path, today, run, index):
+    """Hidden part file of one shard of a chord run"""
+    return os.path.join(shared_path, f".daily_summary_{today}.{run}.{index}.part")
 
-    with open(filename, "w") as f:
-        f.write(f"📌 Daily Summary for {today}\n")
-        f.write("=" * 50 + "\n\n")
 
-        if not tasks_due_today.exists():
+@shared_task
+def render_summary_shard(today, start, end, shared_path=SHARED_PATH, run="", index=0):
+    """Render the rows of one shard into a hidden part file, returns (path, rows)"""
+    today = datetime.fromisoformat(today).date()
+    path = summary_part_path(shared_path, today, run, index)
+    try:
+        with open(path, "w", encoding="utf-8", buffering=WRITE_BUFFER) as f:
+            written = write_tasks(f, iter_summary_rows(today, _parse_key(start), _parse_key(end)))
+    except BaseException:
+        if os.path.exists(path):
+            os.unlink(path)
+        raise
+    return path, written
+
+
+@shared_task
+def merge_summary_shards(parts, today, shared_path=SHARED_PATH):
+    """Chord callback, concatenates the part files in shard order into the report"""
+    today = datetime.fromisoformat(today).date()
+
+    def write(f):
+        write_summary_header(f, today)
+        for path, _ in parts:
+            with open(path, encoding="utf-8") as part:
+                shutil.copyfileobj(part, f, WRITE_BUFFER)
+        if not sum(written for _, written in parts):
             f.write("No tasks due today.\n")
-        else:
-            for task in tasks_due_today:
-                assigned_users = ", ".join([str(u) for u in task.assigned_to.all()]) or "Unassigned"
-                tags = ", ".join([tag.name for tag in task.tags.all()]) or "No tags"
-
-                f.write(
-                    task_template.format(
-                        title=task.title,
-                        status=task.status,
-                        priority=task.priority,
-                        created_by=task.created_by,
-                        estimated_hours=task.estimated_hours,
-                        assigned_to=assigned_users,
-                        tags=tags,
-                        due_date=task.due_date.strftime("%Y-%m-%d %H:%M"),
-                    )
-                )
 
+    filename = summary_filename(shared_path, today)
+    try:
+        write_atomically(filename, write)
+    finally:
+        for path, _ in parts:
+            if os.path.exists(path):
+                os.unlink(path)
     return filename
 
 
 @shared_task
-def cleanup_archived_tasks():
-    """Delete archived tasks older than 30 days"""
+def discard_summary_parts(request, exc, traceback, today, run, shared_path=SHARED_PATH):
+    """Chord error callback, a failed shard means no merge: removes the parts of the run"""
+    today = datetime.fromisoformat(today).date()
+    for path in glob.glob(summary_part_path(glob.escape(shared_path), today, run, "*")):
+        os.unlink(path)
+    logger.warning("Daily summary for %s failed, %s", today, exc)
 
-    cutoff = datetime.now() - timedelta(days=30)
 
-    old_tasks = (
-        Task.objects.filter(is_archived=True, due_date__lt=cutoff)
-        .select_related("created_by", "parent_task")
-        .prefetch_related("assigned_to", "tags")
+def dispatch_summary_chord(today, keys, shared_path=SHARED_PATH):
+    """Start one render task per shard, merged by the callback. Returns the chord result"""
+    bounds = [None] + keys + [None]
+    run = uuid.uuid4().hex
+    callback = merge_summary_shards.s(today.isoformat(), shared_path).on_error(
+        discard_summary_parts.s(today.isoformat(), run, shared_path)
     )
+    return chord(
+        render_summary_shard.s(today.isoformat(), start, end, shared_path, run, index)
+        for index, (start, end) in enumerate(zip(bounds, bounds[1:]))
+    )(callback)
+
+
+@shared_task
+def generate_daily_summary(shared_path=SHARED_PATH, shards=None):
+    """
+    Generate daily task summary for all users.
+    Large task sets are split by (created_at, id) ranges and rendered in
+    parallel by a chord, whose callback merges the parts in order.
+    """
+
+    today = datetime.now().date()
+    shards = settings.DAILY_SUMMARY_SHARDS if shards is None else shards
+
+    keys = summary_shard_keys(today, shards)
+    if keys is None:
+        return write_daily_summary(shared_path, today)
+
+    dispatch_summary_chord(today, keys, shared_path)
+    return summary_filename(shared_path, today)
+
+
+@shared_task
+def export_tasks(params, output, filename, shared_path=SHARED_PATH):
+    """
+    Writes the export of /api/tasks/export/ for these query parameters to
+    a report file, for downloads too large to stream in one request.
+    """
+    blocks = export_blocks(export_queryset(params), output)
+
+    path = os.path.join(shared_path, filename)
+    write_atomically(path, lambda f: f.writelines(blocks))
+    return path
+
+
+@shared_task(bind=True)
+def import_task_file(self, path, username, input_format=None):
+    """
+    Imports the tasks of an NDJSON or CSV file with apps.tasks.importer.
+    Progress is published as the PROGRESS state of this task, rejected rows
+    are written next to the file as <name>.rejected.ndjson.
+    """
+    input_format = input_format or ("csv" if path.endswith(".csv") else "ndjson")
 
-    count = old_tasks.count()
+    def progress(result):
+        self.update_state(state="PROGRESS", meta={
+            "rows": result.rows, "created": result.created, "rejected": len(result.rejected),
+        })
 
-    # Log which tasks are being removed
-    for task in old_tasks:
-        assigned_users = ", ".join(str(u) for u in task.assigned_to.all()) or "Unassigned"
-        print(f"Deleting task: {task.title} | Created by: {task.created_by} | Assigned to: {assigned_users}")
+    with open(path, encoding="utf-8", newline="") as lines:
+        result = import_tasks(lines, input_format, username, progress=progress)
 
-    old_tasks.delete()
+    rejects = None
+    if result.rejected:
+        rejects = f"{os.path.splitext(path)[0]}.rejected.ndjson"
+        write_atomically(rejects, lambda f: f.writelines(json.dumps(row) + "\n" for row in result.rejected))
+    return {"rows": result.rows, "created": result.created, "rejected": len(result.rejected), "rejects": rejects}
+
+
+@shared_task
+def cleanup_archived_tasks(after_id=0, cutoff=None, max_seconds=CLEANUP_MAX_SECONDS):
+    """
+    Delete archived tasks older than 30 days.
+    Works through id ordered batches, each deleted in its own short
+    transaction. When `max_seconds` is spent, the task re-enqueues itself
+    to resume after the last id it reached.
+    """
+
+    cutoff = datetime.fromisoformat(cutoff) if cutoff else timezone.now() - timedelta(days=30)
+    deadline = time.monotonic() + max_seconds
+    deleted = 0
+
+    while task_ids := next_archived_batch(cutoff, after_id, CLEANUP_BATCH_SIZE):
+        start = time.monotonic()
+        try:
+            batch = delete_archived_batch(task_ids, cutoff)
+        except OperationalError as exc:
+            # lock_timeout: these rows are busy, the next run will get them
+            logger.warning(
+                "cleanup_archived_tasks batch_skipped first_id=%d last_id=%d error=%r",
+                task_ids[0], task_ids[-1], str(exc),
+            )
+            batch = []
+
+        deleted += len(batch)
+        after_id = task_ids[-1]
+        logger.info(
+            "cleanup_archived_tasks batch_deleted deleted=%d first_id=%d last_id=%d elapsed_ms=%.1f",
+            len(batch), task_ids[0], task_ids[-1], (time.monotonic() - start) * 1000,
+        )
+
+        if time.monotonic() >= deadline:
+            cleanup_archived_tasks.apply_async(
+                kwargs={"after_id": after_id, "cutoff": cutoff.isoformat(), "max_seconds": max_seconds},
+                countdown=CLEANUP_RESUME_DELAY,
+            )
+            logger.info("cleanup_archived_tasks paused deleted=%d resume_after_id=%d", deleted, after_id)
+            return f"Deleted {deleted} archived tasks older than {cutoff.date()}, resuming after id {after_id}"
+
+        time.sleep(CLEANUP_PAUSE)
+
+    logger.info("cleanup_archived_tasks finished deleted=%d", deleted)
+    return f"Deleted {deleted} archived tasks older than {cutoff.date()}"
+
+
+@shared_task(ignore_result=True)
+def publish_task_events(kind, task_ids, audiences=None, extra=None):
+    """Task event queued by apps.tasks.events, `audiences` are [task id, audience] pairs read before a delete"""
+    events.publish_event(kind, task_ids, None if audiences is None else dict(audiences), extra)
+
+
+@shared_task
+def reconcile_task_stats():
+    """
+    Recompute the task statistics from the tasks and fix the counters that
+    drifted, e.g. after raw SQL writes or a user changing team.
+    """
+
+    drifted = reconcile()
+    logger.info("reconcile_task_stats finished drifted=%d", drifted)
+    return f"Reconciled task stats, {drifted} counters corrected"
+
+
+@shared_task
+def prune_task_changes():
+    """Delete the delta sync change log older than TASK_CHANGES_RETENTION_DAYS"""
 
-    return f"Deleted {count} archived tasks older than {cutoff.date()}"
\ No newline at end of file
+    deleted = prune()
+    logger.info("prune_task_changes finished deleted=%d", deleted)
+    return f"Pruned {deleted} task changes"
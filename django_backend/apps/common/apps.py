@@ -1 +1,23 @@
-# apps.py to define custom app behaviour
\ No newline at end of file
+# apps.py to define custom app behaviour
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class CommonConfig(AppConfig):
+    name = "apps.common"
+    label = "common"
+
+    def ready(self):
+        from celery.signals import task_prerun, task_postrun, worker_process_init
+        from django.db.backends.signals import connection_created
+        from .db import discard_inherited_pools
+        from .metrics import connection_opened, install_serializer_timing, task_started, task_finished
+
+        if settings.METRICS_ENABLED:
+            install_serializer_timing()
+        # Same metrics for the Celery tasks, recorded by the worker processes
+        task_prerun.connect(task_started, dispatch_uid="metrics_task_started")
+        task_postrun.connect(task_finished, dispatch_uid="metrics_task_finished")
+        connection_created.connect(connection_opened, dispatch_uid="metrics_connection_opened")
+        # Prefork workers must not share the pool of the parent
+        worker_process_init.connect(discard_inherited_pools, dispatch_uid="discard_inherited_pools")
@@ -0,0 +1,115 @@
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.http import Http404
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import mixins
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+
+class AsyncReadMixin:
+    """
+    Generic view mixin serving GET and HEAD from async handlers when
+    API_ASYNC_VIEWS is on, for the ASGI deployment. Rows are read with the
+    async ORM (acount, aiterator, aget) so a slow query waits on the event
+    loop instead of holding a worker; other methods run the sync view in a
+    thread. Authentication and filter validation may query the database,
+    they run in a thread too.
+
+    Mixins wrapping `get` provide the matching `aget`, see apps.common.cache.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        if not settings.API_ASYNC_VIEWS:
+            return view
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return await sync_view(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.setup(request, *args, **kwargs)
+            return await self.adispatch(request, *args, **kwargs)
+
+        markcoroutinefunction(async_view)
+        async_view.cls = cls
+        async_view.initkwargs = initkwargs
+        return csrf_exempt(async_view)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """APIView.dispatch for GET and HEAD"""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            response = await self.aget(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aget(self, request, *args, **kwargs):
+        if isinstance(self, mixins.ListModelMixin):
+            return await self.alist(request, *args, **kwargs)
+        return await self.aretrieve(request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await sync_to_async(self.filter_queryset)(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        rows = [obj async for obj in queryset.aiterator(chunk_size=2000)]
+        return Response(self.get_serializer(rows, many=True).data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return Response(self.get_serializer(instance).data)
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        """
+        PageNumberPagination.paginate_queryset on the async ORM: acount, then
+        the rows of the page. Other paginators run in a thread.
+        """
+        paginator = self.paginator
+        if paginator is None:
+            return None
+        if type(paginator).paginate_queryset is not PageNumberPagination.paginate_queryset:
+            return await sync_to_async(self.paginate_queryset)(queryset)
+
+        page_size = paginator.get_page_size(self.request)
+        if not page_size:
+            return None
+        django_paginator = paginator.django_paginator_class(queryset, page_size)
+        # Paginator.count is a cached property, set it from the async count
+        django_paginator.count = await queryset.acount()
+        page_number = paginator.get_page_number(self.request, django_paginator)
+        try:
+            number = django_paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(paginator.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        bottom = (number - 1) * page_size
+        rows = [obj async for obj in queryset[bottom:bottom + page_size].aiterator(chunk_size=page_size)]
+        paginator.page = django_paginator._get_page(rows, number, django_paginator)
+        if django_paginator.num_pages > 1 and paginator.template is not None:
+            paginator.display_page_controls = True
+        paginator.request = self.request
+        return rows
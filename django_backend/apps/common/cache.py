@@ -0,0 +1,267 @@
+import hashlib
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+
+KEY_PREFIX = "api"
+
+
+def _incr(key):
+    """Atomic counter increment, creating the counter on first use"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+def get_versions(namespaces):
+    """Current version of every namespace, namespaces never bumped are at version 0"""
+    keys = [f"{KEY_PREFIX}:version:{namespace}" for namespace in namespaces]
+    found = cache.get_many(keys)
+    return [found.get(key, 0) for key in keys]
+
+
+async def aget_versions(namespaces):
+    keys = [f"{KEY_PREFIX}:version:{namespace}" for namespace in namespaces]
+    found = await cache.aget_many(keys)
+    return [found.get(key, 0) for key in keys]
+
+
+def _bump_keys(namespaces):
+    """Version and bump time keys of the namespaces"""
+    return [f"{KEY_PREFIX}:{kind}:{namespace}" for namespace in namespaces for kind in ("version", "bumped")]
+
+
+def _split_bump_keys(namespaces, found):
+    versions = [found.get(f"{KEY_PREFIX}:version:{namespace}", 0) for namespace in namespaces]
+    times = [found[key] for key in (f"{KEY_PREFIX}:bumped:{namespace}" for namespace in namespaces) if key in found]
+    return versions, max(times, default=None)
+
+
+def get_versions_and_bump_time(namespaces):
+    """(versions, time of the latest bump or None) of the namespaces, in one cache read"""
+    return _split_bump_keys(namespaces, cache.get_many(_bump_keys(namespaces)))
+
+
+async def aget_versions_and_bump_time(namespaces):
+    return _split_bump_keys(namespaces, await cache.aget_many(_bump_keys(namespaces)))
+
+
+def bump_versions(*namespaces):
+    """
+    Invalidates every cached response built from these namespaces.
+    Runs once the current transaction commits, so a concurrent request
+    cannot cache the old rows under the new version. The bump time is kept
+    next to each version for Last-Modified, invalidation only relies on the
+    atomic increments.
+    """
+    def bump():
+        for namespace in namespaces:
+            _incr(f"{KEY_PREFIX}:version:{namespace}")
+        now = int(time.time())
+        cache.set_many({f"{KEY_PREFIX}:bumped:{namespace}": now for namespace in namespaces}, timeout=None)
+
+    if namespaces:
+        transaction.on_commit(bump)
+
+
+def cached_fragments(name, objects, namespace, render):
+    """
+    Rendered HTML of each object, cached under the version of its namespace
+    (eg "task:<pk>") so a bumped object is rendered again and the others are
+    reused. One cache read for the versions, one for the fragments and one
+    write for the misses, whatever the number of objects.
+    """
+    if not settings.API_CACHE_ENABLED or not objects:
+        return [render(obj) for obj in objects]
+    namespaces = [namespace(obj) for obj in objects]
+    keys = [
+        f"{KEY_PREFIX}:fragment:{name}:{ns}:{version}"
+        for ns, version in zip(namespaces, get_versions(namespaces))
+    ]
+    found = cache.get_many(keys)
+    missing = {key: render(obj) for key, obj in zip(keys, objects) if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=settings.FRAGMENT_CACHE_TIMEOUT)
+    return [found[key] if key in found else missing[key] for key in keys]
+
+
+def record_hit(view_name, hit):
+    _incr(f"{KEY_PREFIX}:stats:{view_name}:{'hit' if hit else 'miss'}")
+
+
+def get_stats(view_names):
+    """Hit/miss counters per view name"""
+    keys = [f"{KEY_PREFIX}:stats:{name}:{kind}" for name in view_names for kind in ("hit", "miss")]
+    found = cache.get_many(keys)
+    return {
+        name: {kind: found.get(f"{KEY_PREFIX}:stats:{name}:{kind}", 0) for kind in ("hit", "miss")}
+        for name in view_names
+    }
+
+
+class CachedResponseMixin:
+    """
+    Caches successful GET responses of an API view.
+    The key is built from the full request URL (object id and filter set)
+    and the current versions of `get_cache_namespaces()`, so bumping any
+    namespace makes the old entries unreachable. Views declare their
+    namespaces with `cache_namespaces` or by overriding get_cache_namespaces(),
+    a view doing neither is refused when its class is defined.
+    """
+
+    # Views using this mixin, used to report hit/miss counters
+    registry = set()
+
+    cache_namespaces = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        defaults = (CachedResponseMixin.get_cache_namespaces, ConditionalGetMixin.get_cache_namespaces)
+        if not cls.cache_namespaces and cls.get_cache_namespaces in defaults:
+            raise ImproperlyConfigured(f"{cls.__name__} must declare the cache namespaces its response depends on")
+        CachedResponseMixin.registry.add(cls.__name__)
+
+    def get_cache_namespaces(self):
+        return list(self.cache_namespaces)
+
+    def build_cache_key(self, request, namespaces, versions):
+        fingerprint = "|".join(
+            [request.build_absolute_uri()] + [f"{ns}={v}" for ns, v in zip(namespaces, versions)]
+        )
+        digest = hashlib.md5(fingerprint.encode()).hexdigest()
+        return f"{KEY_PREFIX}:response:{type(self).__name__}:{digest}"
+
+    def get_cache_key(self, request):
+        namespaces = self.get_cache_namespaces()
+        return self.build_cache_key(request, namespaces, get_versions(namespaces))
+
+    def get(self, request, *args, **kwargs):
+        if not settings.API_CACHE_ENABLED:
+            return super().get(request, *args, **kwargs)
+
+        view_name = type(self).__name__
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            record_hit(view_name, True)
+            return Response(data)
+
+        record_hit(view_name, False)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout=settings.API_CACHE_TIMEOUT)
+        return response
+
+    async def aget(self, request, *args, **kwargs):
+        """get() for AsyncReadMixin views"""
+        if not settings.API_CACHE_ENABLED:
+            return await super().aget(request, *args, **kwargs)
+
+        view_name = type(self).__name__
+        namespaces = self.get_cache_namespaces()
+        key = self.build_cache_key(request, namespaces, await aget_versions(namespaces))
+        data = await cache.aget(key)
+        await sync_to_async(record_hit)(view_name, data is not None)
+        if data is not None:
+            return Response(data)
+
+        response = await super().aget(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            await cache.aset(key, response.data, timeout=settings.API_CACHE_TIMEOUT)
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified on GET responses of an API view. When the client
+    validators match, a 304 is returned before the page is queried or serialized.
+
+    The ETag covers the request (URL, format, user), the versions of
+    `get_cache_namespaces()` and, for lists, max(updated_at) and count of
+    `get_validator_queryset()`. Last-Modified is the latest bump time of
+    the namespaces, sent once that second is over. Views with a validator queryset send
+    no Last-Modified: deleted rows, or rows leaving the filter, do not move
+    max(updated_at), only the count in the ETag sees them.
+    """
+
+    cache_namespaces = ()
+
+    def get_cache_namespaces(self):
+        return list(self.cache_namespaces)
+
+    def get_validator_queryset(self):
+        """Rows of the response, None when the namespaces are enough"""
+        return None
+
+    def build_validators(self, request, namespaces, versions, bumped, found):
+        """(ETag, Last-Modified timestamp), `found` is the aggregate of the validator queryset"""
+        parts = [request.get_full_path(), request.accepted_renderer.format, str(request.user.pk)]
+        parts += [f"{ns}={v}" for ns, v in zip(namespaces, versions)]
+
+        last_modified = None
+        if found is not None:
+            parts += [found["last"].isoformat() if found["last"] else "", str(found["count"])]
+        elif bumped is not None and bumped < int(time.time()):
+            # Whole seconds: a write later in the bump's second would keep the
+            # same date and If-Modified-Since would serve the old response
+            last_modified = bumped
+        return f'W/"{hashlib.md5("|".join(parts).encode()).hexdigest()}"', last_modified
+
+    def get_validators(self, request):
+        namespaces = self.get_cache_namespaces()
+        versions, bumped = get_versions_and_bump_time(namespaces) if namespaces else ([], None)
+        queryset = self.get_validator_queryset()
+        found = None
+        if queryset is not None:
+            found = queryset.order_by().aggregate(last=Max("updated_at"), count=Count("pk"))
+        return self.build_validators(request, namespaces, versions, bumped, found)
+
+    async def aget_validators(self, request):
+        namespaces = self.get_cache_namespaces()
+        versions, bumped = await aget_versions_and_bump_time(namespaces) if namespaces else ([], None)
+        # Filter validation may query
+        queryset = await sync_to_async(self.get_validator_queryset)()
+        found = None
+        if queryset is not None:
+            found = await queryset.order_by().aaggregate(last=Max("updated_at"), count=Count("pk"))
+        return self.build_validators(request, namespaces, versions, bumped, found)
+
+    def respond(self, request, response, etag, last_modified):
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def get(self, request, *args, **kwargs):
+        if not settings.API_CONDITIONAL_GET_ENABLED:
+            return super().get(request, *args, **kwargs)
+
+        etag, last_modified = self.get_validators(request)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        return self.respond(request, super().get(request, *args, **kwargs), etag, last_modified)
+
+    async def aget(self, request, *args, **kwargs):
+        """get() for AsyncReadMixin views"""
+        if not settings.API_CONDITIONAL_GET_ENABLED:
+            return await super().aget(request, *args, **kwargs)
+
+        etag, last_modified = await self.aget_validators(request)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        return self.respond(request, await super().aget(request, *args, **kwargs), etag, last_modified)
@@ -0,0 +1,27 @@
+from django.db import connections
+from django.db.backends.postgresql.base import DatabaseWrapper
+
+
+def open_pools():
+    """psycopg pools of this process by alias, the ones connections have used"""
+    # Django keeps one pool per alias and process on the wrapper class
+    return dict(DatabaseWrapper._connection_pools)
+
+
+def pool_stats():
+    """
+    {alias: stats} of the open pools. Counters (requests, waits, errors,
+    connections opened) cover the time since the previous call.
+    """
+    return {alias: pool.pop_stats() for alias, pool in open_pools().items()}
+
+
+def discard_inherited_pools(**kwargs):
+    """
+    Celery worker_process_init: a pool created by the parent before the fork
+    shares its sockets and lost its worker threads. The child forgets it
+    without closing it, and opens its own pool on first use.
+    """
+    for conn in connections.all(initialized_only=True):
+        conn.connection = None
+    DatabaseWrapper._connection_pools.clear()
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.urls import get_resolver
+from apps.common.cache import CachedResponseMixin, get_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the API response cache"
+
+    def handle(self, *args, **options):
+        # Importing the URLconf imports every view, so the registry is complete
+        get_resolver().url_patterns
+
+        for view_name, counters in sorted(get_stats(CachedResponseMixin.registry).items()):
+            total = counters["hit"] + counters["miss"]
+            ratio = counters["hit"] / total * 100 if total else 0
+            self.stdout.write(f"{view_name:<24} hits={counters['hit']:<10} misses={counters['miss']:<10} ratio={ratio:.1f}%")
@@ -0,0 +1,75 @@
+import statistics
+import time
+from django.db import connections
+from django.core.management.base import BaseCommand
+
+
+MODES = {
+    # A connection per request, the Django default
+    "fresh": {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False},
+    # Kept open between requests, checked with a query before reuse
+    "persistent": {"CONN_MAX_AGE": 60, "CONN_HEALTH_CHECKS": True},
+    # Borrowed from the psycopg pool and given back after the request
+    "pool": {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the database part of a request (connect if needed, one query, "
+        "end of request cleanup) with a new connection per request, persistent "
+        "connections and the connection pool, and report the time per request"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{options['requests']} requests per mode, one SELECT 1 each")
+        self.stdout.write(f"{'mode':<12}{'mean ms':>9}{'p50 ms':>9}{'p99 ms':>9}{'opened':>8}")
+        baseline = None
+        for mode in options["modes"]:
+            timings, opened = self.run(mode, options["requests"])
+            mean = statistics.fmean(timings)
+            baseline = mean if baseline is None else baseline
+            p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+            self.stdout.write(
+                f"{mode:<12}{mean * 1000:>9.3f}{statistics.median(timings) * 1000:>9.3f}"
+                f"{p99 * 1000:>9.3f}{opened:>8}"
+                + (f"  {(baseline - mean) * 1000:+.3f} ms saved per request" if mode != options["modes"][0] else "")
+            )
+
+    def run(self, mode, count):
+        settings_dict = {**connections["default"].settings_dict, **MODES[mode]}
+        options = {key: value for key, value in settings_dict["OPTIONS"].items() if key != "pool"}
+        if mode == "pool":
+            options["pool"] = {"min_size": 1, "max_size": 1, "name": "benchmark"}
+        settings_dict["OPTIONS"] = options
+        # Registered as an alias, connection_created handlers look it up
+        alias = f"benchmark_{mode}"
+        connections.settings[alias] = settings_dict
+        connection = connections[alias]
+        opened = 0
+        timings = []
+        try:
+            for _ in range(count):
+                start = time.perf_counter()
+                # What request_started, the view and request_finished do
+                connection.close_if_unusable_or_obsolete()
+                if connection.connection is None:
+                    opened += mode != "pool"
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+                connection.close_if_unusable_or_obsolete()
+                timings.append(time.perf_counter() - start)
+            if mode == "pool":
+                opened = connection.pool.get_stats().get("connections_num", 0)
+        finally:
+            connection.close()
+            connection.close_pool()
+            del connections[alias]
+            del connections.settings[alias]
+        timings.sort()
+        return timings, opened
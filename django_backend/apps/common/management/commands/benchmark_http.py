@@ -0,0 +1,98 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.users.models import User
+
+
+async def read_response(reader):
+    """Status and body of one HTTP/1.1 response, Content-Length or chunked"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = dict(line.split(": ", 1) for line in lines[1:] if ": " in line)
+    headers = {name.lower(): value for name, value in headers.items()}
+    if "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        body = b""
+        while size := int((await reader.readuntil(b"\r\n")).strip(), 16):
+            body += (await reader.readexactly(size + 2))[:-2]
+        await reader.readuntil(b"\r\n")
+    else:
+        body = await reader.read()
+    return status, body, headers.get("connection", "").lower() == "close"
+
+
+class Command(BaseCommand):
+    help = (
+        "Load an API endpoint with concurrent keep-alive clients for a fixed time "
+        "and report requests/s and latency percentiles. Run it against the WSGI "
+        "and the ASGI deployment to compare them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+", help="eg http://localhost:8000/api/tasks/")
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--duration", type=float, default=10, help="Seconds per URL")
+        parser.add_argument("--username", help="Authenticated user, the first user by default")
+
+    def handle(self, *args, **options):
+        user = User.objects.get(username=options["username"]) if options["username"] else User.objects.order_by("id").first()
+        if user is None:
+            raise CommandError("No user, seed data first")
+        token = str(AccessToken.for_user(user))
+        self.stdout.write(f"{options['concurrency']} clients, {options['duration']:.0f}s per URL")
+        self.stdout.write(f"{'url':<50}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}")
+        for url in options["urls"]:
+            latencies, errors, elapsed = asyncio.run(self.load(url, token, options["concurrency"], options["duration"]))
+            if not latencies:
+                self.stdout.write(self.style.ERROR(f"{url:<50} no successful request, {errors} errors"))
+                continue
+            latencies.sort()
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            self.stdout.write(
+                f"{urlsplit(url).path + ('?' + urlsplit(url).query if urlsplit(url).query else ''):<50}"
+                f"{len(latencies) / elapsed:>9.1f}{statistics.median(latencies) * 1000:>9.1f}"
+                f"{p99 * 1000:>9.1f}{latencies[-1] * 1000:>9.1f}{errors:>8}"
+            )
+
+    async def load(self, url, token, concurrency, duration):
+        parts = urlsplit(url)
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        request = (
+            f"GET {target} HTTP/1.1\r\nHost: {parts.hostname}\r\nAuthorization: Bearer {token}\r\n"
+            f"Accept: application/json\r\n\r\n"
+        ).encode()
+        latencies, errors = [], 0
+        deadline = time.perf_counter() + duration
+
+        async def client():
+            nonlocal errors
+            connection = None
+            while time.perf_counter() < deadline:
+                try:
+                    if connection is None:
+                        connection = await asyncio.open_connection(parts.hostname, parts.port or 80)
+                    reader, writer = connection
+                    start = time.perf_counter()
+                    writer.write(request)
+                    status, _, close = await read_response(reader)
+                    if status == 200:
+                        latencies.append(time.perf_counter() - start)
+                    else:
+                        errors += 1
+                    if close:
+                        writer.close()
+                        connection = None
+                except (OSError, asyncio.IncompleteReadError):
+                    errors += 1
+                    connection = None
+            if connection is not None:
+                connection[1].close()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return latencies, errors, time.perf_counter() - start
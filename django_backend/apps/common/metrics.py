@@ -0,0 +1,307 @@
+import logging
+import os
+import socket
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "metrics"
+
+# Upper bounds of the histogram buckets
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name -> (type, help, buckets)
+METRICS = {
+    "http_request_duration_seconds": ("histogram", "Request latency per route", SECONDS_BUCKETS),
+    "http_request_db_queries": ("histogram", "SQL queries per request", QUERIES_BUCKETS),
+    "http_request_db_seconds": ("histogram", "Time spent in SQL per request", SECONDS_BUCKETS),
+    "http_request_serializer_seconds": ("histogram", "Time spent building serializer data per request", SECONDS_BUCKETS),
+    "http_response_size_bytes": ("histogram", "Response body size, streamed responses excluded", BYTES_BUCKETS),
+    "http_request_n_plus_one_total": ("counter", "Requests repeating one SQL statement with different params", None),
+    "celery_task_duration_seconds": ("histogram", "Celery task run time", SECONDS_BUCKETS),
+    "celery_task_db_queries": ("histogram", "SQL queries per Celery task", QUERIES_BUCKETS),
+    "celery_task_db_seconds": ("histogram", "Time spent in SQL per Celery task", SECONDS_BUCKETS),
+    "celery_task_n_plus_one_total": ("counter", "Celery tasks repeating one SQL statement with different params", None),
+    "db_pool_connections": ("gauge", "Connections held by the pools", None),
+    "db_pool_connections_in_use": ("gauge", "Pool connections checked out by a request or task", None),
+    "db_pool_requests_waiting": ("gauge", "Requests or tasks waiting for a pool connection", None),
+    "db_pool_requests_total": ("counter", "Connections handed out by the pools", None),
+    "db_pool_wait_seconds_total": ("counter", "Time spent waiting for a pool connection", None),
+    "db_pool_errors_total": ("counter", "Pool requests that timed out or failed", None),
+    "db_connections_opened_total": ("counter", "Database connections opened", None),
+}
+
+
+class Registry:
+    """
+    Metrics of this process. Histograms keep per bucket counts, then sum and count.
+    Snapshots are pushed to the cache every METRICS_FLUSH_INTERVAL seconds,
+    so /metrics can add up the web and Celery worker processes.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._flushed_at = 0
+        self.key = f"{KEY_PREFIX}:process:{socket.gethostname()}:{os.getpid()}"
+
+    def observe(self, name, labels, value):
+        _, _, buckets = METRICS[name]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            counts = self._values.setdefault(key, [0] * (len(buckets) + 2))
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            counts[-2] += value
+            counts[-1] += 1
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(value) if isinstance(value, list) else value for key, value in self._values.items()}
+
+    def flush(self, force=False):
+        """Push the snapshot of this process to the cache, at most once per interval"""
+        now = time.monotonic()
+        if not force and now - self._flushed_at < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self._flushed_at = now
+        sample_db_pools()
+        try:
+            cache.set(self.key, self.snapshot(), timeout=settings.METRICS_PROCESS_TTL)
+            # Lost updates of the list are repaired by the next flush of that process
+            processes = cache.get(f"{KEY_PREFIX}:processes", [])
+            if self.key not in processes:
+                cache.set(f"{KEY_PREFIX}:processes", processes + [self.key], timeout=None)
+        except Exception:
+            logger.warning("Could not flush metrics to the cache", exc_info=True)
+
+
+registry = Registry()
+
+# Forked processes (Celery prefork, gunicorn --preload) get their own key and
+# start from zero, instead of overwriting the snapshot of their parent with
+# a copy of its values
+os.register_at_fork(after_in_child=registry._reset)
+
+
+def collect():
+    """Sum of the snapshots of every live process"""
+    registry.flush(force=True)
+    processes = cache.get(f"{KEY_PREFIX}:processes", [])
+    snapshots = cache.get_many(processes)
+    if len(snapshots) < len(processes):
+        # Expired processes
+        cache.set(f"{KEY_PREFIX}:processes", [key for key in processes if key in snapshots], timeout=None)
+
+    totals = {}
+    for snapshot in snapshots.values():
+        for key, value in snapshot.items():
+            if isinstance(value, list):
+                current = totals.setdefault(key, [0] * len(value))
+                totals[key] = [a + b for a, b in zip(current, value)]
+            else:
+                totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def _labels(pairs):
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return ",".join(f'{name}="{value}"' for name, value in escaped)
+
+
+def sample_db_pools():
+    """Pool gauges and counters of this process, see apps.common.db"""
+    if not settings.DB_POOL_ENABLED:
+        return
+    from .db import pool_stats
+
+    for alias, stats in pool_stats().items():
+        labels = {"alias": alias, "process": settings.PROCESS_TYPE}
+        registry.set("db_pool_connections", labels, stats.get("pool_size", 0))
+        registry.set("db_pool_connections_in_use", labels, stats.get("pool_size", 0) - stats.get("pool_available", 0))
+        registry.set("db_pool_requests_waiting", labels, stats.get("requests_waiting", 0))
+        registry.inc("db_pool_requests_total", labels, stats.get("requests_num", 0))
+        registry.inc("db_pool_wait_seconds_total", labels, stats.get("requests_wait_ms", 0) / 1000)
+        registry.inc("db_pool_errors_total", labels, stats.get("requests_errors", 0))
+        registry.inc("db_connections_opened_total", labels, stats.get("connections_num", 0))
+
+
+def connection_opened(sender, connection, **kwargs):
+    """connection_created handler, pooled connections are counted by sample_db_pools()"""
+    if connection.settings_dict["OPTIONS"].get("pool"):
+        return
+    registry.inc("db_connections_opened_total", {"alias": connection.alias, "process": settings.PROCESS_TYPE})
+
+
+def render(values):
+    """Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in values.items() if metric == name)
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for labels, value in series:
+            if kind in ("counter", "gauge"):
+                lines.append(f"{name}{{{_labels(labels)}}} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, value):
+                cumulative += count
+                lines.append(f"{name}_bucket{{{_labels(labels + (('le', bound),))}}} {cumulative}")
+            lines.append(f"{name}_bucket{{{_labels(labels + (('le', '+Inf'),))}}} {value[-1]}")
+            lines.append(f"{name}_sum{{{_labels(labels)}}} {value[-2]}")
+            lines.append(f"{name}_count{{{_labels(labels)}}} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+# Tracking of one request or Celery task
+
+class Tracker:
+    """SQL statements and serializer time of the unit of work in progress"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - start
+            self.queries += 1
+            # sql holds placeholders, the same statement with other params counts again
+            self.statements[sql] += 1
+
+    def repeated_statements(self):
+        """Statements run often enough to look like an N+1 pattern"""
+        threshold = settings.METRICS_N_PLUS_ONE_THRESHOLD
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+
+_current = ContextVar("metrics_tracker", default=None)
+
+
+@contextmanager
+def tracking():
+    tracker = Tracker()
+    token = _current.set(tracker)
+    try:
+        with connection.execute_wrapper(tracker):
+            yield tracker
+    finally:
+        _current.reset(token)
+
+
+@asynccontextmanager
+async def atracking():
+    """
+    tracking() for async code. Its SQL runs in the thread of the request's
+    sync_to_async calls, the tracker wraps the connection of that thread.
+    """
+    tracker = Tracker()
+    token = _current.set(tracker)
+    # connection must be resolved in that thread, each thread has its own
+    await sync_to_async(lambda: connection.execute_wrappers.append(tracker))()
+    try:
+        yield tracker
+    finally:
+        await sync_to_async(lambda: connection.execute_wrappers.remove(tracker))()
+        _current.reset(token)
+
+
+def add_serializer_time(seconds):
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.serializer_seconds += seconds
+
+
+def report_n_plus_one(tracker, metric, labels, where):
+    repeated = tracker.repeated_statements()
+    if repeated:
+        registry.inc(metric, labels)
+        sql, count = repeated[0]
+        logger.warning("Possible N+1 in %s: %d runs of %s", where, count, sql[:300])
+
+
+def install_serializer_timing():
+    """
+    Times the .data of root serializers, nested serializers only call
+    to_representation so every serializer is counted once.
+    """
+    from rest_framework import serializers
+
+    def timed(prop):
+        def data(self):
+            start = time.perf_counter()
+            try:
+                return prop.fget(self)
+            finally:
+                add_serializer_time(time.perf_counter() - start)
+        data._timed = True
+        return property(data)
+
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(cls.data.fget, "_timed", False):
+            cls.data = timed(cls.data)
+
+
+# Celery signal handlers, the tracker of each task lives between prerun and postrun
+
+_task_trackers = {}
+
+
+def task_started(task_id=None, **kwargs):
+    if not settings.METRICS_ENABLED:
+        return
+    context = tracking()
+    _task_trackers[task_id] = (context, context.__enter__(), time.perf_counter())
+
+
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    entry = _task_trackers.pop(task_id, None)
+    if entry is None:
+        return
+    context, tracker, start = entry
+    context.__exit__(None, None, None)
+
+    labels = {"task": task.name}
+    registry.observe("celery_task_duration_seconds", {**labels, "state": state or "UNKNOWN"}, time.perf_counter() - start)
+    registry.observe("celery_task_db_queries", labels, tracker.queries)
+    registry.observe("celery_task_db_seconds", labels, tracker.db_seconds)
+    report_n_plus_one(tracker, "celery_task_n_plus_one_total", labels, task.name)
+    registry.flush()
@@ -0,0 +1,87 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+from .metrics import registry, tracking, atracking, report_n_plus_one
+
+
+class MetricsMiddleware:
+    """
+    Records latency, SQL queries and time, serializer time and response size
+    of every request per route, see apps.common.metrics.
+    Routes are the URL patterns, eg /api/tasks/<int:pk>/, so labels stay bounded.
+    Sync and async, an ASGI request stays on the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with tracking() as tracker:
+            response = self.get_response(request)
+        self.record(request, response, tracker, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        async with atracking() as tracker:
+            response = await self.get_response(request)
+        self.record(request, response, tracker, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, tracker, duration):
+        match = request.resolver_match
+        labels = {"route": f"/{match.route}" if match else "unmatched", "method": request.method}
+        registry.observe("http_request_duration_seconds", {**labels, "status": response.status_code}, duration)
+        registry.observe("http_request_db_queries", labels, tracker.queries)
+        registry.observe("http_request_db_seconds", labels, tracker.db_seconds)
+        registry.observe("http_request_serializer_seconds", labels, tracker.serializer_seconds)
+        if not response.streaming:
+            registry.observe("http_response_size_bytes", labels, len(response.content))
+        report_n_plus_one(tracker, "http_request_n_plus_one_total", labels, f"{request.method} {labels['route']}")
+
+        registry.flush()
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise for sync and async middleware chains. WhiteNoise is sync only,
+    which would run every ASGI request in a thread; here only the requests
+    for static files do.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
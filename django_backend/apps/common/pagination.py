@@ -0,0 +1,36 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, id), newest first.
+    No COUNT(*) and no OFFSET, so every page costs the same at any depth.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        # Client supplied ?ordering= would break the keyset, it is ignored
+        return self.ordering
+
+
+class CursorPaginationMixin:
+    """
+    Generic view mixin that switches to `cursor_pagination_class` when the
+    client opts in with ?pagination=cursor. Page number pagination stays the default.
+    """
+
+    cursor_pagination_class = CreatedAtCursorPagination
+    cursor_pagination_param = "pagination"
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            request = getattr(self, "request", None)
+            if request is not None and request.query_params.get(self.cursor_pagination_param) == "cursor":
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class() if self.pagination_class else None
+        return self._paginator
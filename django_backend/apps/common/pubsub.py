@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+import time
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+logger = logging.getLogger(__name__)
+
+# Sent to a client when messages for it were lost, it should resync and reconnect
+RESYNC = {"type": "resync"}
+
+# Sent when the token the client connected with expires, it should refresh it and reconnect
+EXPIRED = {"type": "expired"}
+
+# Seconds between two attempts to subscribe again
+RECONNECT_DELAY = 1
+
+_client = None
+
+
+def publish(channel, message):
+    """
+    Publishes a JSON message to every process subscribed to `channel`.
+    Failures are logged, not raised: events are notifications and a write
+    must not fail because Redis is down.
+    """
+    global _client
+    try:
+        if _client is None:
+            # A stalled Redis must not hold the worker
+            _client = redis.Redis.from_url(
+                settings.EVENTS_REDIS_URL,
+                socket_timeout=settings.EVENTS_PUBLISH_TIMEOUT,
+                socket_connect_timeout=settings.EVENTS_PUBLISH_TIMEOUT,
+            )
+        _client.publish(channel, json.dumps(message, cls=DjangoJSONEncoder))
+    except redis.RedisError:
+        logger.warning("Could not publish to %s", channel, exc_info=True)
+
+
+class Subscription:
+    """
+    Messages waiting for one client, at most EVENTS_QUEUE_SIZE.
+    `accepts(message)` returns what the client gets of a message, or None.
+    A client too slow to keep up loses its backlog and gets RESYNC instead.
+    """
+
+    def __init__(self, accepts):
+        self.accepts = accepts
+        self.queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, message):
+        if self.overflowed:
+            return
+        message = message if message is RESYNC else self.accepts(message)
+        if message is None:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class Broker:
+    """
+    Fan-out of one Redis pub/sub channel to the subscriptions of this process.
+    One Redis connection per process whatever the number of clients, opened
+    with the first subscription and closed with the last one.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.subscriptions = set()
+        self._task = None
+
+    def subscribe(self, accepts):
+        subscription = Subscription(accepts)
+        self.subscriptions.add(subscription)
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._listen())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+        if not self.subscriptions and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def dispatch(self, message):
+        for subscription in list(self.subscriptions):
+            subscription.offer(message)
+
+    async def _listen(self):
+        # Reconnections reuse the connection pool of one client, closed with the listener
+        client = aioredis.Redis.from_url(settings.EVENTS_REDIS_URL)
+        connected = False
+        try:
+            while True:
+                try:
+                    async with client.pubsub() as pubsub:
+                        await pubsub.subscribe(self.channel)
+                        connected = True
+                        async for item in pubsub.listen():
+                            if item["type"] == "message":
+                                self.dispatch(json.loads(item["data"]))
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.warning("Subscription to %s lost, reconnecting", self.channel, exc_info=True)
+                    # Messages published until the next subscription are lost
+                    if connected:
+                        self.dispatch(RESYNC)
+                        connected = False
+                    await asyncio.sleep(RECONNECT_DELAY)
+        finally:
+            await client.aclose()
+
+
+def format_event(message):
+    """Server-sent event of a message"""
+    return f"event: {message['type']}\ndata: {json.dumps(message, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def event_stream(broker, accepts, expires_at=None):
+    """
+    Server-sent events of a subscription to `broker`, with a comment line as
+    heartbeat every EVENTS_HEARTBEAT idle seconds. Ends after a RESYNC, or
+    with EXPIRED at `expires_at`, the expiry timestamp of the client's token.
+    """
+    subscription = broker.subscribe(accepts)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            timeout = settings.EVENTS_HEARTBEAT
+            if expires_at is not None:
+                if time.time() >= expires_at:
+                    yield format_event(EXPIRED)
+                    return
+                timeout = min(timeout, expires_at - time.time())
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                if expires_at is None or time.time() < expires_at:
+                    yield ": ping\n\n"
+                continue
+            yield format_event(message)
+            if message is RESYNC:
+                return
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,164 @@
+from functools import lru_cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from .serializers import SparseFieldsMixin
+
+
+def _walk(serializer, model, prefix=""):
+    """
+    Collects the select_related paths and prefetch_related lookups needed
+    to render `serializer` for instances of `model` without extra queries,
+    and the columns it reads. Columns are None when a field does not map
+    to model fields, the whole row is needed then.
+    """
+    select, prefetch, columns = [], [], []
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            columns = None
+            continue
+
+        path = f"{prefix}{field.source}"
+        if not model_field.is_relation:
+            if columns is not None:
+                columns.append(path)
+            continue
+
+        related_model = model_field.related_model
+
+        # many=True relations -> one extra query each, whatever the page size
+        if model_field.many_to_many or model_field.one_to_many:
+            if isinstance(field, serializers.ListSerializer):
+                queryset = optimize_queryset(related_model._default_manager.all(), type(field.child), only=True)
+            else:
+                queryset = related_model._default_manager.only("pk")
+            prefetch.append(Prefetch(path, queryset=queryset))
+
+        # Nested single object -> JOIN, and keep walking its own fields
+        elif isinstance(field, serializers.BaseSerializer):
+            select.append(path)
+            nested_select, nested_prefetch, nested_columns = _walk(field, related_model, prefix=f"{path}__")
+            select.extend(nested_select)
+            prefetch.extend(nested_prefetch)
+            if columns is not None:
+                columns.extend(nested_columns if nested_columns is not None else [path])
+
+        # PrimaryKeyRelatedField reads the local "<name>_id" column, anything else needs the row
+        else:
+            if not getattr(field, "use_pk_only_optimization", lambda: False)():
+                select.append(path)
+            if columns is not None:
+                columns.append(path)
+
+    return select, prefetch, columns
+
+
+@lru_cache(maxsize=None)
+def get_queryset_plan(serializer_class, fields=None, expand=None):
+    """
+    Returns the (select_related, prefetch_related, columns) plan for a ModelSerializer.
+    The plan only depends on the serializer class and its sparse fieldset,
+    so it is computed once per combination.
+    """
+    if issubclass(serializer_class, SparseFieldsMixin):
+        serializer = serializer_class(fields=fields, expand=expand)
+    else:
+        serializer = serializer_class()
+    return _walk(serializer, serializer.Meta.model)
+
+
+def optimize_queryset(queryset, serializer_class, fields=None, expand=None, only=False, extra_columns=()):
+    """
+    Applies the eager-loading plan of `serializer_class` to `queryset`.
+    only=True also restricts the SELECT to the columns the serializer
+    reads, plus `extra_columns`. Meant for reads, saved instances need every column.
+    """
+    select, prefetch, columns = get_queryset_plan(serializer_class, fields, expand)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if only and columns is not None:
+        queryset = queryset.only(*columns, *extra_columns)
+    return queryset
+
+
+class EagerLoadingMixin:
+    """
+    Generic view mixin that eager-loads every relation rendered by the
+    view's serializer, keeping the query count constant per page.
+    Reads only select the columns the serializer renders.
+    """
+
+    def get_sparse_fieldset(self):
+        """(fields, expand) of the request, see SparseFieldsetMixin"""
+        return None, None
+
+    def get_queryset(self):
+        request = getattr(self, "request", None)
+        fields, expand = self.get_sparse_fieldset()
+        # Cursor pagination reads its ordering columns from the rows of the page
+        ordering = getattr(getattr(self, "paginator", None), "ordering", None) or ()
+        return optimize_queryset(
+            super().get_queryset(),
+            self.get_serializer_class(),
+            fields,
+            expand,
+            only=request is not None and request.method in SAFE_METHODS,
+            extra_columns=[name.lstrip("-") for name in ordering],
+        )
+
+
+class SparseFieldsetMixin(EagerLoadingMixin):
+    """
+    Generic view mixin for serializers using SparseFieldsMixin.
+    ?fields=id,title renders only those fields, ?expand=created_by renders
+    that relation as a nested object instead of its id. Applies to reads,
+    writes always render the full representation.
+    """
+
+    fields_query_param = "fields"
+    expand_query_param = "expand"
+
+    def _parse(self, param, allowed):
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        names = tuple(sorted({name.strip() for name in value.split(",") if name.strip()}))
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise serializers.ValidationError({param: [f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}"]})
+        return names
+
+    def get_sparse_fieldset(self):
+        request = getattr(self, "request", None)
+        if request is None or request.method not in SAFE_METHODS:
+            return None, None
+        if not hasattr(self, "_sparse_fieldset"):
+            serializer_class = self.get_serializer_class()
+            readable = [name for name, field in serializer_class().fields.items() if not field.write_only]
+            self._sparse_fieldset = (
+                self._parse(self.fields_query_param, readable),
+                self._parse(self.expand_query_param, serializer_class.expandable_fields),
+            )
+        return self._sparse_fieldset
+
+    def get_expanded_fields(self):
+        """Relations the response renders as nested objects, same rule as SparseFieldsMixin"""
+        fields, expand = self.get_sparse_fieldset()
+        if expand is None:
+            expand = self.get_serializer_class().expandable_fields if fields is None else ()
+        return [name for name in expand if fields is None or name in fields]
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_sparse_fieldset()
+        kwargs.setdefault("fields", fields)
+        kwargs.setdefault("expand", expand)
+        return super().get_serializer(*args, **kwargs)
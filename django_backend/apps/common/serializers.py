@@ -0,0 +1,119 @@
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import ManyRelatedField
+from rest_framework.settings import api_settings
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin for sparse fieldsets.
+    `fields`: names of the fields to render, None for all of them.
+    `expand`: relations of `expandable_fields` rendered as nested objects,
+    the others render as primary keys. When neither is given every
+    expandable relation is nested, as without the mixin.
+    """
+
+    expandable_fields = ()
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sparse_fields = None if fields is None else tuple(fields)
+        if expand is None:
+            expand = self.expandable_fields if fields is None else ()
+        self.expand = tuple(expand)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.sparse_fields is not None:
+            fields = {name: field for name, field in fields.items() if name in self.sparse_fields}
+        for name in self.expandable_fields:
+            if name in fields and name not in self.expand:
+                nested = fields[name]
+                many = isinstance(nested, serializers.ListSerializer)
+                fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, many=many, source=nested.source)
+        return fields
+
+
+def _related(obj, name):
+    """Prefetched objects of a many relation, skipping the related manager when possible"""
+    prefetched = getattr(obj, "_prefetched_objects_cache", {})
+    return prefetched[name] if name in prefetched else getattr(obj, name).all()
+
+
+def _datetime_renderer(field):
+    """
+    DateTimeField.to_representation for ISO 8601 output, with the timezone
+    resolved once instead of per value. None when the field needs the slow path.
+    """
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    tz = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or tz is None:
+        return None
+
+    def render(value):
+        if not value:
+            return None
+        if timezone.is_naive(value):
+            return field.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+    return render
+
+
+class FastRepresentationMixin:
+    """
+    Read-only ModelSerializer mixin for list pages, same output as the
+    serializer it is mixed into. Renderers are resolved once per serializer,
+    then each row is read with plain attribute access. Nested objects are
+    rendered once per page, eg a user who created or is assigned to many
+    tasks of the page.
+    """
+
+    def get_renderers(self):
+        if getattr(self, "_renderers", None) is None:
+            self._renderers = [
+                (name, self.build_renderer(field))
+                for name, field in self.fields.items()
+                if not field.write_only
+            ]
+        return self._renderers
+
+    def build_renderer(self, field):
+        source = field.source
+
+        if isinstance(field, serializers.ListSerializer):
+            render = self._memoized(field.child)
+            return lambda obj: [render(item) for item in _related(obj, source)]
+        if isinstance(field, serializers.BaseSerializer):
+            render = self._memoized(field)
+            return lambda obj: None if getattr(obj, source) is None else render(getattr(obj, source))
+        if isinstance(field, ManyRelatedField):
+            return lambda obj: [item.pk for item in _related(obj, source)]
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            attname = self.Meta.model._meta.get_field(source).attname
+            return lambda obj: getattr(obj, attname)
+        if type(field) in (
+            serializers.CharField, serializers.ChoiceField, serializers.IntegerField,
+            serializers.BooleanField, serializers.JSONField,
+        ):
+            # Model values are already in their JSON form
+            return lambda obj: getattr(obj, source)
+        if type(field) is serializers.DateTimeField:
+            render = _datetime_renderer(field)
+            if render is not None:
+                return lambda obj: render(getattr(obj, source))
+
+        to_representation = field.to_representation
+        return lambda obj: None if getattr(obj, source) is None else to_representation(getattr(obj, source))
+
+    def _memoized(self, serializer):
+        rendered = {}
+
+        def render(obj):
+            if obj.pk not in rendered:
+                rendered[obj.pk] = serializer.to_representation(obj)
+            return rendered[obj.pk]
+        return render
+
+    def to_representation(self, instance):
+        return {name: render(instance) for name, render in self.get_renderers()}
@@ -1,3 +1,105 @@
-from django.test import TestCase
+import json
+import os
+from django.conf import settings
+from django.core.cache import cache
+from django.test import AsyncClient, override_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.celery import tasks as celery_tasks
+from apps.tasks.models import Task
+from apps.tasks.seeding import seed_users, seed_tasks
+from .metrics import registry, tracking, report_n_plus_one
 
-# Create your tests here.
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, METRICS_ENABLED=True, METRICS_TOKEN="secret", API_CACHE_ENABLED=False)
+class MetricsTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_users(3)[0]
+        seed_tasks(20, users=[cls.user])
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.client.force_authenticate(self.user)
+
+    def scrape(self, token="secret"):
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION=f"Bearer {token}")
+        return response, response.content.decode()
+
+    def test_request_metrics_per_route(self):
+        self.client.get("/api/tasks/")
+        self.client.get(f"/api/tasks/{Task.objects.first().pk}/")
+
+        response, body = self.scrape()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="/api/tasks/",status="200"} 1', body)
+        self.assertIn('http_request_db_queries_count{method="GET",route="/api/tasks/<int:pk>/"} 1', body)
+        self.assertIn('http_request_serializer_seconds_sum{method="GET",route="/api/tasks/"}', body)
+        self.assertIn('http_response_size_bytes_bucket{method="GET",route="/api/tasks/",le="+Inf"} 1', body)
+        self.assertNotIn("http_request_n_plus_one_total{", body)
+
+    async def test_asgi_requests_are_tracked(self):
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        response = await AsyncClient().get("/api/tasks/", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        queries = registry.snapshot()[("http_request_db_queries", (("method", "GET"), ("route", "/api/tasks/")))]
+        # count, then a sum of at least the page and its COUNT
+        self.assertEqual(queries[-1], 1)
+        self.assertGreaterEqual(queries[-2], 2)
+
+    def test_repeated_statements_are_flagged(self):
+        with tracking() as tracker:
+            for task in Task.objects.all():
+                Task.objects.get(pk=task.pk)
+        self.assertEqual(tracker.queries, 21)
+
+        with self.assertLogs("apps.common.metrics", "WARNING"):
+            report_n_plus_one(tracker, "http_request_n_plus_one_total", {"route": "/test/", "method": "GET"}, "test")
+        _, body = self.scrape()
+        self.assertIn('http_request_n_plus_one_total{method="GET",route="/test/"} 1', body)
+
+    def test_celery_task_metrics(self):
+        celery_tasks.reconcile_task_stats.apply()
+        _, body = self.scrape()
+        name = "apps.celery.tasks.reconcile_task_stats"
+        self.assertIn(f'celery_task_duration_seconds_count{{state="SUCCESS",task="{name}"}} 1', body)
+        self.assertIn(f'celery_task_db_queries_count{{task="{name}"}} 1', body)
+
+    def test_connection_pool_metrics(self):
+        if not settings.DB_POOL_ENABLED:
+            self.skipTest("DB_POOL_ENABLED is off")
+        self.client.get("/api/tasks/")
+        _, body = self.scrape()
+        labels = '{alias="default",process="web"}'
+        self.assertIn("# TYPE db_pool_connections gauge", body)
+        # The test case holds its connection for the whole test
+        self.assertIn(f"db_pool_connections_in_use{labels} 1", body)
+        self.assertIn(f"db_pool_requests_total{labels} ", body)
+
+    def test_token(self):
+        self.assertEqual(self.scrape()[0].status_code, 200)
+        self.assertEqual(self.scrape("wrong")[0].status_code, 403)
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        with override_settings(METRICS_TOKEN=""):
+            self.assertEqual(self.scrape("")[0].status_code, 403)
+
+    def test_forked_process_gets_its_own_key(self):
+        registry.inc("http_request_n_plus_one_total", {"route": "/test/", "method": "GET"})
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.write(write, json.dumps([registry.key, len(registry.snapshot())]).encode())
+            os._exit(0)
+        os.close(write)
+        with os.fdopen(read) as f:
+            key, values = json.loads(f.read())
+        os.waitpid(pid, 0)
+        self.assertEqual(key, f"{registry.key.rsplit(':', 1)[0]}:{pid}")
+        self.assertEqual(values, 0)
+        self.assertEqual(len(registry.snapshot()), 1)
@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.utils import timezone
+from apps.common.cache import bump_versions
+from .models import Task
+from . import changes, events, stats
+
+
+ASSIGN_MODES = ("add", "replace", "remove")
+
+AssignedTo = Task.assigned_to.through
+
+
+def assign_users(task_ids, user_ids, mode="add"):
+    """
+    Set-based assignment of users to tasks, whatever the number of each:
+    add     -> one INSERT ... ON CONFLICT DO NOTHING
+    remove  -> one DELETE
+    replace -> one DELETE of the users not listed + one INSERT
+    Then one UPDATE touching only updated_at.
+    m2m_changed is not sent, caches and stats are updated here instead.
+    """
+    task_ids, user_ids = list(task_ids), list(user_ids)
+    if mode not in ASSIGN_MODES:
+        raise ValueError(f"Unknown assignment mode: {mode}")
+    if not task_ids:
+        return
+
+    with transaction.atomic(), stats.tracking(task_ids):
+        if mode == "replace":
+            AssignedTo.objects.filter(task_id__in=task_ids).exclude(user_id__in=user_ids).delete()
+        if mode == "remove":
+            AssignedTo.objects.filter(task_id__in=task_ids, user_id__in=user_ids).delete()
+        elif user_ids:
+            AssignedTo.objects.bulk_create(
+                [AssignedTo(task_id=task_id, user_id=user_id) for task_id in task_ids for user_id in user_ids],
+                ignore_conflicts=True,
+            )
+
+        Task.objects.filter(pk__in=task_ids).update(updated_at=timezone.now())
+        changes.record(task_ids)
+        events.emit("task.assigned", task_ids)
+        bump_versions(*(f"task:{pk}" for pk in task_ids))
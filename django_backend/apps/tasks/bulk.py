@@ -0,0 +1,218 @@
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from apps.common.cache import bump_versions
+from .models import (
+    Tag,
+    Task,
+)
+from .cleanup import delete_tasks
+from .search import update_search_vector
+from . import changes, events, stats
+from .serializers import BulkTaskSerializer, CYCLE_ERROR
+from .tree import find_cycles
+
+
+User = get_user_model()
+
+# Rows written per transaction
+BATCH_SIZE = 500
+
+# Many-to-many fields of Task, as named in validated_data
+M2M_FIELDS = ("assigned_to", "tags")
+
+
+def _as_ids(values):
+    """Integer ids found in a raw value (single id or list), anything invalid is left to the validation"""
+    if not isinstance(values, (list, tuple)):
+        values = [values]
+    ids = set()
+    for value in values:
+        if isinstance(value, bool):
+            continue
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def _batches(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def preload_relations(items):
+    """
+    Fetch every user, tag and parent task referenced by `items` with one
+    query per model, in the format expected by BulkTaskSerializer.
+    """
+    user_ids, tag_ids, task_ids = set(), set(), set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        user_ids |= _as_ids(item.get("assigned_to_ids", []))
+        tag_ids |= _as_ids(item.get("tags", []))
+        task_ids |= _as_ids(item.get("parent_task"))
+
+    return {
+        User: User.objects.in_bulk(user_ids),
+        Tag: Tag.objects.in_bulk(tag_ids),
+        Task: Task.objects.in_bulk(task_ids),
+    }
+
+
+def _set_m2m(relations):
+    """
+    Replace the rows of the many-to-many tables for the given tasks.
+    `relations` maps a field name to {task_id: [related objects]}.
+    One DELETE and one multi-row INSERT per table.
+    """
+    for name, values in relations.items():
+        if not values:
+            continue
+        field = Task._meta.get_field(name)
+        through = field.remote_field.through
+        source, target = f"{field.m2m_field_name()}_id", f"{field.m2m_reverse_field_name()}_id"
+
+        through.objects.filter(**{f"{source}__in": list(values)}).delete()
+        through.objects.bulk_create(
+            [
+                through(**{source: task_id, target: obj.pk})
+                for task_id, objs in values.items()
+                for obj in {obj.pk: obj for obj in objs}.values()
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def _batch_failed(batch, exc):
+    return [{"index": index, "errors": {"non_field_errors": [str(exc)]}} for index, *_ in batch]
+
+
+def bulk_create_tasks(items, user):
+    """
+    Validate `items` with BulkTaskSerializer and insert the valid ones,
+    one transaction per batch. Returns (created ids, per-item errors).
+    """
+    context = {"preloaded": preload_relations(items)}
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        serializer = BulkTaskSerializer(data=item, context=context)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors.append({"index": index, "errors": serializer.errors})
+
+    created = []
+    for batch in _batches(valid):
+        tasks, m2m = [], []
+        for _, data in batch:
+            data = dict(data)
+            m2m.append({name: data.pop(name) for name in M2M_FIELDS if name in data})
+            tasks.append(Task(created_by=user, **data))
+
+        try:
+            with transaction.atomic():
+                Task.objects.bulk_create(tasks)
+                _set_m2m({
+                    name: {task.pk: relations[name] for task, relations in zip(tasks, m2m) if name in relations}
+                    for name in M2M_FIELDS
+                })
+                # bulk_create skips signals
+                update_search_vector([task.pk for task in tasks])
+                stats.record_created([task.pk for task in tasks])
+                changes.record([task.pk for task in tasks])
+                events.emit("task.created", [task.pk for task in tasks])
+        except DatabaseError as exc:
+            errors.extend(_batch_failed(batch, exc))
+        else:
+            created.extend(task.pk for task in tasks)
+
+    return created, errors
+
+
+def _reject_cycles(valid, errors):
+    """
+    Drops the items whose new parent would make a loop, with the other new
+    parents of the batch applied. One query, plus one more per round when
+    rejected items leave a loop between the tasks that remain.
+    """
+    while True:
+        parents = {
+            instance.pk: data["parent_task"] and data["parent_task"].pk
+            for _, instance, data in valid if "parent_task" in data
+        }
+        looping = find_cycles(parents)
+        if not looping:
+            return valid
+        rejected = {index for index, instance, data in valid if instance.pk in looping and "parent_task" in data}
+        errors.extend({"index": index, "errors": {"parent_task": [CYCLE_ERROR]}} for index in sorted(rejected))
+        errors.sort(key=lambda error: error["index"])
+        valid = [item for item in valid if item[0] not in rejected]
+
+
+def bulk_update_tasks(items):
+    """
+    Partially update tasks. Every item must carry the `id` of the task.
+    Returns (updated ids, per-item errors).
+    """
+    instances = Task.objects.in_bulk(_as_ids([item.get("id") for item in items if isinstance(item, dict)]))
+    context = {"preloaded": preload_relations(items)}
+
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        ids = _as_ids(item.get("id")) if isinstance(item, dict) else set()
+        instance = instances.get(ids.pop()) if len(ids) == 1 else None
+        if instance is None:
+            errors.append({"index": index, "errors": {"id": ["Task not found."]}})
+            continue
+        serializer = BulkTaskSerializer(instance, data=item, partial=True, context=context)
+        if serializer.is_valid():
+            valid.append((index, instance, serializer.validated_data))
+        else:
+            errors.append({"index": index, "errors": serializer.errors})
+    valid = _reject_cycles(valid, errors)
+
+    updated = []
+    for batch in _batches(valid):
+        now = timezone.now()
+        fields, m2m = {"updated_at"}, {name: {} for name in M2M_FIELDS}
+        for _, instance, data in batch:
+            for attr, value in data.items():
+                if attr in M2M_FIELDS:
+                    m2m[attr][instance.pk] = value
+                else:
+                    setattr(instance, attr, value)
+                    fields.add(attr)
+            instance.updated_at = now
+
+        task_ids = list({instance.pk for _, instance, _ in batch})
+        try:
+            with transaction.atomic(), stats.tracking(task_ids):
+                Task.objects.bulk_update({instance.pk: instance for _, instance, _ in batch}.values(), sorted(fields))
+                _set_m2m(m2m)
+                # bulk_update skips signals
+                update_search_vector(task_ids)
+                changes.record(task_ids)
+                events.emit("task.updated", task_ids)
+                bump_versions(*(f"task:{pk}" for pk in task_ids))
+        except DatabaseError as exc:
+            errors.extend(_batch_failed(batch, exc))
+        else:
+            updated.extend(instance.pk for _, instance, _ in batch)
+
+    return updated, errors
+
+
+def bulk_delete_tasks(ids):
+    """
+    Delete tasks by id, one transaction per batch. Returns the deleted ids.
+    Same statements whatever the number of tasks and comments, see
+    apps.tasks.cleanup.delete_tasks().
+    """
+    existing = list(Task.objects.filter(pk__in=_as_ids(ids)).values_list("pk", flat=True))
+    for batch in _batches(existing):
+        with transaction.atomic(), stats.tracking(batch):
+            delete_tasks(batch)
+    return existing
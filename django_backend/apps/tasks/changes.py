@@ -0,0 +1,99 @@
+import base64
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from .models import TaskChange
+
+
+# Transaction id of the current transaction, assigned on its first write
+CURRENT_TXID = "pg_current_xact_id()::text::bigint"
+# Oldest transaction still running, every transaction below it has finished
+SNAPSHOT_XMIN = "pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+
+
+class ExpiredCursor(Exception):
+    """The changes after the cursor may have been pruned, the client must resync"""
+
+
+def record(task_ids):
+    """Logs a change of each task, in the transaction making the change"""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {TaskChange._meta.db_table} (task_id, txid, changed_at) "
+            f"SELECT unnest(%s::bigint[]), {CURRENT_TXID}, now()",
+            [task_ids],
+        )
+
+
+# Cursors: position (txid, id) of the last change read and the time they were issued at
+
+def encode_cursor(txid, change_id):
+    raw = f"{txid}.{change_id}.{int(time.time())}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(txid, id), raises ValueError on malformed cursors and ExpiredCursor on pruned ones"""
+    try:
+        txid, change_id, issued_at = (int(part) for part in base64.urlsafe_b64decode(cursor.encode()).decode().split("."))
+    except (TypeError, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if issued_at < time.time() - settings.TASK_CHANGES_RETENTION_DAYS * 86400:
+        raise ExpiredCursor
+    return txid, change_id
+
+
+def current_cursor():
+    """Cursor of everything visible now, where a client starting from a full fetch begins"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT txid, id FROM {TaskChange._meta.db_table} WHERE txid < {SNAPSHOT_XMIN} "
+            f"ORDER BY txid DESC, id DESC LIMIT 1"
+        )
+        row = cursor.fetchone()
+    return encode_cursor(*(row or (0, 0)))
+
+
+def changes_since(since, limit):
+    """
+    Ids of the tasks changed after the `since` cursor, the next cursor and whether
+    more changes are waiting. At most `limit` log rows are read per call.
+
+    Rows are read in (txid, id) order and only from transactions older than
+    the oldest one still running. A transaction committing late has a txid
+    at or above that bound, so it is never skipped by a cursor.
+    """
+    position = decode_cursor(since)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT txid, id, task_id FROM {TaskChange._meta.db_table} "
+            f"WHERE (txid, id) > (%s, %s) AND txid < {SNAPSHOT_XMIN} "
+            f"ORDER BY txid, id LIMIT %s",
+            [*position, limit],
+        )
+        rows = cursor.fetchall()
+    if not rows:
+        return [], encode_cursor(*position), False
+    task_ids = list(dict.fromkeys(task_id for _, _, task_id in rows))
+    return task_ids, encode_cursor(*rows[-1][:2]), len(rows) == limit
+
+
+def prune(batch_size=10000):
+    """Deletes the rows older than TASK_CHANGES_RETENTION_DAYS in batches, returns the count"""
+    cutoff = timezone.now() - timedelta(days=settings.TASK_CHANGES_RETENTION_DAYS)
+    table = TaskChange._meta.db_table
+    deleted = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE id IN (SELECT id FROM {table} WHERE changed_at < %s LIMIT %s)",
+                [cutoff, batch_size],
+            )
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return deleted
@@ -0,0 +1,79 @@
+import logging
+from django.conf import settings
+from django.db import connection, transaction
+from apps.common.cache import bump_versions
+from . import changes, events
+from .models import (
+    Task,
+    Comment,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Give up on a batch instead of waiting behind API transactions
+LOCK_TIMEOUT = "2s"
+
+
+def _cascade_statements():
+    """
+    Raw deletes run before the tasks themselves, children first.
+    Mirrors the on_delete rules of the models without loading any row.
+    """
+    tasks = Task._meta.db_table
+    return [
+        f"DELETE FROM {Comment._meta.db_table} WHERE task_id = ANY(%s)",
+        f"DELETE FROM {Task.assigned_to.through._meta.db_table} WHERE task_id = ANY(%s)",
+        f"DELETE FROM {Task.tags.through._meta.db_table} WHERE task_id = ANY(%s)",
+        # parent_task is SET_NULL
+        f"UPDATE {tasks} SET parent_task_id = NULL WHERE parent_task_id = ANY(%s)",
+    ]
+
+
+def archived_queryset(cutoff, after_id=0):
+    """Archived tasks older than `cutoff`, in id order after `after_id`"""
+    return Task.objects.filter(is_archived=True, due_date__lt=cutoff, id__gt=after_id).order_by("id")
+
+
+def next_archived_batch(cutoff, after_id, batch_size):
+    """Ids of the next batch of archived tasks to delete"""
+    return list(archived_queryset(cutoff, after_id).values_list("id", flat=True)[:batch_size])
+
+
+def delete_archived_batch(task_ids, cutoff):
+    """
+    Delete one batch in its own short transaction and return the deleted ids.
+    Rows are re-checked and locked with SKIP LOCKED, so tasks unarchived in
+    the meantime survive and rows held by the API are left for the next run.
+    """
+    tasks = Task._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+        cursor.execute(
+            f"SELECT id FROM {tasks} WHERE id = ANY(%s) AND is_archived AND due_date < %s "
+            f"ORDER BY id FOR UPDATE SKIP LOCKED",
+            [list(task_ids), cutoff],
+        )
+        locked = [row[0] for row in cursor.fetchall()]
+        if locked:
+            delete_tasks(locked)
+    return locked
+
+
+def delete_tasks(task_ids):
+    """
+    Deletes tasks with raw statements in the caller's transaction, without
+    loading them or sending per row signals: one statement per table, then
+    one change log insert, one delete event and one cache bump for the lot.
+    """
+    task_ids = list(task_ids)
+    # Read while the assignees are still there
+    audiences = events.audience(task_ids) if settings.EVENTS_ENABLED else {}
+    with connection.cursor() as cursor:
+        for statement in _cascade_statements():
+            cursor.execute(statement, [task_ids])
+        cursor.execute(f"DELETE FROM {Task._meta.db_table} WHERE id = ANY(%s)", [task_ids])
+    # Tombstones for the delta sync
+    changes.record(task_ids)
+    events.emit_deleted(task_ids, audiences)
+    bump_versions(*(f"task:{pk}" for pk in task_ids))
@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.common.pubsub import Broker, event_stream, publish
+from .models import Task
+
+
+CHANNEL = "task-events"
+
+# Tasks per published message, bulk operations are split
+MESSAGE_SIZE = 500
+
+broker = Broker(CHANNEL)
+
+
+def audience(task_ids):
+    """
+    {task id: {"users": [...], "teams": [...]}}, the creator and assignees of
+    each task and their teams, in one query.
+    """
+    if not task_ids:
+        return {}
+    tasks, assigned = Task._meta.db_table, Task.assigned_to.through._meta.db_table
+    users = Task._meta.get_field("created_by").related_model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT p.task_id, array_agg(DISTINCT p.user_id), array_remove(array_agg(DISTINCT u.team_id), NULL)
+            FROM (
+                SELECT id AS task_id, created_by_id AS user_id FROM {tasks} WHERE id = ANY(%(ids)s)
+                UNION SELECT task_id, user_id FROM {assigned} WHERE task_id = ANY(%(ids)s)
+            ) p JOIN {users} u ON u.id = p.user_id
+            GROUP BY p.task_id
+            """,
+            {"ids": list(task_ids)},
+        )
+        return {task_id: {"users": users, "teams": teams} for task_id, users, teams in cursor.fetchall()}
+
+
+def publish_event(kind, task_ids, audiences=None, extra=None):
+    """
+    Publishes an event of `task_ids`, split in messages of MESSAGE_SIZE tasks.
+    Runs in a Celery worker, the audiences are read now unless given.
+    """
+    if audiences is None:
+        audiences = audience(task_ids)
+    at = timezone.now()
+    for start in range(0, len(task_ids), MESSAGE_SIZE):
+        publish(CHANNEL, {
+            "type": kind,
+            "at": at,
+            "tasks": [
+                {"id": pk, **audiences.get(pk, {"users": [], "teams": []})}
+                for pk in task_ids[start:start + MESSAGE_SIZE]
+            ],
+            **(extra or {}),
+        })
+
+
+def _send(kind, task_ids, extra, audiences=None):
+    """
+    Queues the publish once the transaction commits. The request thread
+    neither reads the audiences nor waits on the events Redis, and a broker
+    failure is logged instead of failing the write.
+    """
+    # apps.celery.tasks imports this module
+    from apps.celery.tasks import publish_task_events
+
+    # Celery messages are JSON, task ids would become string keys
+    pairs = None if audiences is None else [[pk, audiences[pk]] for pk in task_ids if pk in audiences]
+    transaction.on_commit(
+        # No retries, events are notifications and the write is already committed
+        lambda: publish_task_events.apply_async((kind, task_ids, pairs, extra), retry=False),
+        robust=True,
+    )
+
+
+def emit(kind, task_ids, **extra):
+    """
+    Publishes a task event once the transaction commits, `kind` is one of
+    task.created, task.updated, task.assigned or comment.created.
+    """
+    task_ids = list(task_ids)
+    if settings.EVENTS_ENABLED and task_ids:
+        _send(kind, task_ids, extra)
+
+
+def emit_deleted(task_ids, audiences):
+    """task.deleted, the audiences are read before the rows are gone"""
+    task_ids = list(task_ids)
+    if settings.EVENTS_ENABLED and task_ids:
+        _send("task.deleted", task_ids, {}, audiences)
+
+
+# Subscribers
+
+def visible_to(user, scope="team"):
+    """
+    Filter of a subscription: the tasks the user created or is assigned to,
+    and with scope="team" the tasks of the users of their team.
+    """
+    def accepts(message):
+        tasks = [
+            task["id"] for task in message["tasks"]
+            if user.pk in task["users"] or (scope == "team" and user.team_id is not None and user.team_id in task["teams"])
+        ]
+        if not tasks:
+            return None
+        return {key: value for key, value in message.items() if key != "tasks"} | {"task_ids": tasks}
+    return accepts
+
+
+def stream(user, scope="team", expires_at=None):
+    return event_stream(broker, visible_to(user, scope), expires_at)
+
@@ -0,0 +1,143 @@
+import csv
+import json
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+from django.http import QueryDict
+from django_filters.utils import translate_validation
+from rest_framework.settings import api_settings
+from .filters import TaskFilter
+from .models import Task
+from .search import search_terms, search_tasks
+
+
+# Rows per server-side cursor fetch, and per written block
+CHUNK_SIZE = 2000
+
+FIELDS = [
+    "id", "title", "description", "status", "priority", "due_date",
+    "estimated_hours", "actual_hours", "created_by_id", "parent_task_id",
+    "metadata", "created_at", "updated_at", "is_archived",
+]
+
+# Exported column names, the relations are appended to each row
+COLUMNS = [field.removesuffix("_id") for field in FIELDS] + ["assigned_to", "tags"]
+
+# ?ordering= accepted by the export, the same as /api/tasks/
+ORDERING_FIELDS = ["due_date", "priority", "created_at"]
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+
+
+def export_queryset(params):
+    """
+    Tasks matching the filters, ?search= and ?ordering= of /api/tasks/ in
+    `params`, a QueryDict or a dict of lists. Primary key order unless the
+    client or the search ranking asked for another. Raises ValidationError
+    for invalid filters.
+    """
+    if not isinstance(params, QueryDict):
+        query = QueryDict(mutable=True)
+        for key, values in params.items():
+            query.setlist(key, values)
+        params = query
+
+    filterset = TaskFilter(params, queryset=Task.objects.all())
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+
+    ordering = [
+        term.strip() for term in params.get(api_settings.ORDERING_PARAM, "").split(",")
+        if term.strip().lstrip("-") in ORDERING_FIELDS
+    ]
+    queryset = search_tasks(filterset.qs, search_terms(params.get(api_settings.SEARCH_PARAM, "")), ranked=not ordering)
+    if ordering:
+        return queryset.order_by(*ordering)
+    return queryset if queryset.query.order_by else queryset.order_by("id")
+
+
+def related_by_task(through, field, task_ids):
+    """{task_id: [values]} of one many-to-many table, ordered by the value"""
+    related = {}
+    rows = (
+        through.objects.filter(task_id__in=task_ids)
+        .order_by(field)
+        .values_list("task_id", field)
+    )
+    for task_id, value in rows:
+        related.setdefault(task_id, []).append(value)
+    return related
+
+
+def iter_export_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Lists of at most `chunk_size` export rows (tuples in COLUMNS order).
+    Tasks come from a server-side cursor as plain tuples and the assignees
+    and tags of each chunk are read with one query per table, so memory
+    stays flat whatever the number of tasks.
+    """
+    rows = queryset.values_list(*FIELDS).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        task_ids = [row[0] for row in chunk]
+        assignees = related_by_task(Task.assigned_to.through, "user_id", task_ids)
+        tags = related_by_task(Task.tags.through, "tag__name", task_ids)
+        yield [row + (assignees.get(row[0], []), tags.get(row[0], [])) for row in chunk]
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        # Strings like the API, no float rounding
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def ndjson_blocks(chunks):
+    """One JSON object per line, one string per chunk"""
+    dumps = json.JSONEncoder(default=_default, ensure_ascii=False).encode
+    for chunk in chunks:
+        yield "".join(dumps(dict(zip(COLUMNS, row))) + "\n" for row in chunk)
+
+
+class _Lines:
+    """File-like target of csv.writer collecting the lines of a chunk"""
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, line):
+        self.lines.append(line)
+
+    def flush(self):
+        block, self.lines = "".join(self.lines), []
+        return block
+
+
+def csv_blocks(chunks):
+    """Header line, then one CSV block per chunk. JSON metadata, ;-separated relations"""
+    lines = _Lines()
+    writer = csv.writer(lines)
+    writer.writerow(COLUMNS)
+    yield lines.flush()
+    metadata = COLUMNS.index("metadata")
+    dates = [COLUMNS.index(name) for name in ("due_date", "created_at", "updated_at")]
+    for chunk in chunks:
+        for row in chunk:
+            row = list(row)
+            row[metadata] = json.dumps(row[metadata], ensure_ascii=False)
+            for index in dates:
+                row[index] = row[index].isoformat()
+            row[-2] = ";".join(map(str, row[-2]))
+            row[-1] = ";".join(row[-1])
+            writer.writerow(row)
+        yield lines.flush()
+
+
+def export_blocks(queryset, output, chunk_size=CHUNK_SIZE):
+    """Text blocks of the export of `queryset`, `output` is a key of FORMATS"""
+    chunks = iter_export_chunks(queryset, chunk_size)
+    return csv_blocks(chunks) if output == "csv" else ndjson_blocks(chunks)
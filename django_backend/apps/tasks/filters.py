@@ -1,5 +1,6 @@
 import django_filters
 from .models import Task
+from .search import filter_title
 
 
 class TaskFilter(django_filters.FilterSet):
@@ -8,8 +9,8 @@ class TaskFilter(django_filters.FilterSet):
     """
 
     title = django_filters.CharFilter(
-        field_name="title", lookup_expr="icontains",
-        help_text="Filter tasks by title (case-insensitive search)"
+        method="filter_title",
+        help_text="Filter tasks by words in the title (case-insensitive, word prefix match)"
     )
     status = django_filters.ChoiceFilter(
         field_name="status", choices=Task.STATUS_CHOICES,
@@ -39,3 +40,6 @@ class TaskFilter(django_filters.FilterSet):
     class Meta:
         model = Task
         fields = ["title", "status", "priority", "created_by", "assigned_to"]
+
+    def filter_title(self, queryset, name, value):
+        return filter_title(queryset, value)
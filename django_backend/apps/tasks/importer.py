@@ -0,0 +1,390 @@
+import csv
+import json
+import re
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from apps.common.cache import bump_versions
+from .models import Tag, Task
+from .search import SEARCH_CONFIG
+from .serializers import TaskSerializer
+from . import changes, events, stats
+
+
+User = get_user_model()
+
+# Rows validated, copied and inserted per transaction
+BATCH_SIZE = 10000
+
+# Task fields taken from the input, with the rules of the TaskSerializer field of the same name
+FIELDS = ["title", "description", "status", "priority", "due_date", "estimated_hours", "actual_hours", "metadata"]
+
+# Fields with few distinct values, parsed once per value
+MEMOIZED = {"due_date", "estimated_hours", "actual_hours"}
+MEMO_SIZE = 10000
+
+# Characters Postgres text or COPY cannot take, rejected like DRF does
+FORBIDDEN_RE = re.compile("[\x00\ud800-\udfff]")
+
+STAGING = "task_import"
+
+STAGING_COLUMNS = ["line", *FIELDS, "created_by", "assigned_to", "tags", "id"]
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    # {"line": n, "errors": {field: [messages]}} of every rejected row
+    rejected: list = field(default_factory=list)
+
+
+def read_rows(lines, input_format):
+    """
+    (line number, row dict) of an NDJSON or CSV input. CSV rows carry
+    `metadata` as JSON and `assigned_to` / `tags` as ;-separated names, like
+    /api/tasks/export/. Lines that do not parse give a None row.
+    """
+    if input_format == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            for name in ("assigned_to", "tags"):
+                value = row.get(name)
+                row[name] = [item for item in value.split(";") if item] if value else []
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+class RowParser:
+    """
+    Turns import rows into COPY rows. Only the types are checked here
+    (strings, dates, numbers, JSON, lists of names), with the messages of
+    TaskSerializer. Required fields, blanks, lengths, choices and decimal
+    digits are checked on the staging table by _invalid_rows().
+    """
+
+    def __init__(self, default_username):
+        serializer_fields = TaskSerializer().fields
+        self.fields = {name: serializer_fields[name] for name in FIELDS}
+        model_fields = {name: Task._meta.get_field(name) for name in FIELDS}
+        self.defaults = {name: f.get_default() if f.has_default() else None for name, f in model_fields.items()}
+        self.defaults["metadata"] = json.dumps(self.defaults["metadata"])
+        self.name = serializers.CharField()
+        self.default_username = default_username
+        self.memo = {name: {} for name in MEMOIZED}
+
+    def _text(self, field, raw):
+        if isinstance(raw, bool) or not isinstance(raw, (str, int, float)):
+            field.fail("invalid")
+        value = str(raw).strip()
+        forbidden = FORBIDDEN_RE.search(value)
+        if forbidden and forbidden.group() == "\x00":
+            raise serializers.ValidationError("Null characters are not allowed.")
+        if forbidden:
+            raise serializers.ValidationError(f"Surrogate characters are not allowed: U+{ord(forbidden.group()):X}.")
+        return value
+
+    def _number(self, field, raw):
+        if isinstance(raw, bool) or not isinstance(raw, (str, int, float)):
+            field.fail("invalid")
+        try:
+            value = Decimal(str(raw).strip())
+        except InvalidOperation:
+            field.fail("invalid")
+        if not value.is_finite():
+            field.fail("invalid")
+        return value
+
+    def _parse(self, name, raw):
+        """Parsed value, raises ValidationError"""
+        field = self.fields[name]
+        if name == "metadata":
+            if isinstance(raw, str):
+                try:
+                    raw = json.loads(raw)
+                except ValueError:
+                    field.fail("invalid")
+            return json.dumps(raw)
+        if name not in MEMOIZED:
+            return self._text(field, raw)
+
+        # Plain hashable values only, True would share the entry of 1
+        memo = self.memo[name] if type(raw) in (str, int, float) else None
+        if memo is not None and raw in memo:
+            value = memo[raw]
+        else:
+            try:
+                value = field.to_internal_value(raw) if name == "due_date" else self._number(field, raw)
+            except serializers.ValidationError as exc:
+                value = exc
+            if memo is not None:
+                if len(memo) >= MEMO_SIZE:
+                    memo.clear()
+                memo[raw] = value
+        if isinstance(value, serializers.ValidationError):
+            raise value
+        return value
+
+    def parse(self, row):
+        """(COPY row without its line number, None) or (None, {field: [messages]})"""
+        if row is None:
+            return None, {"non_field_errors": ["Invalid row."]}
+        values, errors = [], {}
+        for name in FIELDS:
+            raw = row.get(name, serializers.empty)
+            # CSV has no null, an empty cell is a missing value
+            if raw == "" and name not in ("title", "description"):
+                raw = None if self.fields[name].allow_null else serializers.empty
+            if raw is serializers.empty:
+                # None for a required field, rejected on the staging table
+                values.append(self.defaults[name])
+            elif raw is None:
+                if not self.fields[name].allow_null:
+                    errors[name] = [self.fields[name].error_messages["null"]]
+                values.append(None)
+            else:
+                try:
+                    values.append(self._parse(name, raw))
+                except serializers.ValidationError as exc:
+                    errors[name] = exc.detail
+
+        names = {}
+        for name, raw in (
+            ("created_by", [row.get("created_by") or self.default_username]),
+            ("assigned_to", row.get("assigned_to") or []),
+            ("tags", row.get("tags") or []),
+        ):
+            if not isinstance(raw, list):
+                errors[name] = ["Expected a list of names."]
+                continue
+            try:
+                names[name] = list(dict.fromkeys(self._text(self.name, item) for item in raw))
+            except serializers.ValidationError as exc:
+                errors[name] = exc.detail
+        if errors:
+            return None, errors
+        return values + [names["created_by"][0], _array(names["assigned_to"]), _array(names["tags"])], None
+
+
+def _array(names):
+    """text[] literal, cheaper to COPY than a list adapted by psycopg"""
+    quoted = (name.replace("\\", "\\\\").replace('"', '\\"') for name in names)
+    return "{" + ",".join(f'"{name}"' for name in quoted) + "}"
+
+
+def _create_staging(cursor):
+    cursor.execute(
+        f"""
+        CREATE TEMP TABLE IF NOT EXISTS {STAGING} (
+            line integer, title text, description text, status text, priority text,
+            due_date timestamptz, estimated_hours numeric, actual_hours numeric, metadata jsonb,
+            created_by text, assigned_to text[], tags text[], id bigint
+        ) ON COMMIT DELETE ROWS
+        """
+    )
+    # Rows of a previous batch are still there when the outer transaction has not committed
+    cursor.execute(f"TRUNCATE {STAGING}")
+
+
+def _rules():
+    """
+    ({column: [SQL conditions]}, params) of the TaskSerializer rules checked
+    on the staging table, in the order DRF applies them. The params hold the
+    ones of each condition followed by its message.
+    """
+    serializer_fields = TaskSerializer().fields
+    rules, params = {}, []
+
+    def rule(column, condition, message, *condition_params):
+        rules.setdefault(column, []).append(condition)
+        params.extend([*condition_params, str(message)])
+
+    for name in FIELDS:
+        field = serializer_fields[name]
+        messages = field.error_messages
+        if field.required:
+            rule(name, f"{name} IS NULL", messages["required"])
+        if isinstance(field, serializers.ChoiceField):
+            rule(name, f"NOT {name} = ANY(%s)", messages["invalid_choice"], list(field.choices))
+        elif isinstance(field, serializers.CharField):
+            if not field.allow_blank:
+                rule(name, f"{name} = ''", messages["blank"])
+            if field.max_length:
+                rule(name, f"length({name}) > {field.max_length}", messages["max_length"].format(max_length=field.max_length))
+        elif isinstance(field, serializers.DecimalField):
+            whole = f"CASE WHEN trunc(abs({name})) = 0 THEN 0 ELSE length(trunc(abs({name}))::text) END"
+            rule(name, f"{whole} + scale({name}) > {field.max_digits}", messages["max_digits"].format(max_digits=field.max_digits))
+            rule(name, f"scale({name}) > {field.decimal_places}", messages["max_decimal_places"].format(max_decimal_places=field.decimal_places))
+            rule(name, f"{whole} > {field.max_whole_digits}", messages["max_whole_digits"].format(max_whole_digits=field.max_whole_digits))
+
+    # Tag names, with the messages of a CharField
+    max_length, messages = Tag._meta.get_field("name").max_length, serializers.CharField().error_messages
+    rule("tags", "'' = ANY(tags)", messages["blank"])
+    rule("tags", f"EXISTS (SELECT FROM unnest(tags) n WHERE length(n) > {max_length})",
+         messages["max_length"].format(max_length=max_length))
+    return rules, params
+
+
+def _invalid_rows(cursor):
+    """{line: {field: [messages]}} of the staged rows breaking the rules of TaskSerializer, in one scan"""
+    rules, params = _rules()
+    # The first broken rule of each column, its message with the value for {input}
+    columns = ", ".join(
+        f"'{column}', CASE "
+        + " ".join(
+            f"WHEN {condition} THEN jsonb_build_array(replace(%s, '{{input}}', coalesce({column}::text, '')))"
+            for condition in conditions
+        )
+        + " END"
+        for column, conditions in rules.items()
+    )
+    cursor.execute(
+        f"""
+        SELECT line, errors FROM (
+            SELECT line, jsonb_strip_nulls(jsonb_build_object({columns})) AS errors FROM {STAGING}
+        ) checked
+        WHERE errors <> '{{}}'
+        """,
+        params,
+    )
+    # Django leaves jsonb undecoded on its connections
+    return {line: json.loads(errors) for line, errors in cursor.fetchall()}
+
+
+def _unknown_users(cursor):
+    """{line: [usernames]} of the staged rows naming users that do not exist"""
+    users = User._meta.db_table
+    cursor.execute(
+        f"""
+        SELECT n.line, array_agg(DISTINCT n.username ORDER BY n.username)
+        FROM (
+            SELECT line, created_by AS username FROM {STAGING}
+            UNION ALL SELECT line, unnest(assigned_to) FROM {STAGING}
+        ) n
+        WHERE NOT EXISTS (SELECT 1 FROM {users} u WHERE u.username = n.username)
+        GROUP BY n.line
+        """
+    )
+    return dict(cursor.fetchall())
+
+
+def load_batch(rows):
+    """
+    Inserts parsed rows ([line, *COPY row]) with set-based SQL, in the
+    caller's transaction: COPY into the staging table, one scan checking the
+    serializer rules, then one statement per table resolving usernames and
+    tag names. Rows breaking a rule or naming unknown users are rejected,
+    unknown tags are created. Returns (task ids, rejected rows).
+    """
+    tasks, users, tags = Task._meta.db_table, User._meta.db_table, Tag._meta.db_table
+    assigned, tagged = Task.assigned_to.through._meta.db_table, Task.tags.through._meta.db_table
+    with connection.cursor() as cursor:
+        _create_staging(cursor)
+        # Ids are taken up front and copied with the rows, the relations are inserted with them
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)", [tasks, len(rows)]
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        with cursor.copy(f"COPY {STAGING} ({', '.join(STAGING_COLUMNS)}) FROM STDIN") as copy:
+            for row, task_id in zip(rows, ids):
+                copy.write_row([*row, task_id])
+
+        invalid = _invalid_rows(cursor)
+        for line, names in _unknown_users(cursor).items():
+            invalid.setdefault(line, {"non_field_errors": [f"Unknown users: {', '.join(names)}."]})
+        rejected = [{"line": line, "errors": errors} for line, errors in sorted(invalid.items())]
+        if invalid:
+            cursor.execute(f"DELETE FROM {STAGING} WHERE line = ANY(%s)", [list(invalid)])
+
+        cursor.execute(
+            f"""
+            INSERT INTO {tags} (name, color, created_at, updated_at)
+            SELECT DISTINCT unnest(tags), %s, now(), now() FROM {STAGING}
+            ON CONFLICT (name) DO NOTHING
+            """,
+            [Tag._meta.get_field("color").get_default()],
+        )
+        if cursor.rowcount:
+            bump_versions("tags")
+
+        task_ids = [task_id for row, task_id in zip(rows, ids) if row[0] not in invalid]
+        # The search document of search_vector_expression(), written with the row
+        # instead of a second UPDATE of every task. New tasks have no comments.
+        cursor.execute(
+            f"""
+            INSERT INTO {tasks} (
+                id, title, description, status, priority, due_date, estimated_hours, actual_hours,
+                metadata, created_by_id, created_at, updated_at, is_archived, search_vector
+            )
+            SELECT s.id, s.title, s.description, s.status, s.priority, s.due_date, s.estimated_hours,
+                   s.actual_hours, s.metadata, u.id, now(), now(), false,
+                   setweight(to_tsvector(%(config)s::regconfig, s.title), 'A')
+                   || setweight(to_tsvector(%(config)s::regconfig, array_to_string(ARRAY(SELECT unnest(s.tags) ORDER BY 1), ' ')), 'B')
+                   || setweight(to_tsvector(%(config)s::regconfig, s.description), 'C')
+            FROM {STAGING} s JOIN {users} u ON u.username = s.created_by
+            """,
+            {"config": SEARCH_CONFIG},
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {assigned} (task_id, user_id)
+            SELECT s.id, u.id FROM {STAGING} s
+            CROSS JOIN LATERAL unnest(s.assigned_to) AS a(username)
+            JOIN {users} u ON u.username = a.username
+            """
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {tagged} (task_id, tag_id)
+            SELECT s.id, t.id FROM {STAGING} s
+            CROSS JOIN LATERAL unnest(s.tags) AS n(name)
+            JOIN {tags} t ON t.name = n.name
+            """
+        )
+
+    # Raw inserts skip the signals
+    stats.record_created(task_ids)
+    changes.record(task_ids)
+    events.emit("task.created", task_ids)
+    return task_ids, rejected
+
+
+def import_tasks(lines, input_format, default_username, batch_size=BATCH_SIZE, progress=None):
+    """
+    Imports the tasks of an NDJSON or CSV input, one transaction per batch.
+    Rows are parsed in Python, checked and loaded by load_batch().
+    `progress(result)` is called after each batch.
+    """
+    parser = RowParser(default_username)
+    result = ImportResult()
+    rows = read_rows(lines, input_format)
+    while batch := list(islice(rows, batch_size)):
+        valid, rejected = [], []
+        for line, row in batch:
+            values, errors = parser.parse(row)
+            if errors:
+                rejected.append({"line": line, "errors": errors})
+            else:
+                valid.append([line, *values])
+        if valid:
+            with transaction.atomic():
+                task_ids, invalid = load_batch(valid)
+            result.created += len(task_ids)
+            rejected.extend(invalid)
+        result.rejected.extend(sorted(rejected, key=lambda rejected: rejected["line"]))
+        result.rows += len(batch)
+        if progress is not None:
+            progress(result)
+    return result
@@ -0,0 +1,113 @@
+from django.db import connection, transaction
+from .models import Task, TaskTemplate
+from .search import update_search_vector
+from . import changes, events, stats
+
+
+# Tasks created by one instantiation at most, subtasks included
+MAX_TASKS = 10000
+
+# Rows per INSERT statement
+BATCH_SIZE = 2000
+
+
+def _template_tree_sql():
+    """Template %(root)s and its subtemplates, parents before children, cycles are not followed"""
+    templates = TaskTemplate._meta.db_table
+    return f"""
+        WITH RECURSIVE tree AS (
+            SELECT id, parent_template_id, 0 AS depth, ARRAY[id] AS path
+            FROM {templates} WHERE id = %(root)s
+            UNION ALL
+            SELECT t.id, t.parent_template_id, tree.depth + 1, tree.path || t.id
+            FROM {templates} t JOIN tree ON t.parent_template_id = tree.id
+            WHERE NOT t.id = ANY(tree.path)
+        )
+        SELECT id, parent_template_id FROM tree ORDER BY depth, id
+    """
+
+
+def template_tree(template, subtasks=True):
+    """
+    Templates of one instantiation, parents first: the template alone, or
+    with its subtemplates at every level when `subtasks`.
+    """
+    if not subtasks:
+        return [template]
+    with connection.cursor() as cursor:
+        cursor.execute(_template_tree_sql(), {"root": template.pk})
+        rows = cursor.fetchall()
+    templates = TaskTemplate.objects.in_bulk([pk for pk, _ in rows])
+    # The root keeps no parent even if a cycle leads back to it
+    return [template] + [templates[pk] for pk, _ in rows[1:]]
+
+
+def _related_by_template(field, template_ids):
+    """{template_id: [related ids]} of one many-to-many field of TaskTemplate"""
+    field = TaskTemplate._meta.get_field(field)
+    source, target = f"{field.m2m_field_name()}_id", f"{field.m2m_reverse_field_name()}_id"
+    related = {}
+    rows = field.remote_field.through.objects.filter(**{f"{source}__in": template_ids}).values_list(source, target)
+    for template_id, related_id in rows:
+        related.setdefault(template_id, []).append(related_id)
+    return related
+
+
+def _reserve_task_ids(count):
+    """`count` ids of the tasks sequence, so children can reference parents before the rows exist"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+            [Task._meta.db_table, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def instantiate_template(tree, count, user, due_date=None):
+    """
+    Creates `count` copies of a template tree (see template_tree()) as tasks
+    created by `user`, subtemplates becoming subtasks. `due_date` replaces
+    the due dates of the templates. One transaction, the ids are reserved
+    up front and each table gets multi-row INSERTs, whatever the size of
+    the tree. Returns the ids of the root tasks.
+    """
+    template_ids = [template.pk for template in tree]
+    assignees = _related_by_template("assigned_to", template_ids)
+    tags = _related_by_template("tags", template_ids)
+    AssignedTo, Tagged = Task.assigned_to.through, Task.tags.through
+
+    with transaction.atomic():
+        ids = iter(_reserve_task_ids(count * len(tree)))
+        tasks, assigned, tagged, roots = [], [], [], []
+        for _ in range(count):
+            copies = {}
+            for template in tree:
+                task = Task(
+                    id=next(ids),
+                    title=template.title,
+                    description=template.description,
+                    status=template.status,
+                    priority=template.priority,
+                    due_date=due_date or template.due_date,
+                    estimated_hours=template.estimated_hours,
+                    metadata=template.metadata,
+                    created_by=user,
+                    parent_task_id=copies.get(template.parent_template_id) if copies else None,
+                )
+                copies[template.pk] = task.pk
+                tasks.append(task)
+                assigned += [AssignedTo(task_id=task.pk, user_id=pk) for pk in assignees.get(template.pk, [])]
+                tagged += [Tagged(task_id=task.pk, tag_id=pk) for pk in tags.get(template.pk, [])]
+            roots.append(copies[tree[0].pk])
+
+        Task.objects.bulk_create(tasks, batch_size=BATCH_SIZE)
+        AssignedTo.objects.bulk_create(assigned, batch_size=BATCH_SIZE)
+        Tagged.objects.bulk_create(tagged, batch_size=BATCH_SIZE)
+
+        # bulk_create skips signals
+        task_ids = [task.pk for task in tasks]
+        update_search_vector(task_ids)
+        stats.record_created(task_ids)
+        changes.record(task_ids)
+        events.emit("task.created", task_ids)
+    return roots
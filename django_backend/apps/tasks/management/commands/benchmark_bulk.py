@@ -0,0 +1,59 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from apps.tasks.seeding import seed_users, seed_tags
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare task creation throughput of POST /api/tasks/ (one item per request) "
+        "with POST /api/tasks/bulk/. Everything is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=2000, help="Tasks created by each path")
+        parser.add_argument("--chunk", type=int, default=1000, help="Items per bulk request")
+
+    def build_items(self, count, users, tags):
+        return [
+            {
+                "title": f"Benchmark task {n}",
+                "description": "Created by benchmark_bulk",
+                "due_date": "2025-09-09T12:00:00Z",
+                "estimated_hours": "2.00",
+                "assigned_to_ids": [users[n % len(users)].pk, users[(n + 1) % len(users)].pk],
+                "tags": [tags[n % len(tags)].pk],
+            }
+            for n in range(count)
+        ]
+
+    def measure(self, label, count, requests):
+        start = time.perf_counter()
+        for send in requests:
+            response = send()
+            assert response.status_code == 201, response.content[:500]
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"{label:<20}{count:>8} tasks {elapsed:>8.2f} s {count / elapsed:>10.0f} tasks/s")
+
+    @override_settings(ALLOWED_HOSTS=["*"])
+    def handle(self, *args, **options):
+        count, chunk = options["count"], options["chunk"]
+
+        with transaction.atomic():
+            users = seed_users(10)
+            tags = seed_tags(5)
+            client = APIClient()
+            client.force_authenticate(users[0])
+            items = self.build_items(count, users, tags)
+
+            self.measure("single-item POST", count, [
+                lambda item=item: client.post("/api/tasks/", item, format="json") for item in items
+            ])
+            self.measure("bulk POST", count, [
+                lambda start=start: client.post("/api/tasks/bulk/", items[start:start + chunk], format="json")
+                for start in range(0, count, chunk)
+            ])
+
+            transaction.set_rollback(True)
@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.tasks.export import CHUNK_SIZE, FORMATS, export_blocks
+from apps.tasks.models import Task
+
+
+def rss_mib():
+    """Current resident memory of this process"""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream the /api/tasks/export/ body of every task in each format and "
+        "report rows/s, bytes and peak RSS of this process. Seed data first"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--formats", nargs="+", choices=list(FORMATS), default=list(FORMATS))
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        total = Task.objects.count()
+        self.stdout.write(f"{total} tasks, chunks of {options['chunk_size']}, RSS at start {rss_mib():.1f} MiB")
+        self.stdout.write(f"{'format':<8}{'seconds':>9}{'rows/s':>10}{'MiB':>9}{'peak RSS MiB':>14}")
+        for output in options["formats"]:
+            start, size, peak = time.perf_counter(), 0, rss_mib()
+            blocks = export_blocks(Task.objects.order_by("id"), output, options["chunk_size"])
+            for block in blocks:
+                # What the response sends, encoded block by block
+                size += len(block.encode())
+                peak = max(peak, rss_mib())
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{output:<8}{elapsed:>9.1f}{total / elapsed:>10.0f}{size / 2 ** 20:>9.1f}{peak:>14.1f}"
+            )
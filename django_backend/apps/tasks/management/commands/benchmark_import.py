@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.tasks.importer import BATCH_SIZE, FIELDS, import_tasks
+from apps.tasks.seeding import seed_users, seed_tags
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the import throughput of apps.tasks.importer for generated "
+        "NDJSON and CSV files. Everything is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=200000, help="Rows per format")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--formats", nargs="+", choices=["ndjson", "csv"], default=["ndjson", "csv"])
+
+    def build_rows(self, count, users, tags):
+        statuses, priorities = ["todo", "in_progress", "done"], ["low", "medium", "high"]
+        return [
+            {
+                "title": f"Imported task {n}",
+                "description": "Created by benchmark_import",
+                "status": statuses[n % 3],
+                "priority": priorities[n % 3],
+                "due_date": f"2030-01-{n % 28 + 1:02d}T12:00:00Z",
+                "estimated_hours": f"{n % 40 + 1}.50",
+                "actual_hours": None,
+                "metadata": {"source": "benchmark", "n": n},
+                "created_by": users[n % len(users)].username,
+                "assigned_to": [users[(n + 1) % len(users)].username, users[(n + 2) % len(users)].username],
+                # Half of the tag names do not exist yet
+                "tags": [tags[n % len(tags)].name, f"imported-{n % 10}"],
+            }
+            for n in range(count)
+        ]
+
+    def encode(self, rows, input_format):
+        if input_format == "ndjson":
+            return [json.dumps(row) + "\n" for row in rows]
+        out = io.StringIO()
+        writer = csv.writer(out)
+        columns = FIELDS + ["created_by", "assigned_to", "tags"]
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow([
+                json.dumps(row[name]) if name == "metadata"
+                else ";".join(row[name]) if name in ("assigned_to", "tags")
+                else "" if row[name] is None else row[name]
+                for name in columns
+            ])
+        return io.StringIO(out.getvalue())
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        with transaction.atomic():
+            users = seed_users(10)
+            tags = seed_tags(5)
+            rows = self.build_rows(count, users, tags)
+            self.stdout.write(f"{'format':<8}{'rows':>9}{'created':>9}{'seconds':>9}{'tasks/s':>10}")
+            for input_format in options["formats"]:
+                lines = self.encode(rows, input_format)
+                start = time.perf_counter()
+                result = import_tasks(lines, input_format, users[0].username, options["batch_size"])
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{input_format:<8}{result.rows:>9}{result.created:>9}{elapsed:>9.2f}{result.created / elapsed:>10.0f}"
+                )
+            transaction.set_rollback(True)
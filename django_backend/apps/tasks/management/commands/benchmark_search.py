@@ -0,0 +1,56 @@
+import statistics
+import time
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from apps.tasks.models import Task
+from apps.tasks.search import filter_title, SEARCH_CONFIG
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the ILIKE search path with the full-text search path on the current data. "
+        "Seed data first, eg: manage.py seed_tasks --count 1000000"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("terms", nargs="*", default=["invoice", "deploy database", "roadmap audit"])
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--page-size", type=int, default=10)
+
+    def _time(self, queryset, repeat, page_size):
+        """Median wall time of fetching one page plus the COUNT the paginator runs"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            queryset.count()
+            list(queryset[:page_size])
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        total = Task.objects.count()
+        self.stdout.write(f"Tasks in table: {total}\n")
+        self.stdout.write(f"{'term':<24}{'path':<14}{'matches':>10}{'median ms':>12}")
+
+        for term in options["terms"]:
+            ilike = Task.objects.filter(
+                Q(title__icontains=term) | Q(description__icontains=term)
+            ).order_by("-created_at")
+            query = SearchQuery(term, search_type="websearch", config=SEARCH_CONFIG)
+            fts = (
+                Task.objects.filter(search_vector=query)
+                .annotate(search_rank=SearchRank(F("search_vector"), query))
+                .order_by("-search_rank", "-id")
+            )
+            title_ilike = Task.objects.filter(title__icontains=term)
+            title_fts = filter_title(Task.objects.all(), term)
+
+            for label, queryset in (
+                ("search/ILIKE", ilike),
+                ("search/FTS", fts),
+                ("title/ILIKE", title_ilike),
+                ("title/FTS", title_fts),
+            ):
+                ms = self._time(queryset, options["repeat"], options["page_size"])
+                self.stdout.write(f"{term:<24}{label:<14}{queryset.count():>10}{ms:>12.1f}")
@@ -0,0 +1,60 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from apps.common.querysets import optimize_queryset
+from apps.tasks.models import Task
+from apps.tasks.serializers import TaskSerializer, FastTaskSerializer
+
+
+# (label, serializer class, fields, expand)
+CASES = [
+    ("drf full", TaskSerializer, None, None),
+    ("fast full", FastTaskSerializer, None, None),
+    ("drf relations as ids", TaskSerializer, None, ()),
+    ("fast relations as ids", FastTaskSerializer, None, ()),
+    ("drf fields=id,title,status,due", TaskSerializer, ("id", "title", "status", "due_date"), None),
+    ("fast fields=id,title,status,due", FastTaskSerializer, ("id", "title", "status", "due_date"), None),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the list serializers on pages of tasks (1000 by default): query, "
+        "serializer and JSON rendering, for full and sparse fieldsets. Seed data first"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def _run(self, serializer_class, fields, expand, page_size):
+        start = time.perf_counter()
+        queryset = optimize_queryset(
+            Task.objects.order_by("-created_at", "-id"), serializer_class, fields, expand, only=True
+        )
+        page = list(queryset[:page_size])
+        fetched = time.perf_counter()
+        data = serializer_class(page, many=True, fields=fields, expand=expand).data
+        serialized = time.perf_counter()
+        body = JSONRenderer().render(data)
+        rendered = time.perf_counter()
+        return (fetched - start, serialized - fetched, rendered - serialized, len(body))
+
+    def handle(self, *args, **options):
+        page_size, repeat = options["page_size"], options["repeat"]
+        tasks = min(Task.objects.count(), page_size)
+        if tasks < page_size:
+            self.stdout.write(self.style.WARNING(f"Only {tasks} tasks, pages will be smaller"))
+        self.stdout.write(f"Pages of {tasks} tasks, median of {repeat} runs\n")
+        self.stdout.write(f"{'serializer':<34}{'query ms':>10}{'serialize ms':>14}{'json ms':>10}{'tasks/s':>10}{'KiB':>8}")
+
+        for label, serializer_class, fields, expand in CASES:
+            # Warm up, the plan of each fieldset is computed once
+            self._run(serializer_class, fields, expand, page_size)
+            runs = [self._run(serializer_class, fields, expand, page_size) for _ in range(repeat)]
+            query, serialize, render = (statistics.median(run[i] for run in runs) for i in range(3))
+            self.stdout.write(
+                f"{label:<34}{query * 1000:>10.1f}{serialize * 1000:>14.1f}{render * 1000:>10.1f}"
+                f"{tasks / serialize if serialize else 0:>10.0f}{runs[0][3] / 1024:>8.0f}"
+            )
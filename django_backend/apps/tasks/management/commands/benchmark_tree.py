@@ -0,0 +1,53 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.tasks.seeding import seed_tree
+from apps.tasks.tree import get_task_tree
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the subtask tree of a seeded tree (10k nodes by default) against the "
+        "level-by-level walk of the subtasks relation. The seeded tree is rolled back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--branching", type=int, default=10)
+        parser.add_argument("--levels", type=int, default=4)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def _time(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def _walk(self, root):
+        """What a client does without the endpoint, one subtasks query per node"""
+        queries, pending = 0, [root]
+        while pending:
+            task = pending.pop()
+            queries += 1
+            pending.extend(task.subtasks.all())
+        return queries
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            root = seed_tree(options["branching"], options["levels"])
+            nodes = get_task_tree(root.pk, options["levels"])["rollup"]["tasks"]
+            self.stdout.write(f"Tree of {nodes} tasks, {options['levels']} levels\n")
+            self.stdout.write(f"{'path':<28}{'queries':>10}{'median ms':>12}")
+
+            rows = [
+                ("tree/CTE full depth", 1, lambda: get_task_tree(root.pk, options["levels"])),
+                ("tree/CTE depth=1 + rollup", 1, lambda: get_task_tree(root.pk, 1)),
+                ("subtasks walk", self._walk(root), lambda: self._walk(root)),
+            ]
+            for label, queries, fn in rows:
+                repeat = options["repeat"] if queries == 1 else 1
+                self.stdout.write(f"{label:<28}{queries:>10}{self._time(fn, repeat):>12.1f}")
+
+            transaction.set_rollback(True)
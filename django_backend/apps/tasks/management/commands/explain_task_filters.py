@@ -0,0 +1,127 @@
+import json
+import re
+from functools import lru_cache
+from datetime import timedelta
+from itertools import combinations
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from apps.celery.tasks import summary_queryset, CLEANUP_BATCH_SIZE
+from apps.tasks.cleanup import archived_queryset
+from apps.tasks.filters import TaskFilter
+from apps.tasks.models import Task
+
+
+# A scan whose filter throws away more rows than this, and 10x what it keeps, misses an index
+WASTED_ROWS = 1000
+
+
+def _plan_nodes(plan):
+    """Every node of an EXPLAIN (FORMAT JSON) plan, depth first"""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+@lru_cache
+def _table_columns(relation):
+    with connection.cursor() as cursor:
+        return [column.name for column in connection.introspection.get_table_description(cursor, relation)]
+
+
+def _filter_columns(node):
+    """Columns of the scanned table used by the Filter of a plan node"""
+    condition = node.get("Filter", "")
+    return tuple(
+        column for column in _table_columns(node["Relation Name"])
+        if re.search(rf"\b{column}\b", condition)
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN (ANALYZE, BUFFERS) for every TaskFilter combination and the Celery "
+        "queries, and report sequential scans, sorts and the indexes they suggest. "
+        "Seed data first, eg: manage.py seed_tasks --count 1000000"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-filters", type=int, default=2, help="Largest filter combination to explain")
+        parser.add_argument("--page-size", type=int, default=10)
+        parser.add_argument("--verbose-plans", action="store_true", help="Print the text plan of every query")
+
+    def sample_params(self):
+        """One realistic value per TaskFilter filter, taken from the current data"""
+        now = timezone.now()
+        task = Task.objects.order_by("-id").first()
+        assignment = Task.assigned_to.through.objects.order_by("-id").first()
+        return {
+            "title": task.title.split()[0] if task else "report",
+            "status": "in_progress",
+            "priority": "high",
+            "created_by": task.created_by_id if task else 1,
+            "assigned_to": assignment.user_id if assignment else 1,
+            "due_date_before": (now + timedelta(days=7)).isoformat(),
+            "due_date_after": now.isoformat(),
+        }
+
+    def access_paths(self, max_filters, page_size):
+        """(label, queryset) of the list endpoint for every filter combination, then the Celery queries"""
+        params = self.sample_params()
+        for size in range(max_filters + 1):
+            for names in combinations(params, size):
+                filterset = TaskFilter({name: params[name] for name in names}, queryset=Task.objects.all())
+                yield " & ".join(names) or "(no filter)", filterset.qs[:page_size]
+
+        yield "celery: daily summary", summary_queryset(timezone.localdate()).values_list("id")
+        yield "celery: archived cleanup", (
+            archived_queryset(timezone.now() - timedelta(days=30)).values_list("id", flat=True)[:CLEANUP_BATCH_SIZE]
+        )
+
+    def explain(self, queryset, text=False):
+        sql, params = queryset.query.sql_with_params()
+        options = "ANALYZE, BUFFERS" + ("" if text else ", FORMAT JSON")
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN ({options}) {sql}", params)
+            rows = cursor.fetchall()
+        if text:
+            return "\n".join(row[0] for row in rows)
+        plan = rows[0][0]
+        return (json.loads(plan) if isinstance(plan, str) else plan)[0]
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Tasks in table: {Task.objects.count()}\n")
+        self.stdout.write(f"{'access path':<44}{'ms':>9}{'hit':>9}{'read':>8}  issues")
+
+        suggestions = {}
+        for label, queryset in self.access_paths(options["max_filters"], options["page_size"]):
+            result = self.explain(queryset)
+            plan = result["Plan"]
+            issues = []
+            for node in _plan_nodes(plan):
+                removed, kept = node.get("Rows Removed by Filter", 0), node.get("Actual Rows", 0)
+                wasteful = removed > WASTED_ROWS and removed > 10 * kept
+                # A scan keeping most of the table is fine, a selective filter evaluated row by row is not
+                if "Relation Name" in node and wasteful:
+                    columns = _filter_columns(node)
+                    kind = "seq scan" if node["Node Type"] == "Seq Scan" else f"{removed} rows filtered"
+                    issues.append(f"{kind} {node['Relation Name']}({', '.join(columns)})")
+                    if columns:
+                        suggestions.setdefault((node["Relation Name"], columns), []).append(label)
+                elif node["Node Type"] == "Sort" and kept > options["page_size"]:
+                    issues.append(f"sort of {kept} rows on {', '.join(node['Sort Key'])}")
+
+            self.stdout.write(
+                f"{label:<44}{result['Execution Time']:>9.1f}"
+                f"{plan.get('Shared Hit Blocks', 0):>9}{plan.get('Shared Read Blocks', 0):>8}  "
+                + ("; ".join(issues) or "ok")
+            )
+            if options["verbose_plans"]:
+                self.stdout.write(self.explain(queryset, text=True) + "\n")
+
+        if not suggestions:
+            self.stdout.write(self.style.SUCCESS("\nEvery filtered access path uses a matching index"))
+            return
+        self.stdout.write(self.style.WARNING("\nFiltered scans, consider an index on:"))
+        for (relation, columns), labels in sorted(suggestions.items(), key=lambda item: -len(item[1])):
+            self.stdout.write(f"  {relation}({', '.join(columns)})  <- {len(labels)} path(s), eg {labels[0]}")
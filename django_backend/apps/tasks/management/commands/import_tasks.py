@@ -0,0 +1,56 @@
+import json
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from apps.tasks.importer import BATCH_SIZE, import_tasks
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Import tasks from an NDJSON or CSV file: rows are validated with the "
+        "TaskSerializer rules and loaded with COPY. Usernames and tag names are "
+        "resolved in bulk, unknown tags are created. Rejected rows are written "
+        "to an NDJSON file with their errors"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["ndjson", "csv"], help="Guessed from the extension by default")
+        parser.add_argument("--user", help="Creator of rows without created_by, the first user by default")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--rejects", help="Rejected rows file, <path>.rejected.ndjson by default")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["format"] or ("csv" if path.endswith(".csv") else "ndjson")
+        if options["user"]:
+            user = User.objects.filter(username=options["user"]).first()
+            if user is None:
+                raise CommandError(f"Unknown user {options['user']!r}")
+        else:
+            user = User.objects.order_by("id").first()
+            if user is None:
+                raise CommandError("No user to create the tasks, seed data first or pass --user")
+
+        start = time.perf_counter()
+
+        def progress(result):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{result.rows} rows, {result.created} created, {len(result.rejected)} rejected, "
+                f"{result.rows / elapsed:.0f} rows/s"
+            )
+
+        with open(path, encoding="utf-8", newline="") as lines:
+            result = import_tasks(lines, input_format, user.username, options["batch_size"], progress)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} of {result.rows} rows in {elapsed:.1f}s ({result.created / elapsed:.0f} tasks/s)"
+        ))
+        if result.rejected:
+            rejects = options["rejects"] or f"{os.path.splitext(path)[0]}.rejected.ndjson"
+            with open(rejects, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(rejected) + "\n" for rejected in result.rejected)
+            self.stdout.write(self.style.WARNING(f"{len(result.rejected)} rejected rows written to {rejects}"))
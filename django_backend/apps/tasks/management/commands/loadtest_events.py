@@ -0,0 +1,137 @@
+import asyncio
+import re
+import resource
+import statistics
+import time
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.common.pubsub import publish
+from apps.tasks.events import CHANNEL
+from apps.users.models import User
+
+
+SEQ = re.compile(rb'"seq": (\d+)')
+
+
+def rss_kib(pid):
+    """Resident memory of a process, from /proc"""
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+class Connection:
+    """One SSE client recording when each published message reached it"""
+
+    def __init__(self):
+        self.received = {}
+
+    async def open(self, host, port, path, token):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAuthorization: Bearer {token}\r\n"
+            f"Accept: text/event-stream\r\n\r\n".encode()
+        )
+        await self.writer.drain()
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        if not head.startswith(b"HTTP/1.1 200"):
+            raise CommandError(head.split(b"\r\n")[0].decode())
+        await self.reader.readuntil(b"retry: 5000")
+
+    async def read(self):
+        buffer = b""
+        while chunk := await self.reader.read(65536):
+            now = time.perf_counter()
+            buffer += chunk
+            for match in SEQ.finditer(buffer):
+                self.received.setdefault(int(match.group(1)), now)
+            buffer = buffer[buffer.rfind(b"\n"):]
+
+    def close(self):
+        self.writer.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Open many SSE connections to the ASGI event stream, publish events on "
+        "Redis and report connect time, fan-out latency and server memory"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://localhost:8001/api/tasks/events/")
+        parser.add_argument("--connections", type=int, default=1000)
+        parser.add_argument("--events", type=int, default=20)
+        parser.add_argument("--interval", type=float, default=0.1, help="Seconds between published events")
+        parser.add_argument("--pid", type=int, help="Server process, to report its memory")
+        parser.add_argument("--username", help="Subscribed user, the first user by default")
+
+    def handle(self, *args, **options):
+        user = User.objects.get(username=options["username"]) if options["username"] else User.objects.order_by("id").first()
+        if user is None:
+            raise CommandError("No user, seed data first")
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, options["connections"] + 100)), hard))
+        asyncio.run(self.run(user, str(AccessToken.for_user(user)), options))
+
+    async def run(self, user, token, options):
+        url = urlsplit(options["url"])
+        pid, count = options["pid"], options["connections"]
+        idle_rss = rss_kib(pid) if pid else None
+
+        connect_times = []
+
+        async def connect(connection):
+            opened = time.perf_counter()
+            await connection.open(url.hostname, url.port or 80, url.path, token)
+            connect_times.append(time.perf_counter() - opened)
+
+        start = time.perf_counter()
+        connections = [Connection() for _ in range(count)]
+        # In waves, a burst of SYNs beyond the listen backlog is dropped
+        for first in range(0, count, 100):
+            await asyncio.gather(*(connect(connection) for connection in connections[first:first + 100]))
+        connected = time.perf_counter() - start
+        readers = [asyncio.create_task(connection.read()) for connection in connections]
+        connected_rss = rss_kib(pid) if pid else None
+
+        sent = {}
+        for seq in range(options["events"]):
+            sent[seq] = time.perf_counter()
+            await asyncio.to_thread(publish, CHANNEL, {
+                "type": "task.updated",
+                "seq": seq,
+                "tasks": [{"id": 0, "users": [user.pk], "teams": []}],
+            })
+            await asyncio.sleep(options["interval"])
+        await asyncio.sleep(1)
+
+        for reader in readers:
+            reader.cancel()
+        for connection in connections:
+            connection.close()
+
+        latencies = sorted(
+            received - sent[seq]
+            for connection in connections
+            for seq, received in connection.received.items()
+        )
+        expected = count * options["events"]
+        self.stdout.write(f"{count} connections opened in {connected:.2f}s, "
+                          f"connect p50 {statistics.median(connect_times) * 1000:.1f} ms")
+        if latencies:
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            self.stdout.write(
+                f"{len(latencies)}/{expected} events delivered, fan-out latency "
+                f"p50 {statistics.median(latencies) * 1000:.1f} ms p99 {p99 * 1000:.1f} ms "
+                f"max {latencies[-1] * 1000:.1f} ms"
+            )
+        else:
+            self.stdout.write(self.style.WARNING(f"0/{expected} events delivered"))
+        if pid:
+            self.stdout.write(
+                f"Server RSS {idle_rss / 1024:.1f} MiB idle, {connected_rss / 1024:.1f} MiB connected, "
+                f"{(connected_rss - idle_rss) / count:.1f} KiB per connection"
+            )
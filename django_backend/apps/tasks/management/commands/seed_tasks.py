@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from apps.tasks.seeding import seed_users, seed_tags, seed_tasks
+
+
+class Command(BaseCommand):
+    help = "Bulk-create seeded tasks (with assignees, tags and comments) for benchmarking"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=10000, help="Number of tasks to create")
+        parser.add_argument("--users", type=int, default=50, help="Number of seeded users")
+        parser.add_argument("--tags", type=int, default=20, help="Number of seeded tags")
+        parser.add_argument("--comments", type=int, default=0, help="Comments per task")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        users = seed_users(options["users"])
+        tags = seed_tags(options["tags"])
+        created = seed_tasks(
+            options["count"],
+            users=users,
+            tags=tags,
+            comments_per_task=options["comments"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created {created} tasks"))
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:24
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+BATCH_SIZE = 10000
+
+# Same document as apps.tasks.search.search_vector_expression()
+BACKFILL_SQL = """
+UPDATE tasks SET search_vector =
+    setweight(to_tsvector('english', COALESCE(tasks.title, '')), 'A')
+    || setweight(to_tsvector('english', COALESCE((
+        SELECT STRING_AGG(tags.name, ' ')
+        FROM tasks_tags JOIN tags ON tags.id = tasks_tags.tag_id
+        WHERE tasks_tags.task_id = tasks.id
+    ), '')), 'B')
+    || setweight(to_tsvector('english', COALESCE(tasks.description, '')), 'C')
+    || setweight(to_tsvector('english', COALESCE((
+        SELECT STRING_AGG(comments.content, ' ')
+        FROM comments
+        WHERE comments.task_id = tasks.id
+    ), '')), 'D')
+WHERE tasks.id >= %s AND tasks.id < %s
+"""
+
+
+def backfill_search_vector(apps, schema_editor):
+    """Fill existing rows in id batches, each batch commits on its own"""
+    Task = apps.get_model("tasks", "Task")
+    bounds = Task.objects.aggregate(low=models.Min("id"), high=models.Max("id"))
+    if bounds["low"] is None:
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        for start in range(bounds["low"], bounds["high"] + 1, BATCH_SIZE):
+            cursor.execute(BACKFILL_SQL, [start, start + BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('tasks', '0006_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop, atomic=False),
+        AddIndexConcurrently(
+            model_name='task',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='tasks_search_vector_gin'),
+        ),
+    ]
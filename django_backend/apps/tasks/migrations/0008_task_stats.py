@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+# Same counters as apps.tasks.stats.reconcile()
+BACKFILL_SQL = """
+WITH t AS (
+    SELECT id, status, priority, estimated_hours, COALESCE(actual_hours, 0) AS actual_hours
+    FROM tasks WHERE NOT is_archived
+), assigned AS (
+    SELECT t.*, a.user_id, u.team_id FROM t
+    LEFT JOIN tasks_assigned_to a ON a.task_id = t.id
+    LEFT JOIN users u ON u.id = a.user_id
+)
+INSERT INTO task_stats (dimension, value, task_count, estimated_hours, actual_hours)
+SELECT 'status', status, COUNT(*), SUM(estimated_hours), SUM(actual_hours)
+FROM t GROUP BY status
+UNION ALL
+SELECT 'priority', priority, COUNT(*), SUM(estimated_hours), SUM(actual_hours)
+FROM t GROUP BY priority
+UNION ALL
+SELECT 'assignee', COALESCE(user_id::text, ''), COUNT(*), SUM(estimated_hours), SUM(actual_hours)
+FROM assigned GROUP BY user_id
+UNION ALL
+SELECT 'team', COALESCE(team_id::text, ''), COUNT(*), SUM(estimated_hours), SUM(actual_hours)
+FROM (SELECT DISTINCT id, team_id, estimated_hours, actual_hours FROM assigned) teams GROUP BY team_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_task_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('status', 'Task status'), ('priority', 'Task priority'), ('team', 'Team of an assignee'), ('assignee', 'Assigned user')], max_length=20)),
+                ('value', models.CharField(blank=True, max_length=50)),
+                ('task_count', models.IntegerField(default=0)),
+                ('estimated_hours', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('actual_hours', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'db_table': 'task_stats',
+                'ordering': ['dimension', 'value'],
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'value'), name='task_stats_dimension_value_unique')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
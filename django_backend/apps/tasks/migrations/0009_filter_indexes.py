@@ -0,0 +1,59 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indexes are built without blocking writes, the old ones are dropped once the new ones exist
+    atomic = False
+
+    dependencies = [
+        ('tasks', '0008_task_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='tasks_status_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['priority', 'created_at', 'id'], name='tasks_priority_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['created_by', 'created_at', 'id'], name='tasks_creator_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['due_date'], name='tasks_open_due_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_archived', True)), fields=['id'], name='tasks_archived_id_idx'),
+        ),
+        # assigned_to filter: tasks of a user read from the index alone.
+        # The through table is auto-created, so the index is not part of the model state
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_assigned_to_user_task_idx "
+            "ON tasks_assigned_to (user_id, task_id)",
+            "DROP INDEX CONCURRENTLY IF EXISTS tasks_assigned_to_user_task_idx",
+        ),
+        RemoveIndexConcurrently(
+            model_name='task',
+            name='tasks_status_031d4c_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='task',
+            name='tasks_priorit_a9efa1_idx',
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='created_by',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tasks_created', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:03
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('task_id', models.BigIntegerField()),
+                ('txid', models.BigIntegerField()),
+                ('changed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'task_changes',
+                'indexes': [models.Index(fields=['txid', 'id'], name='task_changes_position_idx'), django.contrib.postgres.indexes.BrinIndex(fields=['changed_at'], name='task_changes_changed_at_brin')],
+            },
+        ),
+    ]
@@ -0,0 +1,160 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def move_templates(apps, schema_editor):
+    """
+    Copies the templates out of `tasks` (same ids, parents between templates
+    kept) then deletes their task rows. A tombstone is logged for each one so
+    delta sync clients drop them, the task_stats counters are fixed by the
+    next reconcile run.
+    """
+    LegacyTaskTemplate = apps.get_model("tasks", "LegacyTaskTemplate")
+    Task = apps.get_model("tasks", "Task")
+    template_ids = list(LegacyTaskTemplate.objects.values_list("pk", flat=True))
+    if not template_ids:
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO task_templates (
+                id, title, description, status, priority, due_date, estimated_hours,
+                created_by_id, parent_template_id, metadata, created_at, updated_at
+            )
+            SELECT t.id, t.title, t.description, t.status, t.priority, t.due_date, t.estimated_hours,
+                   t.created_by_id, CASE WHEN t.parent_task_id = ANY(%(ids)s) THEN t.parent_task_id END,
+                   t.metadata, t.created_at, t.updated_at
+            FROM tasks t WHERE t.id = ANY(%(ids)s)
+            """,
+            {"ids": template_ids},
+        )
+        cursor.execute(
+            "INSERT INTO task_templates_assigned_to (tasktemplate_id, user_id) "
+            "SELECT task_id, user_id FROM tasks_assigned_to WHERE task_id = ANY(%(ids)s)",
+            {"ids": template_ids},
+        )
+        cursor.execute(
+            "INSERT INTO task_templates_tags (tasktemplate_id, tag_id) "
+            "SELECT task_id, tag_id FROM tasks_tags WHERE task_id = ANY(%(ids)s)",
+            {"ids": template_ids},
+        )
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence('task_templates', 'id'), MAX(id)) FROM task_templates"
+        )
+        cursor.execute(
+            "INSERT INTO task_changes (task_id, txid, changed_at) "
+            "SELECT unnest(%(ids)s::bigint[]), pg_current_xact_id()::text::bigint, now()",
+            {"ids": template_ids},
+        )
+    # Comments, assignments and the task_templates_legacy rows go with them, subtasks are detached
+    Task.objects.filter(pk__in=template_ids).delete()
+
+
+def restore_templates(apps, schema_editor):
+    """
+    Reverse of move_templates(): each template becomes a task again, with
+    its task_templates_legacy row. Templates created since the migration
+    may have ids already used by tasks, so every template gets a new task
+    id, and subtemplates point at the new id of their parent. The search
+    document is rebuilt for the new tasks. Their creation is logged for
+    delta sync. As in the forward direction, the next reconcile run fixes
+    the task_stats counters.
+    """
+    TaskTemplate = apps.get_model("tasks", "TaskTemplate")
+    if not TaskTemplate.objects.exists():
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMP TABLE template_tasks AS "
+            "SELECT id AS template_id, nextval(pg_get_serial_sequence('tasks', 'id')) AS task_id FROM task_templates"
+        )
+        cursor.execute(
+            """
+            INSERT INTO tasks (
+                id, title, description, status, priority, due_date, estimated_hours, actual_hours,
+                created_by_id, parent_task_id, metadata, created_at, updated_at, is_archived
+            )
+            SELECT m.task_id, t.title, t.description, t.status, t.priority, COALESCE(t.due_date, t.created_at),
+                   t.estimated_hours, NULL, t.created_by_id, p.task_id, t.metadata, t.created_at, t.updated_at, false
+            FROM task_templates t
+            JOIN template_tasks m ON m.template_id = t.id
+            LEFT JOIN template_tasks p ON p.template_id = t.parent_template_id
+            """
+        )
+        cursor.execute("INSERT INTO task_templates_legacy (task_ptr_id) SELECT task_id FROM template_tasks")
+        cursor.execute(
+            "INSERT INTO tasks_assigned_to (task_id, user_id) "
+            "SELECT m.task_id, a.user_id FROM task_templates_assigned_to a "
+            "JOIN template_tasks m ON m.template_id = a.tasktemplate_id"
+        )
+        cursor.execute(
+            "INSERT INTO tasks_tags (task_id, tag_id) "
+            "SELECT m.task_id, t.tag_id FROM task_templates_tags t "
+            "JOIN template_tasks m ON m.template_id = t.tasktemplate_id"
+        )
+        # apps.tasks.search.search_vector_expression() of a task without comments
+        cursor.execute(
+            """
+            UPDATE tasks SET search_vector =
+                setweight(to_tsvector('english', title), 'A')
+                || setweight(to_tsvector('english', COALESCE((
+                    SELECT string_agg(g.name, ' ' ORDER BY g.name) FROM tasks_tags tt JOIN tags g ON g.id = tt.tag_id
+                    WHERE tt.task_id = tasks.id
+                ), '')), 'B')
+                || setweight(to_tsvector('english', description), 'C')
+            WHERE id IN (SELECT task_id FROM template_tasks)
+            """
+        )
+        cursor.execute(
+            "INSERT INTO task_changes (task_id, txid, changed_at) "
+            "SELECT task_id, pg_current_xact_id()::text::bigint, now() FROM template_tasks"
+        )
+        cursor.execute("DROP TABLE template_tasks")
+        # The tables are altered next, Postgres refuses while foreign key checks are pending
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_task_changes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RenameModel(
+            old_name='TaskTemplate',
+            new_name='LegacyTaskTemplate',
+        ),
+        migrations.AlterModelTable(
+            name='legacytasktemplate',
+            table='task_templates_legacy',
+        ),
+        migrations.CreateModel(
+            name='TaskTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('status', models.CharField(choices=[('todo', 'Task pending to be done'), ('in_progress', 'Task in progress'), ('done', 'Completed task')], default='todo', max_length=20)),
+                ('priority', models.CharField(choices=[('low', 'Low priority'), ('medium', 'Medium priority'), ('high', 'High priority')], default='medium', max_length=20)),
+                ('due_date', models.DateTimeField(blank=True, null=True)),
+                ('estimated_hours', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('metadata', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assigned_to', models.ManyToManyField(blank=True, related_name='task_templates_assigned', to=settings.AUTH_USER_MODEL)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_templates', to=settings.AUTH_USER_MODEL)),
+                ('parent_template', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='subtemplates', to='tasks.tasktemplate')),
+                ('tags', models.ManyToManyField(blank=True, related_name='task_templates', to='tasks.tag')),
+            ],
+            options={
+                'db_table': 'task_templates',
+                'ordering': ['title'],
+            },
+        ),
+        migrations.RunPython(move_templates, restore_templates, elidable=False),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # Separate from 0011: Postgres refuses to drop a table with the deletes of 0011 pending in the transaction
+    dependencies = [
+        ('tasks', '0011_task_template_table'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='LegacyTaskTemplate',
+        ),
+    ]
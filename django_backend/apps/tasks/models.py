@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import BrinIndex, GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 
 class Tag(models.Model):
@@ -54,6 +56,8 @@ class Task(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name="tasks_created",
+        # Covered by the (created_by, created_at, id) index
+        db_index=False,
     )
     assigned_to = models.ManyToManyField(
         settings.AUTH_USER_MODEL,
@@ -79,12 +83,24 @@ class Task(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_archived = models.BooleanField(default=False)
 
+    # Full-text search document, maintained by apps.tasks.signals
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         db_table = "tasks"
         indexes = [
-            models.Index(fields=["status"]),
-            models.Index(fields=["priority"]),
+            # Filter on one column, newest first (list endpoint, keyset pagination)
+            models.Index(fields=["status", "created_at", "id"], name="tasks_status_created_idx"),
+            models.Index(fields=["priority", "created_at", "id"], name="tasks_priority_created_idx"),
+            models.Index(fields=["created_by", "created_at", "id"], name="tasks_creator_created_idx"),
             models.Index(fields=["due_date"]),
+            # Keyset pagination: ORDER BY created_at DESC, id DESC
+            models.Index(fields=["created_at", "id"]),
+            # Daily summary: open tasks due until today
+            models.Index(fields=["due_date"], condition=models.Q(is_archived=False), name="tasks_open_due_idx"),
+            # Archived cleanup: id ordered batches of archived tasks
+            models.Index(fields=["id"], condition=models.Q(is_archived=True), name="tasks_archived_id_idx"),
+            GinIndex(fields=["search_vector"], name="tasks_search_vector_gin"),
         ]
         ordering = ["-created_at"]
 
@@ -118,18 +134,119 @@ class Comment(models.Model):
 
     class Meta:
         db_table = "comments"
+        indexes = [
+            # Keyset pagination of a task's comments
+            models.Index(fields=["task", "created_at", "id"]),
+        ]
         ordering = ["created_at"]
 
     def __str__(self):
         return f"Comment by {self.created_by} on {self.task}"
 
 
-class TaskTemplate(Task):
+class TaskStat(models.Model):
     """
-    Template for tasks.
-    Inherits all fields from Task but is stored separately in its own table.
-    Used to create new tasks based on pre-defined templates.
+    Counters of the non archived tasks per status, priority, team and assignee.
+    Maintained incrementally by apps.tasks.stats and reconciled by Celery.
     """
+
+    DIMENSION_CHOICES = [
+        ("status", "Task status"),
+        ("priority", "Task priority"),
+        ("team", "Team of an assignee"),
+        ("assignee", "Assigned user"),
+    ]
+
+    # Core fields
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    # Status or priority, team or user id, "" for tasks without assignee/team
+    value = models.CharField(max_length=50, blank=True)
+
+    # Aggregates
+    task_count = models.IntegerField(default=0)
+    estimated_hours = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    actual_hours = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = "task_stats"
+        constraints = [
+            models.UniqueConstraint(fields=["dimension", "value"], name="task_stats_dimension_value_unique"),
+        ]
+        ordering = ["dimension", "value"]
+
+    def __str__(self):
+        return f"{self.dimension}={self.value}: {self.task_count}"
+
+
+class TaskChange(models.Model):
+    """
+    Append only log of the tasks that changed, read by the delta sync endpoint.
+    Rows are ordered by the transaction that wrote them, see apps.tasks.changes.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    # No foreign key, rows of deleted tasks are their tombstones
+    task_id = models.BigIntegerField()
+    txid = models.BigIntegerField()
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "task_changes"
+        indexes = [
+            models.Index(fields=["txid", "id"], name="task_changes_position_idx"),
+            # Rows are appended in time order, retention scans a block range index
+            BrinIndex(fields=["changed_at"], name="task_changes_changed_at_brin"),
+        ]
+
+    def __str__(self):
+        return f"Task {self.task_id} changed in transaction {self.txid}"
+
+
+class TaskTemplate(models.Model):
+    """
+    Template for tasks, stored in its own table so templates never show up
+    among the tasks. Subtemplates (parent_template) describe the subtask tree
+    created with the template, see apps.tasks.instantiation.
+    """
+
+    # Core fields, copied to the tasks created from the template
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES, default="todo")
+    priority = models.CharField(max_length=20, choices=Task.PRIORITY_CHOICES, default="medium")
+    # Default due date of the tasks, instantiation can give another one
+    due_date = models.DateTimeField(null=True, blank=True)
+    estimated_hours = models.DecimalField(max_digits=5, decimal_places=2)
+
+    # Relationships
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="task_templates",
+    )
+    assigned_to = models.ManyToManyField(
+        settings.AUTH_USER_MODEL,
+        related_name="task_templates_assigned",
+        blank=True,
+    )
+    tags = models.ManyToManyField(
+        Tag,
+        related_name="task_templates",
+        blank=True,
+    )
+    parent_template = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="subtemplates",
+    )
+
+    # Metadata
+    metadata = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
         db_table = "task_templates"
         ordering = ["title"]
@@ -0,0 +1,214 @@
+import gzip
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+
+ReportFile = namedtuple("ReportFile", ["name", "size", "modified", "gzip_size"])
+
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Read size of ranged responses
+CHUNK_SIZE = 64 * 1024
+
+# (directory, its mtime) -> files, rebuilt when a report is added, replaced or removed
+_index = {}
+_index_lock = threading.Lock()
+
+
+def report_index(directory=None):
+    """
+    Reports of `directory` newest first, with their size, mtime and the size
+    of their .gz variant. One scandir per change of the directory: writing a
+    report renames it into place, which moves the directory mtime, so a
+    request only pays one stat while nothing changes.
+    """
+    directory = directory or settings.REPORTS_DIR
+    try:
+        version = os.stat(directory).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    cached = _index.get(directory)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    entries = {}
+    with os.scandir(directory) as scan:
+        for entry in scan:
+            # Hidden files are reports still being written
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            entries[entry.name] = entry.stat()
+    files = []
+    for name, stat in entries.items():
+        if name.endswith(".gz") and name[:-3] in entries:
+            continue
+        variant = entries.get(f"{name}.gz")
+        fresh = variant is not None and variant.st_mtime_ns >= stat.st_mtime_ns
+        files.append(ReportFile(
+            name,
+            stat.st_size,
+            datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+            variant.st_size if fresh else None,
+        ))
+    files.sort(key=lambda file: file.modified, reverse=True)
+    with _index_lock:
+        _index[directory] = (version, files)
+    return files
+
+
+def compress_report(filename):
+    """
+    Writes the .gz variant next to a report, served to clients accepting
+    gzip. It gets the mtime of the report, a variant older than its report
+    is stale and never served.
+    """
+    directory = os.path.dirname(filename)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".gz.tmp")
+    try:
+        with open(filename, "rb") as source, os.fdopen(fd, "wb") as raw, \
+                gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as target:
+            shutil.copyfileobj(source, target, CHUNK_SIZE * 16)
+        os.chmod(tmp_path, 0o644)
+        stat = os.stat(filename)
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_path, f"{filename}.gz")
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return f"{filename}.gz"
+
+
+def find_report(filename, directory=None):
+    """Path and stat of a report, None for hidden, nested or missing files"""
+    directory = directory or settings.REPORTS_DIR
+    if filename != os.path.basename(filename) or filename.startswith("."):
+        return None
+    path = os.path.join(directory, filename)
+    try:
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    if not os.path.isfile(path):
+        return None
+    return path, stat
+
+
+def make_etag(stat, encoding=None):
+    # The format nginx uses for static files, the ETag stays the same across delivery modes
+    etag = f"{int(stat.st_mtime):x}-{stat.st_size:x}"
+    return f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+
+
+def accepts_gzip(request):
+    return "gzip" in request.headers.get("Accept-Encoding", "")
+
+
+def parse_range(request, size, etag, last_modified):
+    """
+    (start, end) inclusive of a single byte range request, None to send the
+    whole file, "unsatisfiable" for a 416. Multiple ranges and a stale
+    If-Range get the whole file.
+    """
+    header = request.headers.get("Range")
+    if not header or not size:
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range:
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            if if_range != etag:
+                return None
+        elif parse_http_date_safe(if_range) != last_modified:
+            return None
+
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range, the last N bytes
+        if int(last) == 0:
+            return "unsatisfiable"
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return "unsatisfiable"
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def read_range(path, start, end):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def serve_report(request, filename, path, stat):
+    """
+    Download response of a report. With REPORTS_DELIVERY=accel the proxy
+    sends the file (X-Accel-Redirect to REPORTS_ACCEL_PREFIX) and handles
+    ranges and the .gz variant itself. Otherwise the file is sent from here,
+    with ETag and Last-Modified validators, single Range requests and the .gz
+    variant for clients accepting gzip.
+    """
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    if content_type.startswith("text/"):
+        content_type += "; charset=utf-8"
+    disposition = content_disposition_header(True, filename)
+
+    if settings.REPORTS_DELIVERY == "accel":
+        response = HttpResponse(content_type=content_type, headers={"Content-Disposition": disposition})
+        response["X-Accel-Redirect"] = settings.REPORTS_ACCEL_PREFIX.rstrip("/") + "/" + filename
+        return response
+
+    encoding = None
+    if accepts_gzip(request):
+        variant = find_report(f"{filename}.gz", os.path.dirname(path))
+        # A variant older than the report was left by a previous generation
+        if variant is not None and variant[1].st_mtime_ns >= stat.st_mtime_ns:
+            path, stat = variant
+            encoding = "gzip"
+
+    etag = make_etag(stat, encoding)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        byte_range = parse_range(request, stat.st_size, etag, last_modified)
+        if byte_range == "unsatisfiable":
+            response = HttpResponse(status=416, headers={"Content-Range": f"bytes */{stat.st_size}"})
+        elif byte_range is not None:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                read_range(path, start, end),
+                status=206,
+                content_type=content_type,
+                headers={"Content-Disposition": disposition},
+            )
+            response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            response["Content-Length"] = end - start + 1
+        else:
+            # Whole file, sent with sendfile by servers providing wsgi.file_wrapper
+            response = FileResponse(open(path, "rb"), as_attachment=True, filename=filename, content_type=content_type)
+    if encoding and response.status_code in (200, 206):
+        response["Content-Encoding"] = encoding
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
@@ -0,0 +1,99 @@
+import re
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F, Func, IntegerField, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Coalesce
+from rest_framework import filters
+from rest_framework.settings import api_settings
+from .models import (
+    Task,
+    Comment,
+)
+
+
+SEARCH_CONFIG = "english"
+
+# Searchable words for raw tsquery building, everything else is dropped
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _related_text(model, field):
+    """Subquery concatenating `field`, in order, over the rows of `model` that belong to the outer task"""
+    rows = model.objects.filter(task=OuterRef("pk")).order_by().values("task")
+    text = Subquery(rows.annotate(text=StringAgg(field, " ", order_by=field)).values("text"))
+    return Coalesce(text, Value(""), output_field=TextField())
+
+
+def search_vector_expression():
+    """
+    Weighted document of a task:
+    A -> title, B -> tag names, C -> description, D -> comments
+    """
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(_related_text(Task.tags.through, "tag__name"), weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+        + SearchVector(_related_text(Comment, "content"), weight="D", config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(task_ids):
+    """Recomputes the search document of the given tasks in one UPDATE"""
+    return Task.objects.filter(pk__in=task_ids).update(search_vector=search_vector_expression())
+
+
+def title_query(value):
+    """
+    Word prefix query restricted to the title weight: ?title=rep matches
+    "Reports" but, unlike a substring match, ?title=port does not.
+    None if `value` has no word at all.
+    """
+    words = WORD_RE.findall(value.lower())
+    if not words:
+        return None
+    return SearchQuery(" & ".join(f"{word}:*A" for word in words), search_type="raw", config=SEARCH_CONFIG)
+
+
+def filter_title(queryset, value):
+    """
+    Tasks whose title matches title_query(value) through the GIN index.
+    Titles made of stop words only ("the", "to do") give an empty query,
+    those fall back to a case-insensitive substring match. numnode() of a
+    constant query is evaluated at planning time, so only one of the two
+    conditions is left in the plan.
+    """
+    query = title_query(value)
+    if query is None:
+        return queryset.filter(title__icontains=value)
+    return queryset.alias(title_terms=Func(query, function="numnode", output_field=IntegerField())).filter(
+        Q(title_terms__gt=0, search_vector=query) | Q(title_terms=0, title__icontains=value)
+    )
+
+
+def search_terms(value):
+    """?search= value split into terms the way SearchFilter does"""
+    return filters.search_smart_split(value.replace("\x00", ""))
+
+
+def search_tasks(queryset, terms, ranked=True):
+    """Tasks matching all `terms` through the GIN index, most relevant first when `ranked`"""
+    if not terms:
+        return queryset
+    query = SearchQuery(" ".join(terms), search_type="websearch", config=SEARCH_CONFIG)
+    queryset = queryset.filter(search_vector=query)
+    if not ranked:
+        return queryset
+    return queryset.annotate(search_rank=SearchRank(F("search_vector"), query)).order_by("-search_rank", "-id")
+
+
+class TaskSearchFilter(filters.SearchFilter):
+    """
+    ?search= backed by the tasks.search_vector GIN index.
+    Results are ranked by relevance unless the client asks for an explicit ?ordering=.
+    """
+
+    search_description = "Full-text search in task title, tags, description and comments."
+
+    def filter_queryset(self, request, queryset, view):
+        ranked = not request.query_params.get(api_settings.ORDERING_PARAM)
+        return search_tasks(queryset, self.get_search_terms(request), ranked)
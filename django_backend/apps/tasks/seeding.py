@@ -0,0 +1,136 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from apps.users.models import Team
+from .models import (
+    Tag,
+    Task,
+    Comment,
+)
+from .search import update_search_vector
+from .stats import record_created
+from . import changes
+
+
+User = get_user_model()
+
+# Words used to build seeded titles and descriptions, so search has something to match
+VOCABULARY = (
+    "report deploy database backend frontend invoice customer release migrate review "
+    "design api cache queue payment login search export import dashboard metrics alert "
+    "budget meeting roadmap onboarding security audit backup network storage mobile"
+).split()
+
+
+def seed_users(count, teams=3):
+    """Create `count` users spread over `teams` teams, all with an unusable password"""
+    team_objs = [Team.objects.get_or_create(name=f"seed-team-{i}")[0] for i in range(teams)]
+    users = [
+        User(username=f"seed-user-{i}", email=f"seed-user-{i}@example.com", team=team_objs[i % teams])
+        for i in range(count)
+    ]
+    for user in users:
+        user.set_unusable_password()
+    User.objects.bulk_create(users, ignore_conflicts=True)
+    return list(User.objects.filter(username__startswith="seed-user-"))
+
+
+def seed_tags(count):
+    """Create `count` tags"""
+    Tag.objects.bulk_create([Tag(name=f"seed-tag-{i}") for i in range(count)], ignore_conflicts=True)
+    return list(Tag.objects.filter(name__startswith="seed-tag-"))
+
+
+def seed_tasks(count, users=None, tags=None, assignees_per_task=2, tags_per_task=2,
+               comments_per_task=0, batch_size=2000, seed=0, **overrides):
+    """
+    Bulk-create `count` tasks with assignees, tags and comments.
+    Inserts go through bulk_create in batches, so millions of rows are feasible.
+    Returns the number of tasks created.
+    """
+    rng = random.Random(seed)
+    users = users or seed_users(20)
+    tags = tags or seed_tags(10)
+    now = timezone.now()
+
+    AssignedTo = Task.assigned_to.through
+    TaskTags = Task.tags.through
+
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        tasks = Task.objects.bulk_create([
+            Task(**{
+                "title": " ".join(rng.sample(VOCABULARY, 3)).capitalize(),
+                "description": " ".join(rng.choices(VOCABULARY, k=rng.randint(10, 60))),
+                "status": rng.choice(Task.STATUS_CHOICES)[0],
+                "priority": rng.choice(Task.PRIORITY_CHOICES)[0],
+                "due_date": now + timedelta(days=rng.randint(-60, 60)),
+                "estimated_hours": Decimal(rng.randint(1, 400)) / 4,
+                "created_by": rng.choice(users),
+                **overrides,
+            })
+            for _ in range(size)
+        ])
+
+        AssignedTo.objects.bulk_create([
+            AssignedTo(task_id=task.id, user_id=user.id)
+            for task in tasks
+            for user in rng.sample(users, min(assignees_per_task, len(users)))
+        ])
+        TaskTags.objects.bulk_create([
+            TaskTags(task_id=task.id, tag_id=tag.id)
+            for task in tasks
+            for tag in rng.sample(tags, min(tags_per_task, len(tags)))
+        ])
+        if comments_per_task:
+            Comment.objects.bulk_create([
+                Comment(task=task, created_by=rng.choice(users), content=f"Seed comment {n}")
+                for task in tasks
+                for n in range(comments_per_task)
+            ])
+
+        # bulk_create skips signals, build the search documents and stats of the batch here
+        update_search_vector([task.id for task in tasks])
+        record_created([task.id for task in tasks])
+        changes.record([task.id for task in tasks])
+
+        created += size
+
+    return created
+
+
+def seed_tree(branching, levels, users=None, seed=0):
+    """
+    Bulk-create a task with `branching` subtasks per task over `levels`
+    levels, one bulk insert per level. Returns the root task.
+    """
+    rng = random.Random(seed)
+    users = users or seed_users(20)
+    now = timezone.now()
+
+    def build(parent):
+        return Task(
+            title=" ".join(rng.sample(VOCABULARY, 3)).capitalize(),
+            description=" ".join(rng.choices(VOCABULARY, k=10)),
+            status=rng.choice(Task.STATUS_CHOICES)[0],
+            priority=rng.choice(Task.PRIORITY_CHOICES)[0],
+            due_date=now + timedelta(days=rng.randint(-60, 60)),
+            estimated_hours=Decimal(rng.randint(1, 40)) / 4,
+            created_by=rng.choice(users),
+            parent_task=parent,
+        )
+
+    level = Task.objects.bulk_create([build(None)])
+    task_ids = [level[0].id]
+    for _ in range(levels):
+        level = Task.objects.bulk_create([build(parent) for parent in level for _ in range(branching)], batch_size=2000)
+        task_ids += [task.id for task in level]
+
+    # bulk_create skips signals
+    update_search_vector(task_ids)
+    record_created(task_ids)
+    changes.record(task_ids)
+    return Task.objects.get(pk=task_ids[0])
@@ -1,12 +1,24 @@
 from rest_framework import serializers
+from apps.common.serializers import SparseFieldsMixin, FastRepresentationMixin
 from apps.users.serializers import UserSerializer
+from .assignments import assign_users, ASSIGN_MODES
+from .export import FORMATS
+from .instantiation import template_tree, MAX_TASKS
+from .tree import creates_cycle, DEFAULT_DEPTH, MAX_DEPTH
 from .models import (
+    Tag,
     Task,
     Comment,
+    TaskTemplate,
 )
 
 
-class TaskSerializer(serializers.ModelSerializer):
+CYCLE_ERROR = "A task cannot be a subtask of itself or of one of its subtasks."
+
+
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ("created_by", "assigned_to")
+
     created_by = UserSerializer(read_only=True)
     assigned_to = UserSerializer(many=True, read_only=True)
 
@@ -41,26 +53,211 @@ class TaskSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "created_by", "created_at", "updated_at"]
 
+    def validate_parent_task(self, value):
+        if self.instance is not None and value is not None and creates_cycle(self.instance.pk, value.pk):
+            raise serializers.ValidationError(CYCLE_ERROR)
+        return value
 
-class TaskAssignSerializer(serializers.Serializer):
-    assigned_to_ids = serializers.PrimaryKeyRelatedField(
+
+class FastTaskSerializer(FastRepresentationMixin, TaskSerializer):
+    """
+    TaskSerializer used to render list pages.
+    Same output, built without one DRF field call per value.
+    """
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that resolves pks from the `{pk: object}` dicts in
+    `context["preloaded"]`, keyed by model. Falls back to a query per pk when
+    the model was not preloaded.
+    """
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get("preloaded", {}).get(self.get_queryset().model)
+        if preloaded is None:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            obj = preloaded.get(int(data))
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if obj is None:
+            self.fail("does_not_exist", pk_value=data)
+        return obj
+
+
+class BulkTaskSerializer(TaskSerializer):
+    """
+    TaskSerializer used by the bulk endpoint.
+    Same validation rules, but related objects are looked up in the batch
+    preloaded by apps.tasks.bulk instead of one query per id.
+    """
+
+    assigned_to_ids = PreloadedPrimaryKeyRelatedField(
         many=True,
         queryset=Task._meta.get_field("assigned_to").related_model.objects.all(),
+        source="assigned_to",
         write_only=True,
+        required=False,
     )
+    tags = PreloadedPrimaryKeyRelatedField(many=True, queryset=Tag.objects.all(), required=False)
+    parent_task = PreloadedPrimaryKeyRelatedField(queryset=Task.objects.all(), required=False, allow_null=True)
+
+    def validate_parent_task(self, value):
+        # Checked for the whole batch at once by apps.tasks.bulk
+        return value
+
+
+def validate_existing_ids(model, ids, label):
+    """Checks that every id exists with a single query, returns the ids without duplicates"""
+    ids = list(dict.fromkeys(ids))
+    found = set(model.objects.filter(pk__in=ids).values_list("pk", flat=True))
+    missing = [pk for pk in ids if pk not in found]
+    if missing:
+        raise serializers.ValidationError(f"Invalid {label} ids - objects do not exist: {missing}")
+    return ids
+
+
+class TaskAssignSerializer(serializers.Serializer):
+    """
+    add     -> assign the users, keeping the current assignees (default)
+    replace -> the users become the only assignees
+    remove  -> unassign the users
+    """
+    assigned_to_ids = serializers.ListField(child=serializers.IntegerField(), write_only=True)
+    mode = serializers.ChoiceField(choices=ASSIGN_MODES, default="add", write_only=True)
+
+    def validate_assigned_to_ids(self, value):
+        return validate_existing_ids(Task._meta.get_field("assigned_to").related_model, value, "user")
 
     def update(self, instance, validated_data):
-        users = validated_data.get("assigned_to_ids", [])
-        for user in users:
-            instance.assigned_to.add(user)
-        instance.save()
+        assign_users([instance.pk], validated_data["assigned_to_ids"], validated_data["mode"])
         return instance
 
 
+class TaskBulkAssignSerializer(TaskAssignSerializer):
+    """Assigns the same users to many tasks in one request"""
+    task_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=5000)
+
+    def validate_task_ids(self, value):
+        return validate_existing_ids(Task, value, "task")
+
+    def create(self, validated_data):
+        assign_users(validated_data["task_ids"], validated_data["assigned_to_ids"], validated_data["mode"])
+        return validated_data
+
+
 class CommentSerializer(serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
 
     class Meta:
         model = Comment
         fields = ["id", "task", "content", "created_by", "created_at"]
-        read_only_fields = ["id", "task", "created_by", "created_at"]
\ No newline at end of file
+        read_only_fields = ["id", "task", "created_by", "created_at"]
+
+
+class TaskTemplateSerializer(serializers.ModelSerializer):
+    created_by = UserSerializer(read_only=True)
+
+    class Meta:
+        model = TaskTemplate
+        fields = [
+            "id",
+            "title",
+            "description",
+            "status",
+            "priority",
+            "due_date",
+            "estimated_hours",
+            "created_by",
+            "assigned_to",
+            "tags",
+            "parent_template",
+            "metadata",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = ["id", "created_by", "created_at", "updated_at"]
+
+    def validate_parent_template(self, value):
+        if self.instance is not None and value is not None:
+            if value.pk in {template.pk for template in template_tree(self.instance)}:
+                raise serializers.ValidationError(
+                    "A template cannot be a subtemplate of itself or of one of its subtemplates."
+                )
+        return value
+
+
+class TaskTemplateInstantiateSerializer(serializers.Serializer):
+    """
+    Tasks to create from context["template"]. `subtasks` also creates its
+    subtemplates as subtasks, `due_date` replaces the due dates of the templates.
+    """
+    count = serializers.IntegerField(min_value=1, max_value=1000, default=1)
+    subtasks = serializers.BooleanField(default=True)
+    due_date = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        tree = template_tree(self.context["template"], attrs["subtasks"])
+        if attrs["count"] * len(tree) > MAX_TASKS:
+            raise serializers.ValidationError(
+                f"At most {MAX_TASKS} tasks per request, each copy of this template creates {len(tree)}."
+            )
+        if "due_date" not in attrs and any(template.due_date is None for template in tree):
+            raise serializers.ValidationError({"due_date": ["This field is required, the template has no due date."]})
+        attrs["tree"] = tree
+        return attrs
+
+
+class TaskTreeQuerySerializer(serializers.Serializer):
+    """Query parameters of the subtask tree"""
+    depth = serializers.IntegerField(min_value=0, max_value=MAX_DEPTH, default=DEFAULT_DEPTH)
+
+
+class TaskChangesQuerySerializer(serializers.Serializer):
+    """Query parameters of the delta sync, without `since` only the current cursor is returned"""
+    since = serializers.CharField(required=False)
+    page_size = serializers.IntegerField(min_value=1, max_value=1000, default=500)
+
+
+class TaskExportQuerySerializer(serializers.Serializer):
+    """Format of /api/tasks/export/, the other parameters are the filters of /api/tasks/"""
+    output = serializers.ChoiceField(choices=list(FORMATS), default="ndjson")
+
+
+class StatTotalsSerializer(serializers.Serializer):
+    count = serializers.IntegerField()
+    estimated_hours = serializers.DecimalField(max_digits=14, decimal_places=2)
+    actual_hours = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class StatusStatSerializer(StatTotalsSerializer):
+    status = serializers.CharField()
+
+
+class PriorityStatSerializer(StatTotalsSerializer):
+    priority = serializers.CharField()
+
+
+class TeamStatSerializer(StatTotalsSerializer):
+    # null for tasks without assignee or whose assignees have no team
+    id = serializers.IntegerField(allow_null=True)
+    name = serializers.CharField(allow_null=True)
+
+
+class AssigneeStatSerializer(StatTotalsSerializer):
+    # null for unassigned tasks
+    id = serializers.IntegerField(allow_null=True)
+    username = serializers.CharField(allow_null=True)
+
+
+class TaskStatsSerializer(serializers.Serializer):
+    """Counts and hour sums of the non archived tasks, see apps.tasks.stats"""
+    total = StatTotalsSerializer()
+    by_status = StatusStatSerializer(many=True)
+    by_priority = PriorityStatSerializer(many=True)
+    by_team = TeamStatSerializer(many=True)
+    by_assignee = AssigneeStatSerializer(many=True)
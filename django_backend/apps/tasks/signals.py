@@ -0,0 +1,187 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.conf import settings
+from django.dispatch import receiver
+from django.utils import timezone
+from apps.common.cache import bump_versions
+from .models import (
+    Tag,
+    Task,
+    Comment,
+)
+from .search import update_search_vector
+from . import changes, events, stats
+
+
+# Fields of a task that end up in its own search document
+SEARCHABLE_FIELDS = {"title", "description"}
+
+# Fields of a task counted by apps.tasks.stats
+COUNTED_FIELDS = {"status", "priority", "estimated_hours", "actual_hours", "is_archived"}
+
+
+def changed_task_ids(instance, action, reverse, pk_set, accessor):
+    """
+    Ids of the tasks affected by an m2m_changed signal, whichever side
+    the relation was changed from. Returns None for the "pre_*" actions.
+    """
+    # user.tasks_assigned.clear() does not provide the task ids, keep them from pre_clear
+    if reverse and action == "pre_clear":
+        instance._cleared_task_ids = list(getattr(instance, accessor).values_list("pk", flat=True))
+        return None
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return None
+
+    if not reverse:
+        return [instance.pk]
+    if action == "post_clear":
+        return instance.__dict__.pop("_cleared_task_ids", [])
+    return list(pk_set)
+
+
+def touch_tasks(task_ids):
+    """Moves updated_at of tasks whose relations changed, the list ETags are built from it"""
+    Task.objects.filter(pk__in=task_ids).update(updated_at=timezone.now())
+
+
+# Task
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    bump_versions(f"task:{instance.pk}")
+    if update_fields is None or SEARCHABLE_FIELDS & set(update_fields):
+        update_search_vector([instance.pk])
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    bump_versions(f"task:{instance.pk}")
+
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def task_assignees_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    task_ids = changed_task_ids(instance, action, reverse, pk_set, "tasks_assigned")
+    if task_ids:
+        touch_tasks(task_ids)
+        changes.record(task_ids)
+        events.emit("task.assigned", task_ids)
+        bump_versions(*(f"task:{pk}" for pk in task_ids))
+
+
+# Delta sync change log
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def log_task_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        changes.record([instance.pk])
+
+
+# Real-time events, see apps.tasks.events
+
+@receiver(post_save, sender=Task)
+def publish_task_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        events.emit("task.created" if created else "task.updated", [instance.pk])
+
+
+@receiver(pre_delete, sender=Task)
+def remember_task_audience(sender, instance, **kwargs):
+    # Assignees are deleted before post_delete runs
+    if settings.EVENTS_ENABLED:
+        instance._event_audience = events.audience([instance.pk])
+
+
+@receiver(post_delete, sender=Task)
+def publish_task_deleted(sender, instance, **kwargs):
+    events.emit_deleted([instance.pk], instance.__dict__.pop("_event_audience", {}))
+
+
+# Task statistics: snapshot of the task before the change, delta applied after it
+
+def _counted(instance, update_fields=None):
+    if instance.pk is None or stats.is_tracked(instance.pk):
+        return False
+    return update_fields is None or bool(COUNTED_FIELDS & set(update_fields))
+
+
+@receiver(pre_save, sender=Task)
+@receiver(pre_delete, sender=Task)
+def snapshot_task_stats(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and _counted(instance, update_fields):
+        instance._stats_before = stats.snapshot([instance.pk])
+
+
+@receiver(post_save, sender=Task)
+def update_task_stats(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and _counted(instance, update_fields):
+        stats.apply_delta(instance.__dict__.pop("_stats_before", {}), stats.snapshot([instance.pk]))
+
+
+@receiver(post_delete, sender=Task)
+def remove_task_stats(sender, instance, **kwargs):
+    stats.apply_delta(instance.__dict__.pop("_stats_before", {}), {})
+
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def task_assignees_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    if action.startswith("pre_"):
+        if not reverse:
+            task_ids = [instance.pk]
+        elif action == "pre_clear":
+            task_ids = list(instance.tasks_assigned.values_list("pk", flat=True))
+        else:
+            task_ids = list(pk_set)
+        task_ids = [pk for pk in task_ids if not stats.is_tracked(pk)]
+        instance._stats_before = (task_ids, stats.snapshot(task_ids))
+    elif "_stats_before" in instance.__dict__:
+        task_ids, before = instance.__dict__.pop("_stats_before")
+        stats.apply_delta(before, stats.snapshot(task_ids))
+
+
+@receiver(m2m_changed, sender=Task.tags.through)
+def task_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    task_ids = changed_task_ids(instance, action, reverse, pk_set, "tasks")
+    if task_ids:
+        touch_tasks(task_ids)
+        changes.record(task_ids)
+        events.emit("task.updated", task_ids)
+        bump_versions(*(f"task:{pk}" for pk in task_ids))
+        update_search_vector(task_ids)
+
+
+# Tag
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    bump_versions("tags")
+    if not created:
+        update_search_vector(instance.tasks.values("pk"))
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tag_tasks(sender, instance, **kwargs):
+    instance._deleted_task_ids = list(instance.tasks.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    bump_versions("tags")
+    update_search_vector(instance.__dict__.pop("_deleted_task_ids", []))
+
+
+# Comment
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, raw=False, created=False, **kwargs):
+    if raw:
+        return
+    bump_versions(f"task:{instance.task_id}")
+    update_search_vector([instance.task_id])
+    changes.record([instance.task_id])
+    if created:
+        events.emit("comment.created", [instance.task_id], comment_id=instance.pk)
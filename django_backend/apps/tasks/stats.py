@@ -0,0 +1,187 @@
+import contextlib
+from contextvars import ContextVar
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from apps.users.models import Team
+from .models import (
+    Task,
+    TaskStat,
+)
+
+
+User = get_user_model()
+
+ZERO = (0, 0, 0)
+
+# Tasks whose counters are kept by an enclosing tracking() block, the signal handlers skip them
+_tracked = ContextVar("tracked_task_ids", default=frozenset())
+
+
+def _contributions_sql(filtered):
+    """
+    (dimension, value, tasks, estimated hours, actual hours) rows of the
+    non archived tasks, only those in %(ids)s if `filtered`.
+    A task counts once per assignee and once per team of its assignees.
+    """
+    where = "NOT is_archived" + (" AND id = ANY(%(ids)s)" if filtered else "")
+    return f"""
+        WITH t AS (
+            SELECT id, status, priority, estimated_hours, COALESCE(actual_hours, 0) AS actual_hours
+            FROM {Task._meta.db_table} WHERE {where}
+        ), assigned AS (
+            SELECT t.*, a.user_id, u.team_id FROM t
+            LEFT JOIN {Task.assigned_to.through._meta.db_table} a ON a.task_id = t.id
+            LEFT JOIN {User._meta.db_table} u ON u.id = a.user_id
+        )
+        SELECT 'status', status, COUNT(*), SUM(estimated_hours), SUM(actual_hours)
+        FROM t GROUP BY status
+        UNION ALL
+        SELECT 'priority', priority, COUNT(*), SUM(estimated_hours), SUM(actual_hours)
+        FROM t GROUP BY priority
+        UNION ALL
+        SELECT 'assignee', COALESCE(user_id::text, ''), COUNT(*), SUM(estimated_hours), SUM(actual_hours)
+        FROM assigned GROUP BY user_id
+        UNION ALL
+        SELECT 'team', COALESCE(team_id::text, ''), COUNT(*), SUM(estimated_hours), SUM(actual_hours)
+        FROM (SELECT DISTINCT id, team_id, estimated_hours, actual_hours FROM assigned) teams GROUP BY team_id
+    """
+
+
+def snapshot(task_ids=None):
+    """{(dimension, value): (tasks, estimated hours, actual hours)} of the given tasks, or of all of them"""
+    if task_ids is not None:
+        task_ids = list(task_ids)
+        if not task_ids:
+            return {}
+    with connection.cursor() as cursor:
+        cursor.execute(_contributions_sql(task_ids is not None), {"ids": task_ids})
+        return {(dimension, value): tuple(totals) for dimension, value, *totals in cursor.fetchall()}
+
+
+def apply_delta(before, after):
+    """
+    Moves the counters from `before` to `after`, two snapshots of the same
+    tasks. One upsert incrementing every changed counter.
+    """
+    rows = []
+    for key in before.keys() | after.keys():
+        delta = [new - old for new, old in zip(after.get(key, ZERO), before.get(key, ZERO))]
+        if any(delta):
+            rows.append([*key, *delta])
+    if not rows:
+        return
+
+    table = TaskStat._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (dimension, value, task_count, estimated_hours, actual_hours) "
+            f"VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(rows))} "
+            f"ON CONFLICT (dimension, value) DO UPDATE SET "
+            f"task_count = {table}.task_count + EXCLUDED.task_count, "
+            f"estimated_hours = {table}.estimated_hours + EXCLUDED.estimated_hours, "
+            f"actual_hours = {table}.actual_hours + EXCLUDED.actual_hours",
+            [param for row in rows for param in row],
+        )
+
+
+def is_tracked(task_id):
+    return task_id in _tracked.get()
+
+
+@contextlib.contextmanager
+def tracking(task_ids):
+    """
+    Updates the counters of `task_ids` for the changes made inside the
+    block, with one snapshot before and one after whatever the number of
+    tasks. For writes that skip signals or would send one per task.
+    """
+    task_ids = list(task_ids)
+    before = snapshot(task_ids)
+    token = _tracked.set(_tracked.get() | set(task_ids))
+    try:
+        yield
+    finally:
+        _tracked.reset(token)
+    apply_delta(before, snapshot(task_ids))
+
+
+def record_created(task_ids):
+    """Adds tasks inserted without signals (bulk_create) to the counters"""
+    apply_delta({}, snapshot(task_ids))
+
+
+def reconcile():
+    """
+    Recomputes every counter from the tasks and fixes the drifted ones,
+    returns how many were wrong. Nothing is locked: the recount and the
+    stored counters come from one snapshot, and the corrections are
+    applied as increments, one short transaction per dimension, so the
+    deltas of the writes committed meanwhile are kept.
+    """
+    outermost = not connection.in_atomic_block
+    with transaction.atomic(), connection.cursor() as cursor:
+        if outermost:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        stored = {
+            (stat.dimension, stat.value): (stat.task_count, stat.estimated_hours, stat.actual_hours)
+            for stat in TaskStat.objects.all()
+        }
+        actual = snapshot()
+
+    drifted = 0
+    for dimension, _ in TaskStat.DIMENSION_CHOICES:
+        before = {key: totals for key, totals in stored.items() if key[0] == dimension}
+        after = {key: totals for key, totals in actual.items() if key[0] == dimension}
+        drifted += sum(
+            1 for key in before.keys() | after.keys()
+            if any(new != old for new, old in zip(after.get(key, ZERO), before.get(key, ZERO)))
+        )
+        with transaction.atomic():
+            apply_delta(before, after)
+            TaskStat.objects.filter(dimension=dimension, task_count=0).delete()
+    return drifted
+
+
+def _totals(count, estimated_hours, actual_hours):
+    return {"count": count, "estimated_hours": estimated_hours, "actual_hours": actual_hours}
+
+
+def get_stats():
+    """
+    Counters of the non archived tasks grouped per dimension, with the
+    names of teams and assignees. Three queries whatever the number of tasks.
+    """
+    rows = {dimension: [] for dimension, _ in TaskStat.DIMENSION_CHOICES}
+    for stat in TaskStat.objects.filter(task_count__gt=0):
+        rows[stat.dimension].append(stat)
+
+    teams = Team.objects.in_bulk([int(stat.value) for stat in rows["team"] if stat.value])
+    users = User.objects.only("username").in_bulk([int(stat.value) for stat in rows["assignee"] if stat.value])
+
+    def named(stat, objects, attr):
+        obj = objects.get(int(stat.value)) if stat.value else None
+        return {"id": obj.pk if obj else None, attr: getattr(obj, attr) if obj else None}
+
+    return {
+        "total": _totals(
+            sum(stat.task_count for stat in rows["status"]),
+            sum(stat.estimated_hours for stat in rows["status"]),
+            sum(stat.actual_hours for stat in rows["status"]),
+        ),
+        "by_status": [
+            {"status": stat.value, **_totals(stat.task_count, stat.estimated_hours, stat.actual_hours)}
+            for stat in rows["status"]
+        ],
+        "by_priority": [
+            {"priority": stat.value, **_totals(stat.task_count, stat.estimated_hours, stat.actual_hours)}
+            for stat in rows["priority"]
+        ],
+        "by_team": [
+            {**named(stat, teams, "name"), **_totals(stat.task_count, stat.estimated_hours, stat.actual_hours)}
+            for stat in rows["team"]
+        ],
+        "by_assignee": [
+            {**named(stat, users, "username"), **_totals(stat.task_count, stat.estimated_hours, stat.actual_hours)}
+            for stat in rows["assignee"]
+        ],
+    }
@@ -1,3 +1,1567 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from urllib.parse import urlencode
+from unittest.mock import AsyncMock, MagicMock, patch
+import redis
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import QueryDict
+from django.test import AsyncClient, AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APITestCase, APITransactionTestCase, force_authenticate
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.celery import tasks as celery_tasks
+from apps.common import pubsub
+from apps.common.cache import CachedResponseMixin, bump_versions, get_versions_and_bump_time
+from apps.tasks import changes, events, stats
+from apps.tasks.models import Tag, Task, Comment, TaskChange, TaskStat, TaskTemplate
+from apps.tasks.export import export_queryset
+from apps.tasks.importer import import_tasks
+from apps.tasks.reports import compress_report
+from apps.tasks.search import update_search_vector
+from apps.tasks.serializers import TaskSerializer
+from apps.tasks.views import TaskListCreateView, TaskDetailView, TaskCommentListCreateView, TaskExportView, TaskListView
+from apps.tasks.seeding import seed_users, seed_tags, seed_tasks
+from apps.users.models import User
 
-# Create your tests here.
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, API_CACHE_ENABLED=False)
+class TaskQueryCountTests(APITestCase):
+    """
+    The number of queries per page must not depend on the page size
+    nor on the number of tasks, assignees, tags or comments.
+    """
+
+    # ETag validators (MAX(updated_at), COUNT) + COUNT + tasks (JOIN creator/team) + assignees (JOIN team) + tags
+    LIST_QUERIES = 5
+    # task (JOIN creator/team) + assignees (JOIN team) + tags, the ETag comes from the cache
+    DETAIL_QUERIES = 3
+    # ETag validators + COUNT + comments (JOIN creator/team)
+    COMMENTS_QUERIES = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(30)
+        cls.tags = seed_tags(15)
+        seed_tasks(2000, users=cls.users, tags=cls.tags, assignees_per_task=5, tags_per_task=3)
+        cls.task = Task.objects.order_by("id").first()
+        seed_tasks(1, users=cls.users, tags=cls.tags, comments_per_task=50)
+        cls.commented_task = Task.objects.order_by("id").last()
+
+    def setUp(self):
+        self.client.force_authenticate(self.users[0])
+
+    def test_task_list_first_and_last_page(self):
+        url = reverse("task-list-create")
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        last_page = (response.data["count"] + 9) // 10
+
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.client.get(url, {"page": last_page})
+        self.assertEqual(response.status_code, 200)
+
+    def test_task_list_with_filters(self):
+        url = reverse("task-list-create")
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.client.get(url, {"status": "todo", "ordering": "due_date"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_task_detail(self):
+        # "task-detail" is shadowed by the template route of the same name
+        url = f"/api/tasks/{self.task.pk}/"
+        with self.assertNumQueries(self.DETAIL_QUERIES):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["assigned_to"]), 5)
+        self.assertIn("team", response.data["assigned_to"][0])
+
+    def test_task_comments(self):
+        url = reverse("task-comments", args=[self.commented_task.pk])
+        with self.assertNumQueries(self.COMMENTS_QUERIES):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 50)
+
+    def test_task_list_cursor_pagination(self):
+        url = reverse("task-list-create")
+        # No COUNT(*) in cursor mode
+        with self.assertNumQueries(self.LIST_QUERIES - 1):
+            response = self.client.get(url, {"pagination": "cursor", "page_size": 50})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("count", response.data)
+        self.assertEqual(len(response.data["results"]), 50)
+
+        seen = {task["id"] for task in response.data["results"]}
+        next_url = response.data["next"]
+        while next_url:
+            with self.assertNumQueries(self.LIST_QUERIES - 1):
+                response = self.client.get(next_url)
+            ids = {task["id"] for task in response.data["results"]}
+            self.assertFalse(seen & ids)
+            seen |= ids
+            next_url = response.data["next"]
+        self.assertEqual(len(seen), Task.objects.count())
+
+    def test_cursor_page_size_is_capped(self):
+        url = reverse("task-list-create")
+        response = self.client.get(url, {"pagination": "cursor", "page_size": 10000})
+        self.assertEqual(len(response.data["results"]), 100)
+
+    def test_sparse_fieldsets_trim_queries(self):
+        url = reverse("task-list-create")
+        # COUNT + tasks, no JOIN and only the requested columns
+        with self.assertNumQueries(self.LIST_QUERIES - 2) as context:
+            response = self.client.get(url, {"fields": "id,title,created_by"})
+        self.assertEqual(set(response.data["results"][0]), {"id", "title", "created_by"})
+        self.assertEqual(response.data["results"][0]["created_by"], self.task.created_by_id)
+        sql = context.captured_queries[-1]["sql"]
+        self.assertNotIn("JOIN", sql)
+        self.assertNotIn("description", sql)
+
+        # + assignees, nested on demand
+        with self.assertNumQueries(self.LIST_QUERIES - 1):
+            response = self.client.get(url, {"fields": "id,assigned_to", "expand": "assigned_to"})
+        self.assertIn("team", response.data["results"][0]["assigned_to"][0])
+
+        response = self.client.get(f"/api/tasks/{self.task.pk}/", {"fields": "id,assigned_to"})
+        self.assertEqual(response.data, {"id": self.task.pk, "assigned_to": [user.pk for user in self.task.assigned_to.all()]})
+
+        for params in ({"fields": "id,password"}, {"expand": "tags"}, {"fields": "assigned_to_ids"}):
+            self.assertEqual(self.client.get(url, params).status_code, 400)
+
+    def test_list_renders_like_task_serializer(self):
+        url = reverse("task-list-create")
+        for params in ({}, {"expand": ""}, {"fields": "id,tags,parent_task,created_at,due_date"}):
+            results = self.client.get(url, {"page_size": 100, **params}).data["results"]
+            tasks = Task.objects.filter(pk__in=[task["id"] for task in results]).order_by("-created_at")
+            expected = TaskSerializer(
+                tasks, many=True,
+                fields=params["fields"].split(",") if "fields" in params else None,
+                expand=() if "expand" in params else None,
+            ).data
+            self.assertEqual(sorted(results, key=lambda task: task["id"]), sorted(expected, key=lambda task: task["id"]))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TaskSearchTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_users(1)[0]
+        cls.tag = Tag.objects.create(name="billing")
+        cls.report = Task.objects.create(
+            title="Quarterly reports", description="Collect the numbers",
+            due_date=timezone.now(), estimated_hours=1, created_by=cls.user,
+        )
+        cls.other = Task.objects.create(
+            title="Fix login", description="Users cannot see their reports page",
+            due_date=timezone.now(), estimated_hours=1, created_by=cls.user,
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params):
+        response = self.client.get(reverse("task-list-create"), params)
+        self.assertEqual(response.status_code, 200)
+        return [task["id"] for task in response.data["results"]]
+
+    def test_search_ranks_title_matches_first(self):
+        self.assertEqual(self.search(search="report"), [self.report.pk, self.other.pk])
+
+    def test_title_filter_matches_word_prefixes(self):
+        self.assertEqual(self.search(title="rep"), [self.report.pk])
+        self.assertEqual(self.search(title="QUARTERLY"), [self.report.pk])
+        # Word prefixes only, not substrings
+        self.assertEqual(self.search(title="port"), [])
+        self.assertEqual(self.search(title="ogin"), [])
+
+    def test_title_filter_falls_back_for_stop_words(self):
+        todo = Task.objects.create(
+            title="To do", description="", due_date=timezone.now(), estimated_hours=1, created_by=self.user,
+        )
+        self.assertEqual(self.search(title="to do"), [todo.pk])
+        self.assertEqual(self.search(title="the"), [])
+        self.assertEqual(self.search(title="--"), [])
+        # The stop word is dropped when other words are left
+        self.assertEqual(self.search(title="the login"), [self.other.pk])
+
+    def test_search_document_follows_tags_and_comments(self):
+        self.other.tags.add(self.tag)
+        self.assertEqual(self.search(search="billing"), [self.other.pk])
+
+        Comment.objects.create(task=self.report, created_by=self.user, content="Waiting on finance")
+        self.assertEqual(self.search(search="finance"), [self.report.pk])
+
+        self.tag.delete()
+        self.assertEqual(self.search(search="billing"), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHE, API_CACHE_ENABLED=True)
+class TaskDetailCacheTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(3)
+        seed_tasks(1, users=cls.users)
+        cls.task = Task.objects.get()
+        cls.url = f"/api/tasks/{cls.task.pk}/"
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.users[0])
+
+    def test_second_read_is_served_from_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["id"], self.task.pk)
+
+    def test_update_invalidates(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(self.url, {"status": "done"})
+        self.assertEqual(self.client.get(self.url).data["status"], "done")
+
+    def test_assignment_and_user_changes_invalidate(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.assigned_to.clear()
+        self.assertEqual(self.client.get(self.url).data["assigned_to"], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.created_by.first_name = "Renamed"
+            self.task.created_by.save()
+        self.assertEqual(self.client.get(self.url).data["created_by"]["first_name"], "Renamed")
+
+    def test_unrelated_changes_keep_the_cache(self):
+        sparse = f"{self.url}?fields=id,created_by,assigned_to,tags"
+        self.client.get(self.url)
+        self.client.get(sparse)
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name="unrelated")
+            self.task.created_by.first_name = "Renamed"
+            self.task.created_by.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(sparse).data["created_by"], self.task.created_by_id)
+        # Users are nested in the full representation
+        self.assertEqual(self.client.get(self.url).data["created_by"]["first_name"], "Renamed")
+
+    def test_views_must_declare_namespaces(self):
+        with self.assertRaises(ImproperlyConfigured):
+            type("UndeclaredView", (CachedResponseMixin, APIView), {})
+
+    def test_bumps_increment_versions(self):
+        namespaces = [f"task:{self.task.pk}", "tags"]
+        self.assertEqual(get_versions_and_bump_time(namespaces), ([0, 0], None))
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_versions(*namespaces)
+            bump_versions(namespaces[0])
+        versions, bumped = get_versions_and_bump_time(namespaces)
+        self.assertEqual(versions, [2, 1])
+        self.assertAlmostEqual(bumped, time.time(), delta=2)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, API_CACHE_ENABLED=True)
+@patch.object(TaskListView, "page_size", 5)
+class TaskListPageTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(3)
+        seed_tasks(12, users=cls.users)
+
+    def setUp(self):
+        cache.clear()
+        self.client.cookies["access_token"] = str(AccessToken.for_user(self.users[0]))
+
+    def test_load_more_walks_every_task_once(self):
+        response = self.client.get("/tasks/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Load more")
+        self.assertEqual(response.content.count(b"<li>"), 5)
+
+        params, seen = {"partial": 1}, []
+        while params:
+            response = self.client.get("/tasks/", params)
+            seen += [int(pk) for pk in re.findall(rb'href="/tasks/(\d+)/"', response.content)]
+            cursor = response.get("X-Next-Cursor")
+            params = {"partial": 1, "cursor": cursor} if cursor else None
+        self.assertEqual(seen, list(Task.objects.order_by("-created_at", "-id").values_list("id", flat=True)))
+
+    def test_rows_are_cached_until_the_task_changes(self):
+        self.client.get("/tasks/")
+        # The page only, rows come from the fragment cache
+        with self.assertNumQueries(1):
+            self.client.get("/tasks/")
+
+        task = Task.objects.order_by("-created_at", "-id").first()
+        with self.captureOnCommitCallbacks(execute=True):
+            task.title = "Renamed task"
+            task.save()
+        self.assertContains(self.client.get("/tasks/"), "Renamed task")
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get("/tasks/", {"cursor": "nope"}).status_code, 400)
+
+
+def legacy_daily_summary(today):
+    """The daily summary as the ORM implementation wrote it before the streaming rewrite"""
+    tasks = (
+        Task.objects.filter(due_date__date__lte=today, is_archived=False)
+        .order_by("-created_at", "-id")
+        .select_related("created_by")
+        .prefetch_related("assigned_to", "tags")
+    )
+    lines = [f"📌 Daily Summary for {today}\n", "=" * 50 + "\n\n"]
+    if not tasks.exists():
+        lines.append("No tasks due today.\n")
+    for task in tasks:
+        lines.append(celery_tasks.TASK_TEMPLATE.format(
+            title=task.title,
+            status=task.status,
+            priority=task.priority,
+            created_by=task.created_by,
+            assigned_to=", ".join(str(u) for u in task.assigned_to.all()) or "Unassigned",
+            tags=", ".join(tag.name for tag in task.tags.all()) or "No tags",
+            due_date=task.due_date.strftime("%Y-%m-%d %H:%M"),
+        ))
+    return "".join(lines).encode()
+
+
+class DailySummaryTests(APITestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.today = timezone.localdate()
+
+    def seed(self):
+        users, tags = seed_users(4), seed_tags(3)
+        seed_tasks(40, users=users, tags=tags)
+        seed_tasks(5, users=users, tags=tags, assignees_per_task=0, tags_per_task=0, seed=1)
+        seed_tasks(5, users=users, tags=tags, is_archived=True, seed=2)
+
+    def read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_matches_the_orm_implementation(self):
+        self.seed()
+        body = self.read(celery_tasks.write_daily_summary(self.directory, self.today))
+        self.assertEqual(body, legacy_daily_summary(self.today))
+        # Several creators and assignees, tasks without any, archived ones left out
+        self.assertIn(b"Assigned to: Unassigned", body)
+        self.assertIn(b"Tags: No tags", body)
+        self.assertEqual(body.count(b"\n- "), Task.objects.filter(
+            due_date__date__lte=self.today, is_archived=False
+        ).count())
+
+    def test_generated_by_the_celery_task(self):
+        self.seed()
+        path = celery_tasks.generate_daily_summary.apply(kwargs={"shared_path": self.directory, "shards": 1}).get()
+        self.assertEqual(self.read(path), legacy_daily_summary(self.today))
+
+    def render_shards(self, keys, run):
+        today, bounds = self.today.isoformat(), [None] + keys + [None]
+        return [
+            celery_tasks.render_summary_shard.apply(args=(today, start, end, self.directory, run, index)).get()
+            for index, (start, end) in enumerate(zip(bounds, bounds[1:]))
+        ]
+
+    @override_settings(DAILY_SUMMARY_MIN_SHARD_SIZE=4)
+    def test_sharded_matches_single_process(self):
+        self.seed()
+        keys = celery_tasks.summary_shard_keys(self.today, 4)
+        ordered = list(celery_tasks.summary_queryset(self.today).values_list("created_at", "id"))
+        size = max(-(-len(ordered) // 4), 4)
+        self.assertEqual(keys, [[ordered[i][0].isoformat(), ordered[i][1]] for i in range(size, len(ordered), size)])
+        self.assertGreater(len(keys), 1)
+
+        single = self.read(celery_tasks.write_daily_summary(self.directory, self.today))
+        parts = self.render_shards(keys, "run")
+        path = celery_tasks.merge_summary_shards.apply(args=(parts, self.today.isoformat(), self.directory)).get()
+        self.assertEqual(self.read(path), single)
+        self.assertFalse([name for name in os.listdir(self.directory) if name.endswith(".part")])
+
+    @override_settings(DAILY_SUMMARY_MIN_SHARD_SIZE=4)
+    def test_failed_shard_leaves_no_parts(self):
+        self.seed()
+        keys = celery_tasks.summary_shard_keys(self.today, 2)
+        celery_tasks.render_summary_shard.apply(args=(self.today.isoformat(), None, keys[0], self.directory, "run", 0))
+        with patch.object(celery_tasks, "write_tasks", side_effect=OSError("disk full")):
+            result = celery_tasks.render_summary_shard.apply(args=(self.today.isoformat(), keys[0], None, self.directory, "run", 1))
+        self.assertTrue(result.failed())
+        self.assertEqual(os.listdir(self.directory), [f".daily_summary_{self.today}.run.0.part"])
+
+        # The chord error callback removes what the other shards wrote
+        celery_tasks.discard_summary_parts(None, result.result, None, self.today.isoformat(), "run", self.directory)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_no_tasks(self):
+        seed_tasks(3, due_date=timezone.now() + timedelta(days=2))
+        body = self.read(celery_tasks.write_daily_summary(self.directory, self.today))
+        self.assertEqual(body, legacy_daily_summary(self.today))
+        self.assertTrue(body.endswith(b"No tasks due today.\n"))
+
+
+class ReportDeliveryTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_users(1)[0]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.enterContext(override_settings(REPORTS_DIR=self.directory))
+        self.content = "".join(f"Task {i}: todo\n" for i in range(2000)).encode()
+        self.path = os.path.join(self.directory, "daily_summary_2025-01-01.txt")
+        with open(self.path, "wb") as f:
+            f.write(self.content)
+        compress_report(self.path)
+        self.url = "/reports/download/daily_summary_2025-01-01.txt/"
+        self.client.cookies["access_token"] = str(AccessToken.for_user(self.user))
+
+    def test_index_lists_reports_with_their_variant(self):
+        response = self.client.get("/reports/")
+        self.assertEqual([file.name for file in response.context["files"]], ["daily_summary_2025-01-01.txt"])
+        self.assertLess(response.context["files"][0].gzip_size, len(self.content) / 2)
+
+    def test_gzip_variant_and_validators(self):
+        response = self.client.get(self.url, headers={"Accept-Encoding": "gzip, br"})
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), self.content)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        response = self.client.get(self.url, headers={"If-None-Match": response["ETag"], "Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 304)
+
+    def test_ranges(self):
+        plain = self.client.get(self.url)
+        self.assertEqual(b"".join(plain.streaming_content), self.content)
+        self.assertEqual(plain["Accept-Ranges"], "bytes")
+
+        response = self.client.get(self.url, headers={"Range": "bytes=100-199", "If-Range": plain["ETag"]})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(self.content)}")
+        self.assertEqual(b"".join(response.streaming_content), self.content[100:200])
+
+        self.assertEqual(b"".join(self.client.get(self.url, headers={"Range": "bytes=-10"}).streaming_content), self.content[-10:])
+        self.assertEqual(self.client.get(self.url, headers={"Range": f"bytes={len(self.content)}-"}).status_code, 416)
+        # A changed file makes If-Range fail, the whole file is sent
+        response = self.client.get(self.url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(REPORTS_DELIVERY="accel", REPORTS_ACCEL_PREFIX="/protected/reports/")
+    def test_accel_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected/reports/daily_summary_2025-01-01.txt")
+        self.assertEqual(response.content, b"")
+
+    def test_hidden_and_missing_files(self):
+        open(os.path.join(self.directory, ".daily_summary.tmp"), "w").close()
+        self.assertEqual(self.client.get("/reports/download/.daily_summary.tmp/").status_code, 404)
+        self.assertEqual(self.client.get("/reports/download/missing.txt/").status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, API_CACHE_ENABLED=False)
+class TaskConditionalGetTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(3)
+        seed_tasks(5, users=cls.users, comments_per_task=2)
+        cls.task = Task.objects.order_by("id").first()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.users[0])
+
+    def revalidate(self, url, response, **params):
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_unchanged_list_is_not_modified_without_serializing(self):
+        url = reverse("task-list-create")
+        response = self.client.get(url, {"status": self.task.status})
+        self.assertNotIn("Last-Modified", response)
+        # Only the validators query
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate(url, response, status=self.task.status).status_code, 304)
+
+        # Task leaving the filtered set, max(updated_at) of the set does not move but the count does
+        Task.objects.filter(pk=self.task.pk).update(status="done" if self.task.status != "done" else "todo")
+        self.assertEqual(self.revalidate(url, response, status=self.task.status).status_code, 200)
+
+        # Assignment changed from the user side
+        response = self.client.get(url)
+        assignee = User.objects.create_user(username="assignee")
+        assignee.tasks_assigned.add(self.task)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+        response = self.client.get(url)
+        Task.objects.filter(pk=self.task.pk).delete()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_detail_validators_follow_versions(self):
+        url = f"/api/tasks/{self.task.pk}/"
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(task=self.task, created_by=self.users[0], content="Done?")
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_last_modified_is_sent_once_its_second_is_over(self):
+        url = f"/api/tasks/{self.task.pk}/"
+        clock = MagicMock()
+
+        def comment(at, content):
+            clock.time.return_value = at
+            with self.captureOnCommitCallbacks(execute=True):
+                Comment.objects.create(task=self.task, created_by=self.users[0], content=content)
+
+        with patch("apps.common.cache.time", clock):
+            comment(1000.2, "First")
+            self.assertNotIn("Last-Modified", self.client.get(url))
+
+            clock.time.return_value = 1001.5
+            settled = self.client.get(url)
+            self.assertEqual(settled["Last-Modified"], http_date(1000))
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=settled["Last-Modified"]).status_code, 304)
+
+            # Two writes in the same second, the second one after a response
+            comment(1001.6, "Second")
+            self.assertNotIn("Last-Modified", self.client.get(url))
+            comment(1001.8, "Third")
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=settled["Last-Modified"])
+            self.assertEqual(response.status_code, 200)
+
+            clock.time.return_value = 1002.1
+            latest = self.client.get(url, HTTP_IF_MODIFIED_SINCE=settled["Last-Modified"])
+            self.assertEqual(latest["Last-Modified"], http_date(1001))
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=latest["Last-Modified"]).status_code, 304)
+
+    def test_comments(self):
+        url = reverse("task-comments", args=[self.task.pk])
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+        self.client.post(url, {"content": "New comment"})
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    @override_settings(API_CONDITIONAL_GET_ENABLED=False)
+    def test_can_be_disabled(self):
+        response = self.client.get(reverse("task-list-create"))
+        self.assertNotIn("ETag", response)
+
+
+@override_settings(API_CACHE_ENABLED=False)
+class TaskBulkTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(5)
+        cls.tags = seed_tags(3)
+
+    def setUp(self):
+        self.client.force_authenticate(self.users[0])
+
+    def build_task(self, n, **fields):
+        return {
+            "title": f"Imported {n}",
+            "description": "From the importer",
+            "due_date": "2025-09-09T12:00:00Z",
+            "estimated_hours": "2.00",
+            "assigned_to_ids": [user.pk for user in self.users[:3]],
+            "tags": [tag.pk for tag in self.tags],
+            **fields,
+        }
+
+    def test_bulk_create_reports_errors_per_item(self):
+        items = [self.build_task(n) for n in range(1200)]
+        items[5] = self.build_task(5, estimated_hours="not a number")
+        items[7] = self.build_task(7, tags=[999999])
+
+        response = self.client.post("/api/tasks/bulk/", items, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["created"]), 1198)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [5, 7])
+        self.assertIn("tags", response.data["errors"][1]["errors"])
+
+        task = Task.objects.get(pk=response.data["created"][0])
+        self.assertEqual(task.created_by, self.users[0])
+        self.assertEqual(task.assigned_to.count(), 3)
+        self.assertEqual(task.tags.count(), 3)
+        self.assertTrue(Task.objects.filter(pk=task.pk, search_vector="imported").exists())
+
+    def test_bulk_create_query_count_does_not_grow_with_items(self):
+        # preload users and tags + per batch: savepoint, INSERT tasks, 2x (DELETE + INSERT) m2m,
+        # search vector UPDATE, stats snapshot + upsert, change log INSERT, release savepoint
+        with self.assertNumQueries(2 + 11):
+            self.client.post("/api/tasks/bulk/", [self.build_task(n) for n in range(500)], format="json")
+
+    def test_bulk_update_and_delete(self):
+        seed_tasks(3, users=self.users, tags=self.tags)
+        tasks = list(Task.objects.order_by("id"))
+        items = [
+            {"id": tasks[0].pk, "status": "done", "tags": []},
+            {"id": tasks[1].pk, "priority": "high", "assigned_to_ids": [self.users[4].pk]},
+            {"id": 999999, "status": "done"},
+            {"id": tasks[2].pk, "status": "unknown"},
+        ]
+        response = self.client.patch("/api/tasks/bulk/", items, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], [tasks[0].pk, tasks[1].pk])
+        self.assertEqual([error["index"] for error in response.data["errors"]], [2, 3])
+
+        tasks[0].refresh_from_db()
+        self.assertEqual(tasks[0].status, "done")
+        self.assertGreater(tasks[0].updated_at, tasks[2].updated_at)
+        self.assertFalse(tasks[0].tags.exists())
+        self.assertEqual(list(tasks[1].assigned_to.all()), [self.users[4]])
+
+        response = self.client.delete("/api/tasks/bulk/", [tasks[0].pk, tasks[1].pk, 999999], format="json")
+        self.assertEqual(sorted(response.data["deleted"]), [tasks[0].pk, tasks[1].pk])
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_bulk_delete_query_count_does_not_grow_with_items(self):
+        seed_tasks(20, users=self.users, tags=self.tags, comments_per_task=3)
+        subtask = Task.objects.order_by("id").last()
+        Task.objects.filter(pk=subtask.pk).update(parent_task=Task.objects.order_by("id").first())
+        ids = list(Task.objects.exclude(pk=subtask.pk).values_list("pk", flat=True))
+        logged = TaskChange.objects.count()
+        # existing ids + per batch: savepoint, stats snapshot, 4 cascades, DELETE tasks,
+        # change log INSERT, stats snapshot + upsert, release savepoint
+        with self.assertNumQueries(1 + 11):
+            response = self.client.delete("/api/tasks/bulk/", ids, format="json")
+        self.assertEqual(sorted(response.data["deleted"]), sorted(ids))
+        self.assertEqual(list(Task.objects.values_list("pk", "parent_task")), [(subtask.pk, None)])
+        self.assertFalse(Comment.objects.exclude(task=subtask).exists())
+        self.assertEqual(TaskChange.objects.count() - logged, len(ids))
+        self.assertEqual(stats.get_stats()["total"]["count"], 1)
+
+    def test_bulk_update_rejects_cycles_within_the_batch(self):
+        seed_tasks(4, users=self.users, tags=self.tags)
+        a, b, c, d = Task.objects.order_by("id")
+        Task.objects.filter(pk=a.pk).update(parent_task=c)
+        items = [
+            {"id": a.pk, "parent_task": b.pk},
+            {"id": b.pk, "parent_task": a.pk},
+            {"id": d.pk, "parent_task": b.pk},
+            # Loops through the current parent of a once a keeps it
+            {"id": c.pk, "parent_task": a.pk},
+        ]
+        response = self.client.patch("/api/tasks/bulk/", items, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], [d.pk])
+        self.assertEqual([error["index"] for error in response.data["errors"]], [0, 1, 3])
+        self.assertIn("parent_task", response.data["errors"][0]["errors"])
+        self.assertEqual(
+            dict(Task.objects.values_list("pk", "parent_task")),
+            {a.pk: c.pk, b.pk: None, c.pk: None, d.pk: b.pk},
+        )
+
+        response = self.client.patch("/api/tasks/bulk/", [{"id": c.pk, "parent_task": b.pk}], format="json")
+        self.assertEqual(response.data["updated"], [c.pk])
+
+    def test_bulk_rejects_non_list_bodies(self):
+        response = self.client.post("/api/tasks/bulk/", {"title": "x"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class TaskAssignTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(200)
+        seed_tasks(3, users=cls.users[:2], assignees_per_task=1)
+        cls.tasks = list(Task.objects.order_by("id"))
+
+    def setUp(self):
+        self.client.force_authenticate(self.users[0])
+
+    def assignees(self, task):
+        return set(task.assigned_to.values_list("pk", flat=True))
+
+    def test_assign_team_in_constant_queries(self):
+        task = self.tasks[0]
+        before = self.assignees(task)
+        ids = [user.pk for user in self.users]
+        # task lookup, existence check, savepoint, stats snapshot, INSERT, UPDATE updated_at,
+        # change log INSERT, stats snapshot + upsert, release savepoint
+        with self.assertNumQueries(10):
+            response = self.client.post(f"/api/tasks/{task.pk}/assign/", {"assigned_to_ids": ids}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.assignees(task), set(ids) | before)
+
+        old_updated_at = task.updated_at
+        task.refresh_from_db()
+        self.assertGreater(task.updated_at, old_updated_at)
+
+    def test_replace_and_remove(self):
+        task = self.tasks[0]
+        url = f"/api/tasks/{task.pk}/assign/"
+        keep = [self.users[10].pk, self.users[11].pk]
+
+        self.client.post(url, {"assigned_to_ids": keep, "mode": "replace"}, format="json")
+        self.assertEqual(self.assignees(task), set(keep))
+
+        self.client.post(url, {"assigned_to_ids": keep[:1], "mode": "remove"}, format="json")
+        self.assertEqual(self.assignees(task), set(keep[1:]))
+
+    def test_unknown_users_are_rejected(self):
+        response = self.client.post(
+            f"/api/tasks/{self.tasks[0].pk}/assign/", {"assigned_to_ids": [999999]}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("assigned_to_ids", response.data)
+
+    def test_bulk_assign(self):
+        task_ids = [task.pk for task in self.tasks]
+        user_ids = [user.pk for user in self.users[50:60]]
+        response = self.client.post(
+            "/api/tasks/assign/", {"task_ids": task_ids, "assigned_to_ids": user_ids, "mode": "replace"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        for task in self.tasks:
+            self.assertEqual(self.assignees(task), set(user_ids))
+
+
+class ArchivedCleanupTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(3)
+        old = timezone.now() - timedelta(days=60)
+        seed_tasks(25, users=cls.users, comments_per_task=2, is_archived=True, due_date=old)
+        seed_tasks(5, users=cls.users, comments_per_task=2, is_archived=False, due_date=old)
+        cls.kept = Task.objects.filter(is_archived=False).first()
+        cls.kept.parent_task = Task.objects.filter(is_archived=True).first()
+        cls.kept.save()
+
+    @patch.object(celery_tasks, "CLEANUP_PAUSE", 0)
+    @patch.object(celery_tasks, "CLEANUP_BATCH_SIZE", 10)
+    def test_cleanup_deletes_archived_tasks_in_batches(self):
+        result = celery_tasks.cleanup_archived_tasks()
+        self.assertTrue(result.startswith("Deleted 25 archived tasks"))
+        self.assertEqual(Task.objects.count(), 5)
+        self.assertEqual(Comment.objects.count(), 10)
+        self.assertEqual(Task.assigned_to.through.objects.count(), 10)
+        self.kept.refresh_from_db()
+        self.assertIsNone(self.kept.parent_task)
+
+    @patch.object(celery_tasks, "CLEANUP_PAUSE", 0)
+    @patch.object(celery_tasks, "CLEANUP_BATCH_SIZE", 10)
+    def test_cleanup_resumes_when_out_of_time(self):
+        first_batch = list(Task.objects.filter(is_archived=True).order_by("id").values_list("id", flat=True)[:10])
+
+        with patch.object(celery_tasks.cleanup_archived_tasks, "apply_async") as resume:
+            celery_tasks.cleanup_archived_tasks(max_seconds=0)
+
+        self.assertEqual(Task.objects.count(), 20)
+        self.assertFalse(Task.objects.filter(pk__in=first_batch).exists())
+        self.assertEqual(resume.call_args.kwargs["kwargs"]["after_id"], first_batch[-1])
+
+
+class TaskFilterIndexTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        users = seed_users(3)
+        seed_tasks(30, users=users, tags=seed_tags(2))
+
+    def indexes(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s", [table])
+            return dict(cursor.fetchall())
+
+    def test_migrated_indexes(self):
+        indexes = self.indexes(Task._meta.db_table)
+        for name, columns in [
+            ("tasks_status_created_idx", "(status, created_at, id)"),
+            ("tasks_priority_created_idx", "(priority, created_at, id)"),
+            ("tasks_creator_created_idx", "(created_by_id, created_at, id)"),
+            ("tasks_open_due_idx", "(due_date) WHERE (NOT is_archived)"),
+            ("tasks_archived_id_idx", "(id) WHERE is_archived"),
+        ]:
+            self.assertIn(name, indexes)
+            self.assertTrue(indexes[name].endswith(columns), indexes[name])
+        # Replaced by the indexes above
+        self.assertNotIn("tasks_status_031d4c_idx", indexes)
+        self.assertNotIn("tasks_priorit_a9efa1_idx", indexes)
+        self.assertFalse([name for name, definition in indexes.items() if definition.endswith("(created_by_id)")])
+
+        assigned = self.indexes(Task.assigned_to.through._meta.db_table)
+        self.assertTrue(assigned["tasks_assigned_to_user_task_idx"].endswith("(user_id, task_id)"))
+
+    def test_explain_command(self):
+        out = io.StringIO()
+        call_command("explain_task_filters", max_filters=2, stdout=out)
+        table, summary = out.getvalue().split("\n\n")
+        count, header, *rows = table.splitlines()
+        self.assertEqual(count, "Tasks in table: 30")
+        # One row per combination of up to 2 of the 7 filters, then the Celery queries
+        labels = [row[:44].strip() for row in rows]
+        self.assertEqual(len(labels), 1 + 7 + 21 + 2)
+        for label in ["(no filter)", "title", "assigned_to", "status & priority", "celery: daily summary", "celery: archived cleanup"]:
+            self.assertIn(label, labels)
+        self.assertRegex(summary, "Every filtered access path uses a matching index|consider an index on")
+
+
+class TaskStatsTests(APITestCase):
+    """Every write path must leave the counters equal to a full recount"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(6)
+        cls.tags = seed_tags(3)
+        seed_tasks(60, users=cls.users, tags=cls.tags)
+
+    def setUp(self):
+        self.client.force_authenticate(self.users[0])
+
+    def assertNoDrift(self):
+        self.assertEqual(stats.reconcile(), 0)
+
+    def test_endpoint_in_constant_queries(self):
+        self.assertNoDrift()
+        # stats + team names + usernames
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("task-stats"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total"]["count"], 60)
+        by_status = {row["status"]: row["count"] for row in response.data["by_status"]}
+        for status_value, count in by_status.items():
+            self.assertEqual(Task.objects.filter(status=status_value).count(), count)
+        by_assignee = {row["username"]: row["count"] for row in response.data["by_assignee"]}
+        self.assertEqual(by_assignee[self.users[0].username], self.users[0].tasks_assigned.count())
+
+    def test_model_signals_keep_counters(self):
+        task = Task.objects.create(
+            title="New", description="", due_date=timezone.now(), estimated_hours=3, created_by=self.users[0]
+        )
+        self.assertNoDrift()
+        task.status, task.actual_hours = "done", 2
+        task.save()
+        self.assertNoDrift()
+        task.assigned_to.add(*self.users[:3])
+        self.assertNoDrift()
+        self.users[1].tasks_assigned.remove(task)
+        self.users[2].tasks_assigned.clear()
+        self.assertNoDrift()
+        task.is_archived = True
+        task.save(update_fields=["is_archived"])
+        self.assertNoDrift()
+        Task.objects.filter(pk__in=Task.objects.order_by("id").values("pk")[:5]).delete()
+        self.assertNoDrift()
+
+    def test_bulk_paths_keep_counters(self):
+        ids = list(Task.objects.order_by("id").values_list("pk", flat=True)[:10])
+        self.client.patch("/api/tasks/bulk/", [{"id": pk, "status": "done"} for pk in ids], format="json")
+        self.assertNoDrift()
+        self.client.post(
+            "/api/tasks/assign/", {"task_ids": ids, "assigned_to_ids": [self.users[5].pk], "mode": "replace"},
+            format="json",
+        )
+        self.assertNoDrift()
+        self.client.delete("/api/tasks/bulk/", ids[:5], format="json")
+        self.assertNoDrift()
+
+    def test_reconcile_fixes_drift(self):
+        TaskStat.objects.filter(dimension="status").update(task_count=0)
+        self.assertEqual(celery_tasks.reconcile_task_stats(), "Reconciled task stats, 3 counters corrected")
+        self.assertNoDrift()
+
+    def test_reconcile_keeps_concurrent_writes(self):
+        TaskStat.objects.filter(dimension="priority").update(task_count=0)
+        recount = stats.snapshot
+
+        def snapshot(task_ids=None):
+            totals = recount(task_ids)
+            if task_ids is None:
+                # Committed after the recount read its snapshot, counted by the signals only
+                Task.objects.create(
+                    title="Late", description="", due_date=timezone.now(), estimated_hours=1, created_by=self.users[0]
+                )
+            return totals
+
+        with patch.object(stats, "snapshot", snapshot), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(stats.reconcile(), 3)
+        self.assertFalse([query for query in queries if "LOCK" in query["sql"]])
+        self.assertNoDrift()
+
+
+class TaskTreeTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_users(1)[0]
+
+        def task(title, parent=None, status="todo", estimated_hours=1, actual_hours=None):
+            return Task.objects.create(
+                title=title, description="", status=status, due_date=timezone.now(), created_by=cls.user,
+                estimated_hours=estimated_hours, actual_hours=actual_hours, parent_task=parent,
+            )
+
+        cls.root = task("Root", estimated_hours=2)
+        cls.a = task("A", cls.root, status="done", actual_hours="1.5")
+        cls.b = task("B", cls.root, status="in_progress")
+        cls.a1 = task("A1", cls.a)
+        cls.a11 = task("A11", cls.a1, estimated_hours="0.25")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get_tree(self, task, **params):
+        return self.client.get(reverse("task-tree", args=[task.pk]), params)
+
+    def test_tree_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.get_tree(self.root)
+        self.assertEqual(response.status_code, 200)
+        tree = response.data
+        self.assertEqual([node["title"] for node in tree["subtasks"]], ["A", "B"])
+        self.assertEqual(tree["subtasks"][0]["subtasks"][0]["subtasks"][0]["id"], self.a11.pk)
+        self.assertEqual(tree["rollup"], {
+            "tasks": 5,
+            "estimated_hours": "5.25",
+            "actual_hours": "1.50",
+            "status": {"todo": 3, "in_progress": 1, "done": 1},
+        })
+        self.assertEqual(tree["subtasks"][0]["rollup"]["tasks"], 3)
+
+    def test_depth_limit_keeps_full_rollup(self):
+        tree = self.get_tree(self.root, depth=1).data
+        a, b = tree["subtasks"]
+        self.assertEqual((a["subtasks"], a["truncated"], b["truncated"]), ([], True, False))
+        self.assertEqual(a["rollup"]["tasks"], 3)
+        self.assertEqual(self.get_tree(self.root, depth=-1).status_code, 400)
+        self.assertEqual(self.client.get("/api/tasks/999999/tree/").status_code, 404)
+
+    def test_parent_updates_cannot_create_cycles(self):
+        for parent in (self.a, self.a11):
+            response = self.client.patch(f"/api/tasks/{self.a.pk}/", {"parent_task": parent.pk}, format="json")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("parent_task", response.data)
+
+        response = self.client.patch(f"/api/tasks/{self.a11.pk}/", {"parent_task": self.b.pk}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_existing_cycles_do_not_loop(self):
+        Task.objects.filter(pk=self.root.pk).update(parent_task=self.a11)
+        self.assertEqual(self.get_tree(self.root).data["rollup"]["tasks"], 5)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TaskExportTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(3)
+        seed_tasks(25, users=cls.users, tags=seed_tags(3))
+
+    def setUp(self):
+        self.client.force_authenticate(self.users[0])
+
+    def export(self, **params):
+        response = self.client.get("/api/tasks/export/", params)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_ndjson_with_filters(self):
+        response, body = self.export(status="todo")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in body.splitlines()]
+        expected = Task.objects.filter(status="todo").order_by("id")
+        self.assertEqual([row["id"] for row in rows], list(expected.values_list("id", flat=True)))
+
+        task = expected.first()
+        self.assertEqual(rows[0]["estimated_hours"], str(task.estimated_hours))
+        self.assertEqual(rows[0]["created_by"], task.created_by_id)
+        self.assertEqual(rows[0]["assigned_to"], sorted(task.assigned_to.values_list("id", flat=True)))
+        self.assertEqual(rows[0]["tags"], sorted(task.tags.values_list("name", flat=True)))
+
+    @patch.object(TaskExportView, "chunk_size", 10)
+    def test_csv_reads_by_chunks(self):
+        # The cursor, then assignees and tags of each chunk of 10
+        with self.assertNumQueries(7):
+            response, body = self.export(output="csv", ordering="-due_date")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 25)
+        self.assertEqual([row["due_date"] for row in rows], sorted((row["due_date"] for row in rows), reverse=True))
+        # Two tags per seeded task
+        self.assertEqual(len(rows[0]["tags"].split(";")), 2)
+
+    def test_invalid_output(self):
+        self.assertEqual(self.client.get("/api/tasks/export/", {"output": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/tasks/export/", {"status": "someday"}).status_code, 400)
+
+    def test_view_and_task_share_the_queryset(self):
+        task = Task.objects.order_by("id")[3]
+        params = {"search": [task.title.split()[0]], "ordering": ["-due_date", "nope"], "created_by": [str(task.created_by_id)]}
+        _, body = self.export(**params)
+        expected = export_queryset(params)
+        self.assertIn(task, expected)
+        self.assertEqual([json.loads(line)["id"] for line in body.splitlines()], [t.pk for t in expected])
+        self.assertEqual(str(expected.query), str(export_queryset(QueryDict(urlencode(params, doseq=True))).query))
+
+    def test_background_export(self):
+        with patch.object(celery_tasks.export_tasks, "delay") as delay:
+            delay.return_value.id = "job-id"
+            response = self.client.post("/api/tasks/export/?priority=high&output=csv")
+        self.assertEqual(response.status_code, 202)
+        params, output, filename = delay.call_args.args
+        self.assertEqual((params, output), ({"priority": ["high"], "output": ["csv"]}, "csv"))
+        self.assertEqual(response.data["download_url"], f"/reports/download/{filename}/")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = celery_tasks.export_tasks.apply(args=(params, output, filename, directory)).get()
+            with open(path) as f:
+                rows = list(csv.DictReader(f))
+            self.assertTrue(os.path.exists(f"{path}.gz"))
+        self.assertEqual(len(rows), Task.objects.filter(priority="high").count())
+
+
+class TaskImportTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(2)
+        cls.tag = Tag.objects.create(name="backend")
+
+    def test_ndjson(self):
+        required = {"description": "Imported", "due_date": "2030-01-01T09:00:00Z", "estimated_hours": 2}
+        rows = [
+            {**required, "title": "Write docs", "status": "in_progress", "priority": "high", "estimated_hours": "2.5",
+             "created_by": self.users[1].username, "assigned_to": [self.users[0].username], "tags": ["backend", "docs"]},
+            {**required, "title": "Bad status", "status": "someday"},
+            {**required, "title": "Unknown assignee", "assigned_to": ["nobody"]},
+            {**required, "title": ""},
+        ]
+        lines = [json.dumps(row) + "\n" for row in rows] + ["{not json\n"]
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_tasks(lines, "ndjson", self.users[0].username, batch_size=2)
+
+        self.assertEqual((result.rows, result.created), (5, 1))
+        self.assertEqual(
+            {rejected["line"]: sorted(rejected["errors"]) for rejected in result.rejected},
+            {2: ["status"], 3: ["non_field_errors"], 4: ["title"], 5: ["non_field_errors"]},
+        )
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.priority, str(task.estimated_hours)), ("in_progress", "high", "2.50"))
+        self.assertEqual(task.created_by, self.users[1])
+        self.assertEqual(list(task.assigned_to.all()), [self.users[0]])
+        self.assertEqual(sorted(task.tags.values_list("name", flat=True)), ["backend", "docs"])
+        # The document written by the import is the one the signals build
+        imported = Task.objects.values_list("search_vector", flat=True).get()
+        update_search_vector([task.pk])
+        self.assertEqual(Task.objects.values_list("search_vector", flat=True).get(), imported)
+        self.assertEqual(stats.get_stats()["total"]["count"], 1)
+        self.assertEqual(TaskChange.objects.filter(task_id=task.pk).count(), 1)
+
+    def test_rules_match_the_serializer(self):
+        required = {"title": "Checked", "description": "Imported", "due_date": "2030-01-01T09:00:00Z", "estimated_hours": 2}
+        cases = [
+            {"title": ""}, {"title": "x" * 201}, {"title": "a\x00b"}, {"description": None}, {"status": "someday"},
+            {"priority": "urgent"}, {"due_date": "tomorrow"}, {"estimated_hours": "1000"}, {"estimated_hours": "1.234"},
+            {"estimated_hours": "123456"}, {"actual_hours": "abc"}, {"actual_hours": True},
+        ]
+        rows = [{**required, **case} for case in cases] + [{key: value for key, value in required.items() if key != "title"}]
+        rows.append({**required, "tags": ["x" * 51]})
+        result = import_tasks([json.dumps(row) + "\n" for row in rows], "ndjson", self.users[0].username)
+
+        errors = {rejected["line"]: rejected["errors"] for rejected in result.rejected}
+        for line, row in enumerate(rows[:-1], start=1):
+            serializer = TaskSerializer(data=row)
+            self.assertFalse(serializer.is_valid())
+            self.assertEqual(errors[line], json.loads(json.dumps(serializer.errors)), row)
+        self.assertEqual(errors[len(rows)], {"tags": ["Ensure this field has no more than 50 characters."]})
+        self.assertEqual(result.created, 0)
+
+    def test_tag_order_does_not_change_the_document(self):
+        row = {"title": "Tags", "description": "Imported", "due_date": "2030-01-01", "estimated_hours": 1}
+        lines = [json.dumps({**row, "tags": tags}) + "\n" for tags in (["zeta", "backend"], ["backend", "zeta"])]
+        with self.captureOnCommitCallbacks(execute=True):
+            import_tasks(lines, "ndjson", self.users[0].username)
+        first, second = Task.objects.order_by("id").values_list("search_vector", flat=True)
+        self.assertEqual(first, second)
+
+    def test_csv_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tasks.csv")
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow([
+                    "title", "description", "priority", "due_date", "estimated_hours", "actual_hours",
+                    "metadata", "assigned_to", "tags",
+                ])
+                writer.writerow(["First", "CSV", "low", "2030-01-01T09:00:00Z", "1", "0.5", '{"source": "csv"}', "", "backend;ops"])
+                writer.writerow(["Second", "CSV", "", "2030-01-02", "3", "", "", ";".join(u.username for u in self.users), ""])
+                writer.writerow(["Third", "CSV", "urgent", "2030-01-03", "1", "", "", "", ""])
+            call_command("import_tasks", path, user=self.users[1].username, stdout=io.StringIO())
+            with open(os.path.join(directory, "tasks.rejected.ndjson")) as f:
+                rejected = [json.loads(line) for line in f]
+
+        self.assertEqual([(row["line"], list(row["errors"])) for row in rejected], [(4, ["priority"])])
+        first, second = Task.objects.order_by("id")
+        self.assertEqual((first.priority, first.actual_hours, first.metadata), ("low", Decimal("0.50"), {"source": "csv"}))
+        self.assertEqual((second.priority, second.actual_hours, second.metadata), ("medium", None, {}))
+        self.assertEqual(second.created_by, self.users[1])
+        self.assertEqual(second.assigned_to.count(), 2)
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_command_user_errors(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".ndjson") as f:
+            with self.assertRaisesMessage(CommandError, "Unknown user 'nobody'"):
+                call_command("import_tasks", f.name, user="nobody", stdout=io.StringIO())
+            User.objects.all().delete()
+            with self.assertRaisesMessage(CommandError, "No user to create the tasks"):
+                call_command("import_tasks", f.name, stdout=io.StringIO())
+
+    def test_celery_task(self):
+        row = {"title": "From Celery", "description": "Imported", "due_date": "2030-01-01", "estimated_hours": 1}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tasks.ndjson")
+            with open(path, "w") as f:
+                f.write(json.dumps(row) + "\n" + json.dumps({**row, "estimated_hours": 1000}) + "\n")
+            summary = celery_tasks.import_task_file.apply(args=(path, self.users[0].username)).get()
+            self.assertTrue(os.path.exists(summary["rejects"]))
+        self.assertEqual((summary["rows"], summary["created"], summary["rejected"]), (2, 1, 1))
+        self.assertEqual(Task.objects.get().created_by, self.users[0])
+
+
+class TaskTemplateTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(2)
+        cls.tags = seed_tags(2)
+
+    def setUp(self):
+        self.client.force_authenticate(self.users[0])
+
+    def create_template(self, **data):
+        data = {"description": "Template", "estimated_hours": "2.00", **data}
+        response = self.client.post("/api/task-templates/", data, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data["id"]
+
+    def create_tree(self):
+        """Onboarding -> (Accounts -> Laptop, Docs)"""
+        root = self.create_template(
+            title="Onboarding", due_date="2030-01-01T09:00:00Z",
+            assigned_to=[self.users[1].pk], tags=[tag.pk for tag in self.tags],
+        )
+        accounts = self.create_template(title="Accounts", parent_template=root, tags=[self.tags[0].pk])
+        self.create_template(title="Laptop", parent_template=accounts)
+        self.create_template(title="Docs", parent_template=root)
+        return root
+
+    def test_templates_are_not_tasks(self):
+        self.create_tree()
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(len(self.client.get("/api/task-templates/").data), 4)
+
+    def test_instantiate_trees(self):
+        root = self.create_tree()
+        url = f"/api/task-templates/{root}/instantiate/"
+        # Tree, m2m of the templates, ids, one INSERT per table, hooks, savepoints
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(15):
+            response = self.client.post(url, {"count": 3, "due_date": "2031-06-01T00:00:00Z"}, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((len(response.data["created"]), response.data["tasks_per_copy"]), (3, 4))
+
+        self.assertEqual(Task.objects.count(), 12)
+        task = Task.objects.get(pk=response.data["created"][0])
+        self.assertEqual((task.title, task.parent_task_id, task.created_by), ("Onboarding", None, self.users[0]))
+        self.assertEqual(task.due_date.year, 2031)
+        self.assertEqual(list(task.assigned_to.all()), [self.users[1]])
+        self.assertEqual(task.tags.count(), 2)
+        self.assertEqual(sorted(task.subtasks.values_list("title", flat=True)), ["Accounts", "Docs"])
+        self.assertEqual(task.subtasks.get(title="Accounts").subtasks.get().title, "Laptop")
+        self.assertEqual(stats.get_stats()["total"]["count"], 12)
+        self.assertFalse(Task.objects.filter(search_vector__isnull=True).exists())
+
+        response = self.client.post(url, {"count": 2, "subtasks": False}, format="json")
+        self.assertEqual(response.data["tasks_per_copy"], 1)
+        self.assertEqual(Task.objects.filter(pk__in=response.data["created"], due_date__year=2030).count(), 2)
+
+    def test_instantiate_validation(self):
+        root = self.create_tree()
+        url = f"/api/task-templates/{root}/instantiate/"
+        # Subtemplates without due date
+        self.assertIn("due_date", self.client.post(url, {"count": 1}, format="json").data)
+        with patch("apps.tasks.serializers.MAX_TASKS", 10):
+            response = self.client.post(url, {"count": 3, "due_date": "2031-06-01T00:00:00Z"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post("/api/task-templates/0/instantiate/", {}, format="json").status_code, 404)
+        self.assertFalse(Task.objects.exists())
+
+        laptop = TaskTemplate.objects.get(title="Laptop")
+        response = self.client.patch(f"/api/task-templates/{root}/", {"parent_template": laptop.pk}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class TaskTemplateMigrationTests(APITransactionTestCase):
+    """
+    Transaction test case: the migrations alter tables, which Postgres
+    refuses while the foreign key checks of the test data are pending.
+    """
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target] if target else executor.loader.graph.leaf_nodes())
+        return executor.loader.project_state([target] if target else None).apps
+
+    def test_round_trip(self):
+        user = seed_users(1)[0]
+        tag = seed_tags(1)[0]
+        root = TaskTemplate.objects.create(title="Onboarding", description="Root", estimated_hours=2, created_by=user)
+        child = TaskTemplate.objects.create(
+            title="Laptop", description="Child", estimated_hours=1, created_by=user, parent_template=root,
+        )
+        child.tags.add(tag)
+        child.assigned_to.add(user)
+        try:
+            apps = self.migrate(("tasks", "0010_task_changes"))
+            templates = apps.get_model("tasks", "TaskTemplate").objects
+            self.assertEqual(templates.count(), 2)
+            laptop = templates.get(title="Laptop")
+            self.assertEqual(laptop.parent_task.title, "Onboarding")
+            self.assertEqual(list(laptop.tags.values_list("pk", flat=True)), [tag.pk])
+            self.assertEqual(list(laptop.assigned_to.values_list("pk", flat=True)), [user.pk])
+            self.assertIsNotNone(laptop.search_vector)
+            self.assertTrue(apps.get_model("tasks", "TaskChange").objects.filter(task_id=laptop.pk).exists())
+        finally:
+            self.migrate(None)
+
+        self.assertFalse(Task.objects.exists())
+        laptop = TaskTemplate.objects.get(title="Laptop")
+        self.assertEqual(laptop.parent_template.title, "Onboarding")
+        self.assertEqual(list(laptop.tags.all()), [tag])
+        self.assertEqual(list(laptop.assigned_to.all()), [user])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TaskChangesTests(APITransactionTestCase):
+    """
+    Transaction test case: changes are only served once their transaction
+    has committed, which never happens inside a TestCase.
+    """
+
+    def setUp(self):
+        self.users = seed_users(3)
+        seed_tasks(6, users=self.users, comments_per_task=1)
+        self.client.force_authenticate(self.users[0])
+        self.url = reverse("task-changes")
+        self.cursor = self.client.get(self.url).data["cursor"]
+
+    def sync(self, cursor, **params):
+        response = self.client.get(self.url, {"since": cursor, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_changes_and_tombstones(self):
+        first, second, third, fourth = Task.objects.order_by("id")[:4]
+        self.client.patch(f"/api/tasks/{first.pk}/", {"status": "done"}, format="json")
+        User.objects.create_user(username="assignee").tasks_assigned.add(second)
+        self.client.delete(f"/api/tasks/{third.pk}/")
+        Task.objects.filter(pk=fourth.pk).update(is_archived=True, due_date=timezone.now() - timedelta(days=60))
+        celery_tasks.cleanup_archived_tasks()
+
+        data = self.sync(self.cursor)
+        self.assertEqual({task["id"] for task in data["tasks"]}, {first.pk, second.pk})
+        self.assertEqual(sorted(data["deleted"]), sorted([third.pk, fourth.pk]))
+        self.assertEqual(next(task for task in data["tasks"] if task["id"] == first.pk)["status"], "done")
+        self.assertFalse(data["has_more"])
+
+        # Nothing new after the returned cursor
+        data = self.sync(data["cursor"])
+        self.assertEqual((data["tasks"], data["deleted"]), ([], []))
+
+    def test_pages_follow_the_cursor(self):
+        tasks = list(Task.objects.order_by("id"))
+        for task in tasks:
+            task.save()
+
+        seen, cursor, has_more = [], self.cursor, True
+        while has_more:
+            data = self.sync(cursor, page_size=4)
+            seen += [task["id"] for task in data["tasks"]]
+            cursor, has_more = data["cursor"], data["has_more"]
+        self.assertEqual(sorted(seen), [task.pk for task in tasks])
+
+    def test_invalid_and_expired_cursors(self):
+        self.assertEqual(self.client.get(self.url, {"since": "not-a-cursor"}).status_code, 400)
+        with override_settings(TASK_CHANGES_RETENTION_DAYS=0):
+            stale = changes.encode_cursor(1, 1)
+            with patch.object(changes.time, "time", return_value=changes.time.time() + 10):
+                self.assertEqual(self.client.get(self.url, {"since": stale}).status_code, 410)
+
+    def test_prune_keeps_recent_rows(self):
+        old = TaskChange.objects.update(changed_at=timezone.now() - timedelta(days=31))
+        Task.objects.first().save()
+        self.assertEqual(changes.prune(batch_size=4), old)
+        self.assertEqual(TaskChange.objects.count(), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, EVENTS_ENABLED=True, EVENTS_HEARTBEAT=30, EVENTS_QUEUE_SIZE=100)
+class TaskEventStreamTests(APITestCase):
+    """Messages are dispatched to the broker directly, as its Redis listener would"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(4, teams=2)
+        cls.user, cls.teammate, cls.other = cls.users[0], cls.users[2], cls.users[1]
+
+    async def open_stream(self, **params):
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        response = await AsyncClient().get(reverse("task-events"), params, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = response.streaming_content
+        # First chunk subscribes
+        self.assertEqual(await anext(stream), b"retry: 5000\n\n")
+        return stream
+
+    def message(self, task_id, users, teams, kind="task.updated"):
+        return {"type": kind, "at": "2025-01-01T00:00:00Z", "tasks": [{"id": task_id, "users": users, "teams": teams}]}
+
+    async def test_events_are_filtered_by_scope(self):
+        team_stream = await self.open_stream()
+        user_stream = await self.open_stream(scope="user")
+        events.broker.dispatch(self.message(1, [self.teammate.pk], [self.teammate.team_id]))
+        events.broker.dispatch(self.message(2, [self.other.pk], [self.other.team_id]))
+        events.broker.dispatch(self.message(3, [self.user.pk], [self.user.team_id], kind="task.assigned"))
+
+        self.assertIn(b'"task_ids": [1]', await anext(team_stream))
+        chunk = await anext(team_stream)
+        self.assertTrue(chunk.startswith(b"event: task.assigned\n"))
+        self.assertIn(b'"task_ids": [3]', chunk)
+        self.assertIn(b'"task_ids": [3]', await anext(user_stream))
+        await team_stream.aclose()
+        await user_stream.aclose()
+
+    async def test_closed_stream_unsubscribes(self):
+        before = set(events.broker.subscriptions)
+        stream = events.stream(self.user)
+        await anext(stream)
+        subscriptions = events.broker.subscriptions - before
+        self.assertEqual(len(subscriptions), 1)
+        await stream.aclose()
+        self.assertFalse(subscriptions & events.broker.subscriptions)
+
+    @override_settings(EVENTS_QUEUE_SIZE=2)
+    async def test_slow_client_gets_resync(self):
+        stream = await self.open_stream()
+        for task_id in range(3):
+            events.broker.dispatch(self.message(task_id, [self.user.pk], []))
+        self.assertTrue((await anext(stream)).startswith(b"event: resync\n"))
+        with self.assertRaises(StopAsyncIteration):
+            await anext(stream)
+
+    @override_settings(EVENTS_HEARTBEAT=0.01)
+    async def test_heartbeat(self):
+        stream = await self.open_stream()
+        self.assertEqual(await anext(stream), b": ping\n\n")
+        await stream.aclose()
+
+    async def test_requires_authentication(self):
+        response = await AsyncClient().get(reverse("task-events"))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_stream_ends_when_the_token_expires(self):
+        with patch.object(events, "stream", wraps=events.stream) as stream:
+            await (await self.open_stream()).aclose()
+        self.assertGreater(stream.call_args.kwargs["expires_at"], time.time())
+
+        stream = events.stream(self.user, expires_at=time.time() + 0.05)
+        await anext(stream)
+        self.assertTrue((await anext(stream)).startswith("event: expired\n"))
+        with self.assertRaises(StopAsyncIteration):
+            await anext(stream)
+
+    async def test_listener_reconnects_with_one_client(self):
+        attempts = []
+
+        class PubSub:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc_info):
+                pass
+
+            async def subscribe(self, channel):
+                attempts.append(channel)
+                if len(attempts) == 1:
+                    raise redis.ConnectionError("Redis is down")
+
+            async def listen(self):
+                await asyncio.Event().wait()
+                yield
+
+        client = MagicMock(pubsub=PubSub, aclose=AsyncMock())
+        broker = pubsub.Broker("test-events")
+        with patch.object(pubsub.aioredis.Redis, "from_url", return_value=client) as from_url, \
+                patch.object(pubsub, "RECONNECT_DELAY", 0), self.assertLogs("apps.common.pubsub", "WARNING"):
+            subscription = broker.subscribe(lambda message: message)
+            listener = broker._task
+            while len(attempts) < 2:
+                await asyncio.sleep(0.01)
+            broker.unsubscribe(subscription)
+            with self.assertRaises(asyncio.CancelledError):
+                await listener
+        self.assertEqual(from_url.call_count, 1)
+        client.aclose.assert_awaited_once()
+
+    @override_settings(EVENTS_PUBLISH_TIMEOUT=0.25)
+    def test_publish_does_not_wait_on_redis(self):
+        with patch.object(pubsub, "_client", None), patch.object(pubsub.redis.Redis, "from_url") as from_url:
+            pubsub.publish("test-events", {"type": "task.updated"})
+        self.assertEqual(from_url.call_args.kwargs, {"socket_timeout": 0.25, "socket_connect_timeout": 0.25})
+
+    def test_not_served_by_wsgi(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(reverse("task-events")).status_code, 501)
+
+    def run_queued_events(self):
+        """Runs the queued publish tasks in process, with their arguments through JSON as Celery sends them"""
+        task = celery_tasks.publish_task_events
+        return patch.object(task, "apply_async", side_effect=lambda args, **options: task.apply(json.loads(json.dumps(args))))
+
+    def test_writes_publish_their_audience(self):
+        self.client.force_authenticate(self.user)
+        with patch("apps.tasks.events.publish") as publish, self.run_queued_events(), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/tasks/", {
+                "title": "Event",
+                "description": "Published",
+                "due_date": "2025-09-09T12:00:00Z",
+                "estimated_hours": "1.00",
+                "assigned_to_ids": [self.other.pk],
+            }, format="json")
+        self.assertEqual(response.status_code, 201)
+        messages = [call.args[1] for call in publish.call_args_list]
+        created = next(message for message in messages if message["type"] == "task.created")
+        task = created["tasks"][0]
+        self.assertEqual(task["id"], response.data["id"])
+        self.assertCountEqual(task["users"], [self.user.pk, self.other.pk])
+        self.assertCountEqual(task["teams"], [self.user.team_id, self.other.team_id])
+
+        with patch("apps.tasks.events.publish") as publish, self.run_queued_events(), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/tasks/{task['id']}/")
+        deleted = publish.call_args_list[-1].args[1]
+        self.assertEqual(deleted["type"], "task.deleted")
+        self.assertCountEqual(deleted["tasks"][0]["users"], [self.user.pk, self.other.pk])
+
+    def test_writes_only_queue_the_publish(self):
+        task = Task.objects.create(
+            title="Queued", description="", due_date=timezone.now(), estimated_hours=1, created_by=self.user,
+        )
+        queue = "apps.celery.tasks.publish_task_events.apply_async"
+        with patch(queue) as queued, patch("apps.tasks.events.publish") as publish:
+            with self.captureOnCommitCallbacks() as callbacks:
+                Task.objects.filter(pk=task.pk).update(status="done")
+                events.emit("task.updated", [task.pk])
+            # No audience query or Redis publish on the request thread
+            with self.assertNumQueries(0):
+                for callback in callbacks:
+                    callback()
+        queued.assert_called_once_with(("task.updated", [task.pk], None, {}), retry=False)
+        publish.assert_not_called()
+
+        with patch(queue, side_effect=OSError("broker down")), self.assertLogs(level="ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.force_authenticate(self.user)
+                response = self.client.patch(f"/api/tasks/{task.pk}/", {"priority": "high"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, API_CACHE_ENABLED=False, API_ASYNC_VIEWS=True)
+class TaskAsyncReadTests(APITestCase):
+    """The async GET handlers answer like the sync views, with as many queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(5)
+        cls.tags = seed_tags(3)
+        seed_tasks(30, users=cls.users, tags=cls.tags, comments_per_task=3)
+        cls.task = Task.objects.order_by("id").first()
+
+    def setUp(self):
+        self.client.force_authenticate(self.users[0])
+
+    async def async_request(self, view_class, path, data=None, **kwargs):
+        view = view_class.as_view()
+        self.assertTrue(iscoroutinefunction(view))
+        if data is None:
+            request = AsyncRequestFactory().get(path)
+        else:
+            request = AsyncRequestFactory().post(path, data, content_type="application/json")
+        force_authenticate(request, user=self.users[0])
+        return await view(request, **kwargs)
+
+    async def test_same_responses_as_the_sync_views(self):
+        pk = self.task.pk
+        cases = [
+            (TaskListCreateView, "/api/tasks/?page=2&ordering=due_date", {}),
+            (TaskListCreateView, "/api/tasks/?status=todo&search=seed", {}),
+            (TaskListCreateView, "/api/tasks/?pagination=cursor&fields=id,title", {}),
+            (TaskDetailView, f"/api/tasks/{pk}/?expand=created_by", {"pk": pk}),
+            (TaskCommentListCreateView, f"/api/tasks/{pk}/comments/", {"pk": pk}),
+        ]
+        for view_class, path, kwargs in cases:
+            with self.subTest(path=path):
+                expected = await sync_to_async(self.client.get)(path)
+                response = await self.async_request(view_class, path, **kwargs)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data, expected.data)
+                self.assertEqual(response["ETag"], expected["ETag"])
+
+    def test_query_count_matches_the_sync_list(self):
+        with self.assertNumQueries(TaskQueryCountTests.LIST_QUERIES):
+            response = async_to_sync(self.async_request)(TaskListCreateView, "/api/tasks/")
+        self.assertEqual(len(response.data["results"]), 10)
+
+    async def test_errors(self):
+        response = await self.async_request(TaskDetailView, "/api/tasks/999999/", pk=999999)
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_request(TaskListCreateView, "/api/tasks/?page=99")
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_request(TaskListCreateView, "/api/tasks/?fields=nope")
+        self.assertEqual(response.status_code, 400)
+
+    async def test_writes_use_the_sync_view(self):
+        response = await self.async_request(
+            TaskCommentListCreateView, f"/api/tasks/{self.task.pk}/comments/",
+            data={"content": "From an async view"}, pk=self.task.pk,
+        )
+        self.assertEqual(response.status_code, 201)
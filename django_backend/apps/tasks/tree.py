@@ -0,0 +1,136 @@
+from decimal import Decimal
+from django.db import connection
+from .models import Task
+
+
+# Levels of subtasks returned by default / at most, rollups always cover the whole subtree
+DEFAULT_DEPTH = 10
+MAX_DEPTH = 100
+
+STATUSES = [value for value, _ in Task.STATUS_CHOICES]
+
+
+def _subtree_sql():
+    """
+    Root and descendants of %(root)s, parents before children.
+    `path` holds the ancestors of each row and a task already on the path is
+    not visited again, so parent_task cycles written by raw SQL cannot make
+    the query loop.
+    """
+    tasks = Task._meta.db_table
+    return f"""
+        WITH RECURSIVE subtree AS (
+            SELECT id, parent_task_id, title, status, priority, due_date,
+                   estimated_hours, actual_hours, 0 AS depth, ARRAY[id] AS path
+            FROM {tasks} WHERE id = %(root)s
+            UNION ALL
+            SELECT t.id, t.parent_task_id, t.title, t.status, t.priority, t.due_date,
+                   t.estimated_hours, t.actual_hours, s.depth + 1, s.path || t.id
+            FROM {tasks} t JOIN subtree s ON t.parent_task_id = s.id
+            WHERE NOT t.id = ANY(s.path)
+        )
+        SELECT id, parent_task_id, title, status, priority, due_date, estimated_hours, actual_hours, depth
+        FROM subtree ORDER BY depth, id
+    """
+
+
+def _hours(value):
+    return None if value is None else f"{value:.2f}"
+
+
+def get_task_tree(root_id, depth=DEFAULT_DEPTH):
+    """
+    Nested subtree of a task in one query, None if the task does not exist.
+    Subtasks deeper than `depth` levels are left out, but the rollup of
+    every node (task count, hour sums, status counts) covers its whole subtree.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(_subtree_sql(), {"root": root_id})
+        rows = cursor.fetchall()
+    if not rows:
+        return None
+
+    nodes, rollups = {}, {}
+    for pk, parent_id, title, status, priority, due_date, estimated_hours, actual_hours, level in rows:
+        rollups[pk] = {
+            "tasks": 1,
+            "estimated_hours": estimated_hours,
+            "actual_hours": actual_hours or Decimal(0),
+            "status": {name: int(name == status) for name in STATUSES},
+        }
+        if level > depth:
+            continue
+        nodes[pk] = {
+            "id": pk,
+            "title": title,
+            "status": status,
+            "priority": priority,
+            "due_date": due_date,
+            "estimated_hours": _hours(estimated_hours),
+            "actual_hours": _hours(actual_hours),
+            "depth": level,
+            "truncated": False,
+            "subtasks": [],
+        }
+        if level:
+            nodes[parent_id]["subtasks"].append(nodes[pk])
+
+    # Children come after their parent, walking backwards folds each subtree into its parent
+    for pk, parent_id, *_, level in reversed(rows):
+        if not level:
+            continue
+        rollup, parent = rollups[pk], rollups[parent_id]
+        parent["tasks"] += rollup["tasks"]
+        parent["estimated_hours"] += rollup["estimated_hours"]
+        parent["actual_hours"] += rollup["actual_hours"]
+        for name, count in rollup["status"].items():
+            parent["status"][name] += count
+        if level == depth + 1:
+            nodes[parent_id]["truncated"] = True
+
+    for pk, node in nodes.items():
+        rollup = rollups[pk]
+        rollup["estimated_hours"] = _hours(rollup["estimated_hours"])
+        rollup["actual_hours"] = _hours(rollup["actual_hours"])
+        node["rollup"] = rollup
+    return nodes[root_id]
+
+
+def creates_cycle(task_id, parent_id):
+    """True if `parent_id` is `task_id` or one of its descendants, ie making it the parent would loop"""
+    if task_id is None or parent_id is None:
+        return False
+    return bool(find_cycles({task_id: parent_id}))
+
+
+def find_cycles(parents):
+    """
+    Tasks of `parents`, {task id: new parent id or None}, that would be
+    their own ancestor once all the new parents are set on top of the
+    current tree. One query whatever the number of tasks.
+    """
+    parents = {task_id: parent_id for task_id, parent_id in parents.items() if task_id is not None}
+    if not any(parent_id is not None for parent_id in parents.values()):
+        return set()
+    tasks = Task._meta.db_table
+    with connection.cursor() as cursor:
+        # Walks up from each new parent, `path` also stops on cycles that already exist
+        cursor.execute(
+            f"""
+            WITH RECURSIVE edges AS (
+                SELECT * FROM unnest(%(ids)s::bigint[], %(parents)s::bigint[]) AS e(id, parent_id)
+            ), ancestors AS (
+                SELECT id AS start, parent_id AS id, ARRAY[id] AS path FROM edges WHERE parent_id IS NOT NULL
+                UNION ALL
+                SELECT a.start, CASE WHEN e.id IS NULL THEN t.parent_task_id ELSE e.parent_id END, a.path || a.id
+                FROM ancestors a
+                JOIN {tasks} t ON t.id = a.id
+                LEFT JOIN edges e ON e.id = a.id
+                WHERE NOT a.id = ANY(a.path)
+                  AND CASE WHEN e.id IS NULL THEN t.parent_task_id ELSE e.parent_id END IS NOT NULL
+            )
+            SELECT DISTINCT start FROM ancestors WHERE id = start
+            """,
+            {"ids": list(parents), "parents": list(parents.values())},
+        )
+        return {row[0] for row in cursor.fetchall()}
@@ -1,14 +1,34 @@
 from django.urls import path
 from .views import (
     TaskListCreateView,
+    TaskBulkView,
     TaskDetailView,
     TaskAssignView,
+    TaskBulkAssignView,
+    TaskStatsView,
+    TaskChangesView,
+    TaskExportView,
+    TaskEventStreamView,
+    TaskTreeView,
     TaskCommentListCreateView,
+    TaskTemplateListCreateView,
+    TaskTemplateDetailView,
+    TaskTemplateInstantiateView,
 )
 
 urlpatterns = [
     path("tasks/", TaskListCreateView.as_view(), name="task-list-create"),
+    path("tasks/bulk/", TaskBulkView.as_view(), name="task-bulk"),
+    path("tasks/assign/", TaskBulkAssignView.as_view(), name="task-bulk-assign"),
+    path("tasks/stats/", TaskStatsView.as_view(), name="task-stats"),
+    path("tasks/changes/", TaskChangesView.as_view(), name="task-changes"),
+    path("tasks/export/", TaskExportView.as_view(), name="task-export"),
+    path("tasks/events/", TaskEventStreamView.as_view(), name="task-events"),
     path("tasks/<int:pk>/", TaskDetailView.as_view(), name="task-detail"),
     path("tasks/<int:pk>/assign/", TaskAssignView.as_view(), name="task-assign"),
+    path("tasks/<int:pk>/tree/", TaskTreeView.as_view(), name="task-tree"),
     path("tasks/<int:pk>/comments/", TaskCommentListCreateView.as_view(), name="task-comments"),
+    path("task-templates/", TaskTemplateListCreateView.as_view(), name="task-template-list-create"),
+    path("task-templates/<int:pk>/", TaskTemplateDetailView.as_view(), name="task-template-detail"),
+    path("task-templates/<int:pk>/instantiate/", TaskTemplateInstantiateView.as_view(), name="task-template-instantiate"),
 ]
@@ -1,49 +1,197 @@
-from rest_framework import generics, permissions, filters, status
+from rest_framework import generics, permissions, filters, serializers, status
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404, render
 from django.utils.decorators import method_decorator
 from apps.authentication.decorators import jwt_login_required
+from apps.celery.tasks import export_tasks
+from apps.common.asyncviews import AsyncReadMixin
+from apps.common.querysets import SparseFieldsetMixin, optimize_queryset
+from apps.common.pagination import CursorPaginationMixin
+from apps.common.cache import CachedResponseMixin, ConditionalGetMixin, cached_fragments
 from django.conf import settings
-from django.http import FileResponse, Http404
+from django.urls import reverse
+from django.utils import timezone
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from apps.authentication.authentication import authenticate_request_token
 from django.views import View
 from .serializers import (
     TaskSerializer,
+    FastTaskSerializer,
+    BulkTaskSerializer,
     TaskAssignSerializer,
+    TaskBulkAssignSerializer,
+    TaskStatsSerializer,
+    TaskTreeQuerySerializer,
+    TaskChangesQuerySerializer,
+    TaskExportQuerySerializer,
+    TaskTemplateSerializer,
+    TaskTemplateInstantiateSerializer,
     CommentSerializer,
 )
 from .models import (
     Task,
     Comment,
+    TaskTemplate,
 )
 from .filters import TaskFilter
+from .bulk import bulk_create_tasks, bulk_update_tasks, bulk_delete_tasks
+from .changes import changes_since, current_cursor, ExpiredCursor
+from .export import CHUNK_SIZE as EXPORT_CHUNK_SIZE, ORDERING_FIELDS as EXPORT_ORDERING_FIELDS, FORMATS, export_blocks, export_queryset
+from .instantiation import instantiate_template
+from .reports import find_report, report_index, serve_report
+from .search import TaskSearchFilter
+from . import events
+from .stats import get_stats
+from .tree import get_task_tree
 
-import os
+import base64
+import uuid
+from datetime import datetime
 
 
 # Route   -> /api/tasks/
 # Methods -> GET POST
-class TaskListCreateView(generics.ListCreateAPIView):
+class TaskListCreateView(ConditionalGetMixin, CursorPaginationMixin, SparseFieldsetMixin, AsyncReadMixin, generics.ListCreateAPIView):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, TaskSearchFilter, filters.OrderingFilter]
     filterset_class = TaskFilter
-    search_fields = ["title", "description"]
     ordering_fields = ["due_date", "priority", "created_at"]
 
+    def get_serializer_class(self):
+        # Pages are read only, the fast serializer renders them
+        if getattr(self, "request", None) is not None and self.request.method in ("GET", "HEAD"):
+            return FastTaskSerializer
+        return TaskSerializer
+
+    def get_cache_namespaces(self):
+        # Tags render as ids, users only when nested
+        return ["users", "teams"] if self.get_expanded_fields() else []
+
+    def get_validator_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
 
+# Route   -> /api/tasks/export/
+# Methods -> GET POST
+class TaskExportView(generics.GenericAPIView):
+    """
+    GET  -> streams every task matching the filters, ?search= and ?ordering= of
+            /api/tasks/, as NDJSON or ?output=csv
+    POST -> same parameters, Celery writes the export to the reports directory,
+            downloaded from the returned URL once done
+    """
+    queryset = Task.objects.all()
+    serializer_class = TaskExportQuerySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    # Document the parameters in the schema, export_queryset() applies them
+    filter_backends = [DjangoFilterBackend, TaskSearchFilter, filters.OrderingFilter]
+    filterset_class = TaskFilter
+    ordering_fields = EXPORT_ORDERING_FIELDS
+    chunk_size = EXPORT_CHUNK_SIZE
+
+    def get_output(self):
+        params = self.get_serializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data["output"]
+
+    def get_export_queryset(self):
+        return export_queryset(self.request.query_params)
+
+    def get(self, request):
+        output = self.get_output()
+        content_type, extension = FORMATS[output]
+        response = StreamingHttpResponse(export_blocks(self.get_export_queryset(), output, self.chunk_size), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="tasks.{extension}"'
+        return response
+
+    def post(self, request):
+        output = self.get_output()
+        # Filters are validated now rather than in the worker
+        self.get_export_queryset()
+        filename = f"tasks_export_{timezone.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}.{FORMATS[output][1]}"
+        result = export_tasks.delay(dict(request.query_params.lists()), output, filename)
+        return Response(
+            {"task_id": result.id, "filename": filename, "download_url": reverse("report-download", args=[filename])},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
 # Route   -> /api/tasks/{id}/
 # Methods -> GET PUT PATCH DELETE
-class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TaskDetailView(ConditionalGetMixin, CachedResponseMixin, SparseFieldsetMixin, AsyncReadMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_cache_namespaces(self):
+        # Changes of the task, its tags and assignees bump task:<pk>, user
+        # and team fields only matter when the users are nested
+        namespaces = [f"task:{self.kwargs['pk']}"]
+        if self.get_expanded_fields():
+            namespaces += ["users", "teams"]
+        return namespaces
+
+
+# Route   -> /api/tasks/bulk/
+# Methods -> POST PATCH DELETE
+class TaskBulkView(generics.GenericAPIView):
+    """
+    POST   -> list of tasks to create
+    PATCH  -> list of partial tasks to update, each with its "id"
+    DELETE -> list of task ids to delete
+    Valid items are written even if others fail, errors are returned per item index.
+    """
+    serializer_class = BulkTaskSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    max_items = 5000
+
+    def get_items(self, request):
+        if not isinstance(request.data, list):
+            return None, Response({"detail": "Expected a list of items."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > self.max_items:
+            return None, Response(
+                {"detail": f"At most {self.max_items} items per request."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return request.data, None
+
+    def build_response(self, key, ids, errors, success_status=status.HTTP_200_OK):
+        response_status = success_status if ids or not errors else status.HTTP_400_BAD_REQUEST
+        return Response({key: ids, "errors": errors}, status=response_status)
+
+    def post(self, request):
+        items, error = self.get_items(request)
+        if error:
+            return error
+        created, errors = bulk_create_tasks(items, request.user)
+        return self.build_response("created", created, errors, status.HTTP_201_CREATED)
+
+    def patch(self, request):
+        items, error = self.get_items(request)
+        if error:
+            return error
+        updated, errors = bulk_update_tasks(items)
+        return self.build_response("updated", updated, errors)
+
+    def delete(self, request):
+        ids, error = self.get_items(request)
+        if error:
+            return error
+        deleted = bulk_delete_tasks(ids)
+        return self.build_response("deleted", deleted, [])
+
 
 # Route   -> /api/tasks/{id}/assign/
 # Methods -> POST
@@ -59,15 +207,159 @@ class TaskAssignView(generics.GenericAPIView):
         return Response({"detail": "Task assignments updated successfully."}, status=status.HTTP_200_OK)
 
 
+# Route   -> /api/tasks/assign/
+# Methods -> POST
+class TaskBulkAssignView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = TaskBulkAssignSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response({"detail": "Task assignments updated successfully."}, status=status.HTTP_200_OK)
+
+
+# Route   -> /api/tasks/{id}/tree/
+# Methods -> GET
+class TaskTreeView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = TaskTreeQuerySerializer
+
+    def get(self, request, pk):
+        params = self.get_serializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        tree = get_task_tree(pk, params.validated_data["depth"])
+        if tree is None:
+            raise Http404
+        return Response(tree)
+
+
+# Route   -> /api/tasks/changes/
+# Methods -> GET
+class TaskChangesView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = TaskChangesQuerySerializer
+
+    def get(self, request):
+        params = self.get_serializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        if "since" not in params.validated_data:
+            return Response({"cursor": current_cursor(), "has_more": False, "tasks": [], "deleted": []})
+
+        try:
+            task_ids, cursor, has_more = changes_since(params.validated_data["since"], params.validated_data["page_size"])
+        except ValueError:
+            raise serializers.ValidationError({"since": ["Invalid cursor."]})
+        except ExpiredCursor:
+            return Response(
+                {"detail": "Cursor older than the change log retention, fetch /api/tasks/ again."},
+                status=status.HTTP_410_GONE,
+            )
+
+        queryset = optimize_queryset(Task.objects.filter(pk__in=task_ids).order_by("id"), FastTaskSerializer, only=True)
+        tasks = FastTaskSerializer(queryset, many=True).data
+        found = {task["id"] for task in tasks}
+        return Response({
+            "cursor": cursor,
+            "has_more": has_more,
+            "tasks": tasks,
+            "deleted": [pk for pk in task_ids if pk not in found],
+        })
+
+
+# Route   -> /api/tasks/events/?scope=team
+# Methods -> GET
+class TaskEventStreamView(View):
+    """
+    Server-sent events of the tasks the user created or is assigned to, and
+    with scope=team (default) of the tasks of their team. Async, served by
+    the ASGI deployment only: a WSGI worker would be held per client.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({"detail": "Event stream is served by the ASGI deployment."}, status=501)
+        if not settings.EVENTS_ENABLED:
+            return JsonResponse({"detail": "Event stream is disabled."}, status=503)
+        user, token = await sync_to_async(authenticate_request_token)(request)
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+        scope = request.GET.get("scope", "team")
+        if scope not in ("user", "team"):
+            return JsonResponse({"scope": ["Must be user or team."]}, status=400)
+
+        # The token is checked once, the stream ends when it expires
+        response = StreamingHttpResponse(events.stream(user, scope, expires_at=token["exp"]), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Proxies must not buffer the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+# Route   -> /api/tasks/stats/
+# Methods -> GET
+class TaskStatsView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = TaskStatsSerializer
+
+    def get(self, request):
+        return Response(self.get_serializer(get_stats()).data)
+
+
+# Route   -> /api/task-templates/
+# Methods -> GET POST
+class TaskTemplateListCreateView(generics.ListCreateAPIView):
+    queryset = TaskTemplate.objects.select_related("created_by").prefetch_related("assigned_to", "tags")
+    serializer_class = TaskTemplateSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+
+# Route   -> /api/task-templates/{id}/
+# Methods -> GET PUT PATCH DELETE
+class TaskTemplateDetailView(generics.RetrieveUpdateDestroyAPIView):
+    queryset = TaskTemplate.objects.select_related("created_by").prefetch_related("assigned_to", "tags")
+    serializer_class = TaskTemplateSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+
+# Route   -> /api/task-templates/{id}/instantiate/
+# Methods -> POST
+class TaskTemplateInstantiateView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = TaskTemplateInstantiateSerializer
+
+    def post(self, request, pk):
+        template = get_object_or_404(TaskTemplate, pk=pk)
+        context = {**self.get_serializer_context(), "template": template}
+        serializer = self.get_serializer(data=request.data, context=context)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        created = instantiate_template(data["tree"], data["count"], request.user, data.get("due_date"))
+        return Response(
+            {"created": created, "tasks_per_copy": len(data["tree"])}, status=status.HTTP_201_CREATED
+        )
+
+
 # Route   -> /api/tasks/{id}/comments/
 # Methods -> GET POST
-class TaskCommentListCreateView(generics.ListCreateAPIView):
+class TaskCommentListCreateView(ConditionalGetMixin, CursorPaginationMixin, AsyncReadMixin, generics.ListCreateAPIView):
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         task_id = self.kwargs["pk"]
-        return Comment.objects.filter(task_id=task_id).order_by("-created_at")
+        queryset = Comment.objects.filter(task_id=task_id).order_by("-created_at")
+        return optimize_queryset(queryset, self.get_serializer_class())
+
+    def get_cache_namespaces(self):
+        return ["users", "teams"]
+
+    def get_validator_queryset(self):
+        return Comment.objects.filter(task_id=self.kwargs["pk"])
 
     def perform_create(self, serializer):
         task_id = self.kwargs["pk"]
@@ -75,12 +367,59 @@ class TaskCommentListCreateView(generics.ListCreateAPIView):
         serializer.save(task=task, created_by=self.request.user)
 
 
+def encode_list_cursor(task):
+    raw = f"{task.created_at.isoformat()}|{task.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_list_cursor(cursor):
+    """(created_at, id) of the last task of the previous page, ValueError on malformed cursors"""
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
 # Route   -> /tasks/
 @method_decorator(jwt_login_required, name='dispatch')
 class TaskListView(View):
+    """
+    Newest tasks first, `page_size` at a time in (created_at, id) keyset
+    order, so any page is an index range scan. ?cursor= continues after a
+    page and ?partial=1 returns only its rows for the "Load more" button,
+    with the next cursor in X-Next-Cursor. Rows are cached fragments.
+    """
+
+    page_size = 50
+    # Columns task_list_item.html displays, plus the keyset
+    fields = ("id", "title", "status", "priority", "created_at")
+
     def get(self, request):
-        tasks = Task.objects.all().select_related("created_by").prefetch_related("assigned_to", "tags")
-        return render(request, "task_list.html", {"tasks": tasks})
+        tasks = Task.objects.only(*self.fields).order_by("-created_at", "-id")
+        if request.GET.get("cursor"):
+            try:
+                position = decode_list_cursor(request.GET["cursor"])
+            except ValueError:
+                return HttpResponseBadRequest("Invalid cursor")
+            tasks = tasks.filter(RawSQL("(created_at, id) < (%s, %s)", position, output_field=BooleanField()))
+
+        tasks = list(tasks[:self.page_size + 1])
+        next_cursor = encode_list_cursor(tasks[self.page_size - 1]) if len(tasks) > self.page_size else None
+        tasks = tasks[:self.page_size]
+        rows = mark_safe("".join(cached_fragments(
+            "task_list_item",
+            tasks,
+            lambda task: f"task:{task.pk}",
+            lambda task: render_to_string("task_list_item.html", {"task": task}),
+        )))
+
+        if request.GET.get("partial"):
+            response = HttpResponse(rows)
+            if next_cursor:
+                response["X-Next-Cursor"] = next_cursor
+            return response
+        return render(request, "task_list.html", {"rows": rows, "next_cursor": next_cursor})
 
 
 # Route   -> /tasks/{id}/
@@ -102,26 +441,15 @@ class TaskCreateTemplateView(View):
 @method_decorator(jwt_login_required, name="dispatch")
 class ReportsTemplateView(View):
     def get(self, request):
-        shared_dir = '/shared'
-        try:
-            files = [f for f in os.listdir(shared_dir) if os.path.isfile(os.path.join(shared_dir, f))]
-        except FileNotFoundError:
-            files = []
-        return render(request, "reports.html", {"files": files})
+        return render(request, "reports.html", {"files": report_index()})
 
 
 # Route -> /reports/download/<filename>/
 @method_decorator(jwt_login_required, name="dispatch")
 class ReportDownloadView(View):
     def get(self, request, filename):
-        shared_dir = '/shared'
-        file_path = os.path.join(shared_dir, filename)
-
-        # Prevent path traversal
-        if not os.path.abspath(file_path).startswith(os.path.abspath(shared_dir)):
+        # Only plain files directly in REPORTS_DIR, no path traversal
+        found = find_report(filename)
+        if found is None:
             raise Http404("File not found.")
-
-        if not os.path.exists(file_path) or not os.path.isfile(file_path):
-            raise Http404("File not found.")
-
-        return FileResponse(open(file_path, "rb"), as_attachment=True, filename=filename)
\ No newline at end of file
+        return serve_report(request, filename, *found)
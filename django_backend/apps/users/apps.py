@@ -1 +1,11 @@
-# apps.py to define custom app behaviour
\ No newline at end of file
+# apps.py to define custom app behaviour
+from django.apps import AppConfig
+
+
+class UsersConfig(AppConfig):
+    name = "apps.users"
+    label = "users"
+
+    def ready(self):
+        # Register signal handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.common.cache import bump_versions
+from .models import User, Team
+
+
+# Fields that are never rendered by the API, saving only them keeps the cache
+UNRENDERED_FIELDS = {"last_login", "password"}
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and set(update_fields) <= UNRENDERED_FIELDS:
+        return
+    bump_versions(f"user:{instance.pk}", "users")
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    bump_versions(f"user:{instance.pk}", "users")
+
+
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def team_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump_versions("teams")
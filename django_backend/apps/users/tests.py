@@ -1,3 +1,82 @@
-from django.test import TestCase
+from django.core.cache import cache
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, override_settings
+from rest_framework.test import APITestCase, force_authenticate
+from apps.users.models import User, Team
+from apps.users.views import MeView, UserDetailsView, UserListView
 
-# Create your tests here.
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, API_CACHE_ENABLED=True)
+class UserResponseCacheTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.team = Team.objects.create(name="Platform")
+        cls.user = User.objects.create_user(username="alice", email="alice@example.com", team=cls.team)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_cached_responses_skip_the_database(self):
+        for url in ("/api/users/", f"/api/users/{self.user.pk}/", "/api/users/me/"):
+            self.get(url)
+            with self.assertNumQueries(0):
+                self.get(url)
+
+    def test_user_save_invalidates(self):
+        self.get("/api/users/me/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = "Alice"
+            self.user.save()
+        self.assertEqual(self.get("/api/users/me/")["first_name"], "Alice")
+        self.assertEqual(self.get(f"/api/users/{self.user.pk}/")["first_name"], "Alice")
+
+    def test_team_save_invalidates(self):
+        self.get("/api/users/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team.name = "Infrastructure"
+            self.team.save()
+        self.assertEqual(self.get("/api/users/")["results"][0]["team"]["name"], "Infrastructure")
+
+    def test_last_login_does_not_invalidate(self):
+        self.get("/api/users/me/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(update_fields=["last_login"])
+        with self.assertNumQueries(0):
+            self.get("/api/users/me/")
+
+    def test_unchanged_user_is_not_modified(self):
+        response = self.client.get("/api/users/me/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/users/me/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(API_CACHE_ENABLED=False)
+    def test_cache_can_be_disabled(self):
+        self.get("/api/users/")
+        with self.assertNumQueries(2):
+            self.get("/api/users/")
+
+    @override_settings(API_ASYNC_VIEWS=True)
+    async def test_async_views_match_the_sync_views(self):
+        for view_class, url, kwargs in (
+            (UserListView, "/api/users/", {}),
+            (UserDetailsView, f"/api/users/{self.user.pk}/", {"pk": self.user.pk}),
+            (MeView, "/api/users/me/", {}),
+        ):
+            expected = await sync_to_async(self.get)(url)
+            await cache.aclear()
+            request = AsyncRequestFactory().get(url)
+            force_authenticate(request, user=self.user)
+            response = await view_class.as_view()(request, **kwargs)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, expected)
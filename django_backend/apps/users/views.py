@@ -1,31 +1,43 @@
 from rest_framework import generics, permissions
-from rest_framework.response import Response
-from rest_framework.views import APIView
+from apps.common.asyncviews import AsyncReadMixin
+from apps.common.querysets import EagerLoadingMixin
+from apps.common.cache import CachedResponseMixin, ConditionalGetMixin
 from .models import User
 from .serializers import UserSerializer
 
 
 # Route   -> /api/users/
 # Methods -> GET
-class UserListView(generics.ListAPIView):
+class UserListView(ConditionalGetMixin, CachedResponseMixin, EagerLoadingMixin, AsyncReadMixin, generics.ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_namespaces = ("users", "teams")
 
 
 # Route   -> /api/users/{id}/
 # Methods -> GET PUT
-class UserDetailsView(generics.RetrieveUpdateAPIView):
+class UserDetailsView(ConditionalGetMixin, CachedResponseMixin, EagerLoadingMixin, AsyncReadMixin, generics.RetrieveUpdateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     http_method_names = ["get", "put"]  
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_cache_namespaces(self):
+        return [f"user:{self.kwargs['pk']}", "teams"]
+
 # Route   -> /api/users/me/
 # Methods -> GET
-class MeView(APIView):
+class MeView(ConditionalGetMixin, CachedResponseMixin, AsyncReadMixin, generics.RetrieveAPIView):
+    serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def get(self, request):
-        serializer = UserSerializer(request.user)
-        return Response(serializer.data)
+    def get_object(self):
+        return self.request.user
+
+    async def aget_object(self):
+        # The sync path loads the team lazily, the async ORM cannot
+        return await User.objects.select_related("team").aget(pk=self.request.user.pk)
+
+    def get_cache_namespaces(self):
+        return [f"user:{self.request.user.pk}", "teams"]
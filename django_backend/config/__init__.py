@@ -1 +1,6 @@
-# __init__.py file
\ No newline at end of file
+# __init__.py file
+
+# Loads the Celery app with Django, so .delay() from web processes uses the configured broker
+from .celery import app as celery_app
+
+__all__ = ("celery_app",)
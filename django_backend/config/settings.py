@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Additional apps
     'rest_framework',
@@ -62,7 +63,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.authentication.authentication.CachedJWTAuthentication",
     ),
 }
 
@@ -94,7 +95,8 @@ SPECTACULAR_SETTINGS = {
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'apps.common.middleware.StaticFilesMiddleware',
+    'apps.common.middleware.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -137,6 +139,38 @@ DATABASES = {
     }
 }
 
+# Connection management (apps.common.db): web, events, celery or beat
+PROCESS_TYPE = os.getenv("PROCESS_TYPE", "web")
+
+# (min, max) connections of the pool of one process. Sync workers hold one
+# connection at a time, ASGI processes one per request in flight.
+DB_POOL_SIZES = {
+    "web": (2, 16) if os.getenv("SERVER_MODE") == "asgi" else (1, 2),
+    "events": (1, 4),
+    "celery": (1, 2),
+    "beat": (0, 1),
+}
+
+DB_POOL_ENABLED = os.getenv("DB_POOL_ENABLED", "True").lower() == "true"
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", DB_POOL_SIZES.get(PROCESS_TYPE, DB_POOL_SIZES["web"])[0]))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", DB_POOL_SIZES.get(PROCESS_TYPE, DB_POOL_SIZES["web"])[1]))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+
+if DB_POOL_ENABLED:
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": DB_POOL_MIN_SIZE,
+            "max_size": DB_POOL_MAX_SIZE,
+            "timeout": DB_POOL_TIMEOUT,
+            "name": PROCESS_TYPE,
+        }
+    }
+else:
+    # Persistent connections instead, eg behind PgBouncer, checked before reuse
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", 60))
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
 # Celery
 
 CELERY_BROKER_URL = os.getenv("REDIS_URL")
@@ -151,8 +185,75 @@ CELERY_BEAT_SCHEDULE = {
         "task": "apps.celery.tasks.cleanup_archived_tasks",
         "schedule": 604800.0,  # weekly
     },
+    "task-stats": {
+        "task": "apps.celery.tasks.reconcile_task_stats",
+        "schedule": 3600.0,  # hourly
+    },
+    "task-changes": {
+        "task": "apps.celery.tasks.prune_task_changes",
+        "schedule": 86400.0,  # daily
+    },
 }
 
+# Delta sync: days of change log kept, older cursors get a 410 (apps.tasks.changes)
+TASK_CHANGES_RETENTION_DAYS = int(os.getenv("TASK_CHANGES_RETENTION_DAYS", 30))
+
+# Async GET handlers on the task and user read endpoints (apps.common.asyncviews), for the ASGI deployment
+API_ASYNC_VIEWS = os.getenv("API_ASYNC_VIEWS", "False").lower() == "true"
+
+# Real-time task events (apps.tasks.events), served over ASGI at /api/tasks/events/.
+# Off unless the events service runs, writes then queue their publish to Celery
+EVENTS_ENABLED = os.getenv("EVENTS_ENABLED", "False").lower() == "true"
+EVENTS_REDIS_URL = os.getenv("EVENTS_REDIS_URL", CELERY_BROKER_URL)
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", 15))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", 100))
+EVENTS_PUBLISH_TIMEOUT = float(os.getenv("EVENTS_PUBLISH_TIMEOUT", 0.5))
+
+# Daily summary: number of parallel shards, and the smallest shard worth a separate task
+DAILY_SUMMARY_SHARDS = int(os.getenv("DAILY_SUMMARY_SHARDS", 4))
+DAILY_SUMMARY_MIN_SHARD_SIZE = int(os.getenv("DAILY_SUMMARY_MIN_SHARD_SIZE", 10000))
+
+# Reports (apps.tasks.reports): directory, .gz variant written with each report,
+# and delivery, "python" or "accel" for an nginx front proxy (X-Accel-Redirect
+# to REPORTS_ACCEL_PREFIX, an internal location aliased to REPORTS_DIR)
+REPORTS_DIR = os.getenv("REPORTS_DIR", "/shared")
+REPORTS_GZIP = os.getenv("REPORTS_GZIP", "True").lower() == "true"
+REPORTS_DELIVERY = os.getenv("REPORTS_DELIVERY", "python")
+REPORTS_ACCEL_PREFIX = os.getenv("REPORTS_ACCEL_PREFIX", "/protected/reports/")
+
+# Cache
+
+REDIS_CACHE_URL = os.getenv("REDIS_CACHE_URL", CELERY_BROKER_URL)
+
+if REDIS_CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_CACHE_URL,
+        }
+    }
+
+# API response cache (apps.common.cache)
+API_CACHE_ENABLED = os.getenv("API_CACHE_ENABLED", "True").lower() == "true"
+API_CACHE_TIMEOUT = int(os.getenv("API_CACHE_TIMEOUT", 300))
+# Rendered template fragments, keyed by the versions of their objects (apps.common.cache)
+FRAGMENT_CACHE_TIMEOUT = int(os.getenv("FRAGMENT_CACHE_TIMEOUT", 3600))
+# ETag / Last-Modified on the task, comment and user endpoints (apps.common.cache)
+API_CONDITIONAL_GET_ENABLED = os.getenv("API_CONDITIONAL_GET_ENABLED", "True").lower() == "true"
+
+# Request and Celery task metrics (apps.common.metrics), scraped from /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_FLUSH_INTERVAL = int(os.getenv("METRICS_FLUSH_INTERVAL", 10))
+METRICS_PROCESS_TTL = int(os.getenv("METRICS_PROCESS_TTL", 3600))
+METRICS_N_PLUS_ONE_THRESHOLD = int(os.getenv("METRICS_N_PLUS_ONE_THRESHOLD", 10))
+
+# Authenticated user cache (apps.authentication.cache)
+AUTH_USER_CACHE_ENABLED = os.getenv("AUTH_USER_CACHE_ENABLED", "True").lower() == "true"
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 30))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", 1024))
+AUTH_USER_CACHE_REDIS = os.getenv("AUTH_USER_CACHE_REDIS", "False").lower() == "true"
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.shortcuts import render, redirect
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from apps.authentication.views import LogoutRedirectView
+from apps.common.views import metrics_view
 from apps.tasks.views import (
     TaskListView,
     TaskDetailTemplateView,
@@ -26,6 +27,9 @@ urlpatterns = [
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
 
+    # Prometheus metrics
+    path("metrics", metrics_view, name="metrics"),
+
     # Template routes
     path("login/", lambda request: render(request, "login.html"), name="login"),
     path("register/", lambda request: render(request, "register.html"), name="register"),
@@ -0,0 +1,11 @@
+#!/bin/sh
+
+# SERVER_MODE=wsgi (default) -> gunicorn sync workers
+# SERVER_MODE=asgi           -> uvicorn workers, GET on the task and user endpoints served by async views
+
+if [ "$SERVER_MODE" = "asgi" ]; then
+  export API_ASYNC_VIEWS=${API_ASYNC_VIEWS:-True}
+  exec uvicorn config.asgi:application --host 0.0.0.0 --port 8000 --workers ${WEB_WORKERS:-1}
+fi
+
+exec gunicorn config.wsgi:application --bind 0.0.0.0:8000 --workers ${WEB_WORKERS:-1}